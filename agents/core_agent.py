@@ -1,4 +1,5 @@
 import asyncio
+import functools
 import json
 import logging
 import os
@@ -7,10 +8,11 @@ import threading
 from datetime import datetime
 from pathlib import Path
 from queue import Queue
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import dotenv
 
+from agents.post_processing import PostProcessingQueue
 from agents.tools import Tools
 from agents.tools_mcp import Tools as ToolsMCP
 from core.config import PromptConfig
@@ -22,10 +24,12 @@ from core.embedding import (
     PostgresVectorStorage,
     SQLiteConfig,
     SQLiteVectorStorage,
-    get_embedding,
+    drop_near_duplicates,
+    get_embedding_async,
+    get_embeddings,
 )
 from core.imgen import generate_image_with_retry_smartgen
-from core.llm import LLMError, call_llm, call_llm_with_tools
+from core.llm import LLMError, call_llm_async, call_llm_with_tools_async
 from core.voice import speak_text, transcribe_audio
 
 # Set up logging
@@ -46,6 +50,8 @@ SMALL_MODEL_ID = os.getenv("SMALL_MODEL_ID")
 TWEET_WORD_LIMITS = [15, 20, 30, 35]
 IMAGE_GENERATION_PROBABILITY = 0.3
 BASE_IMAGE_PROMPT = ""
+# Knowledge base entries stored per transaction
+KNOWLEDGE_BASE_INSERT_CHUNK = 1000
 
 
 class CoreAgent:
@@ -76,6 +82,11 @@ class CoreAgent:
             storage = SQLiteVectorStorage(config)
 
         self.message_store = MessageStore(storage)
+        # Storing messages and classifying responses happen after the reply has been returned
+        self.post_processing = PostProcessingQueue(
+            max_concurrency=int(os.getenv("POST_PROCESSING_CONCURRENCY", "4")),
+            max_pending=int(os.getenv("POST_PROCESSING_MAX_PENDING", "1000")),
+        )
 
     async def initialize(self, server_url: str = "http://localhost:8000/sse"):
         await self.tools_mcp.initialize(server_url=server_url)
@@ -103,12 +114,12 @@ class CoreAgent:
             # Handle both list and dict formats
             items = data if isinstance(data, list) else [data]
 
-            # Process each item
+            # Create message content of each item by combining all key-value pairs
+            entries = []
             for item in items:
                 if not isinstance(item, dict):
                     continue
 
-                # Create message content by combining all key-value pairs
                 message_parts = []
                 for key, value in item.items():
                     if isinstance(value, (str, int, float, bool)):
@@ -117,27 +128,41 @@ class CoreAgent:
                         # Handle nested structures by converting to string
                         message_parts.append(f"{key}: {json.dumps(value)}")
 
-                message = "\n\n".join(message_parts)
+                # Extract potential key topics from the first few keys
+                entries.append(("\n\n".join(message_parts), list(item.keys())[:3]))
 
-                # Generate embedding for the message
-                message_embedding = get_embedding(message)
+            # Generate embeddings in batches, entries embedded before come from the embedding cache
+            try:
+                embeddings = get_embeddings(
+                    [message for message, _ in entries],
+                    progress=lambda done, total: logger.info(f"Embedded {done}/{total} knowledge base entries"),
+                )
+            except EmbeddingError as e:
+                logger.error(f"Failed to generate embeddings: {str(e)}")
+                return
 
+            candidates = []
+            for (message, key_topics), message_embedding in zip(entries, embeddings):
                 # Check if this exact message already exists
                 existing_entries = self.message_store.find_similar_messages(
                     message_embedding,
                     threshold=0.99,  # Very high threshold to match nearly identical content
+                    limit=1,
                 )
-
                 if existing_entries:
                     logger.info("Similar content already exists in knowledge base, skipping...")
                     continue
+                candidates.append((message, key_topics, message_embedding))
 
-                try:
-                    # Extract potential key topics from the first few keys
-                    key_topics = list(item.keys())[:3]  # Use first 3 keys as topics
+            # Entries of this file aren't stored yet, so compare them with each other as well
+            kept = drop_near_duplicates([message_embedding for _, _, message_embedding in candidates], threshold=0.99)
+            if len(kept) < len(candidates):
+                logger.info(f"Skipping {len(candidates) - len(kept)} entries similar to others in {json_file_path}")
 
-                    # Create MessageData object
-                    message_data = MessageData(
+            new_entries = []
+            for message, key_topics, message_embedding in (candidates[index] for index in kept):
+                new_entries.append(
+                    MessageData(
                         message=message,
                         embedding=message_embedding,
                         timestamp=datetime.now().isoformat(),
@@ -150,14 +175,13 @@ class CoreAgent:
                         response_type="FACTUAL",
                         key_topics=key_topics,
                     )
+                )
 
-                    # Store in vector database
-                    self.message_store.add_message(message_data)
-                    logger.info(f"Stored knowledge base entry with keys: {', '.join(key_topics)}")
-
-                except EmbeddingError as e:
-                    logger.error(f"Failed to generate embedding: {str(e)}")
-                    continue
+            # Store in vector database, one transaction per chunk
+            for start in range(0, len(new_entries), KNOWLEDGE_BASE_INSERT_CHUNK):
+                chunk = new_entries[start : start + KNOWLEDGE_BASE_INSERT_CHUNK]
+                self.message_store.add_messages(chunk)
+                logger.info(f"Stored {start + len(chunk)}/{len(new_entries)} new knowledge base entries")
 
             logger.info("Knowledge base update completed successfully")
 
@@ -219,7 +243,7 @@ class CoreAgent:
             }
         ]
         try:
-            response = call_llm_with_tools(
+            response = await call_llm_with_tools_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 SMALL_MODEL_ID,
@@ -249,7 +273,7 @@ class CoreAgent:
         prompt = self.prompt_config.get_template_image_prompt().format(tweet=message)
         logger.info("Prompt: %s", prompt)
         try:
-            image_prompt = call_llm(
+            image_prompt = await call_llm_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 SMALL_MODEL_ID,
@@ -374,15 +398,17 @@ class CoreAgent:
             return None, None, None
 
         try:
-            message_embedding = get_embedding(message)
+            message_embedding = await get_embedding_async(message)
             logger.info(f"Generated embedding for message: {message[:50]}...")
-            system_prompt_context = self.get_knowledge_base(message, message_embedding)
+            system_prompt_context = await self.get_knowledge_base(message, message_embedding)
 
             if not skip_conversation_context:
-                system_prompt += self.get_conversation_context(chat_id)
+                system_prompt += await self.get_conversation_context(chat_id)
 
             if not skip_similar:
-                system_prompt_context += self.get_similar_messages(message, message_embedding, message_type, chat_id)
+                system_prompt_context += await self.get_similar_messages(
+                    message, message_embedding, message_type, chat_id
+                )
 
             system_prompt += system_prompt_context
 
@@ -391,7 +417,7 @@ class CoreAgent:
                 tools_config += self.tools_mcp.get_tools_config()
 
             if not skip_tools:
-                response = call_llm_with_tools(
+                response = await call_llm_with_tools_async(
                     HEURIST_BASE_URL,
                     HEURIST_API_KEY,
                     model_id,
@@ -403,7 +429,7 @@ class CoreAgent:
                     tool_choice=tool_choice,
                 )
             else:
-                response = call_llm(
+                content = await call_llm_async(
                     HEURIST_BASE_URL,
                     HEURIST_API_KEY,
                     model_id,
@@ -412,6 +438,7 @@ class CoreAgent:
                     temperature=temperature,
                     max_tokens=max_tokens,
                 )
+                response = {"content": content}
             # Process response and handle tools
             text_response = ""
             image_url = None
@@ -463,43 +490,21 @@ class CoreAgent:
                     )  # default=str handles any non-JSON serializable objects
 
             if not skip_embedding:
-                # moved to post post processing as it is not relevant until finished processing
-                # Create MessageData for incoming message
-                message_data = MessageData(
-                    message=message,
-                    embedding=message_embedding,
-                    timestamp=datetime.now().isoformat(),
-                    message_type=message_type,
-                    chat_id=chat_id,
-                    source_interface=source_interface,
-                    original_query=None,
-                    original_embedding=None,
-                    response_type=None,
-                    key_topics=None,
-                    tool_call=None,
-                )
-
-                # Store the incoming message
-                self.message_store.add_message(message_data)
-                logger.info("Stored message and embedding in database")
-                # Create and store MessageData for the response
-                response_data = MessageData(
-                    message=text_response,
-                    embedding=get_embedding(text_response),
-                    timestamp=datetime.now().isoformat(),
-                    message_type="agent_response",
-                    chat_id=chat_id,
-                    source_interface=source_interface,
-                    original_query=message,
-                    original_embedding=message_embedding,
-                    response_type=await self._classify_response_type(text_response),
-                    key_topics=await self._extract_key_topics(text_response),
-                    tool_call=tool_back,
+                # Only the message store needs these, so they are stored in the background and the reply goes out now
+                self.post_processing.submit(
+                    functools.partial(
+                        self._store_exchange,
+                        message,
+                        message_embedding,
+                        text_response,
+                        message_type=message_type,
+                        chat_id=chat_id,
+                        source_interface=source_interface,
+                        tool_call=tool_back,
+                        timestamp=datetime.now().isoformat(),
+                    )
                 )
 
-                # Store the response
-                self.message_store.add_message(response_data)
-
             # Notify other interfaces if needed
             # if source_interface and chat_id:
             #     for interface_name, interface in self.interfaces.items():
@@ -689,14 +694,14 @@ class CoreAgent:
             logger.error(f"Error processing reply: {str(e)}")
             return None, None
 
-    def get_knowledge_base(self, message: str, message_embedding: List[float]) -> str:
+    async def get_knowledge_base(self, message: str, message_embedding: List[float]) -> str:
         """
         Get knowledge base data from the message embedding
         """
         if message_embedding is None:
-            message_embedding = get_embedding(message)
+            message_embedding = await get_embedding_async(message)
         system_prompt_context = ""
-        knowledge_base_data = self.message_store.find_similar_messages(
+        knowledge_base_data = await self.message_store.find_similar_messages_async(
             message_embedding, threshold=0.6, message_type="knowledge_base"
         )
         logger.info(f"Found {len(knowledge_base_data)} relevant items from knowledge base")
@@ -706,7 +711,7 @@ class CoreAgent:
                 system_prompt_context += f"{data['message']}\n"
         return system_prompt_context
 
-    def get_conversation_context(self, chat_id: str) -> str:
+    async def get_conversation_context(self, chat_id: str) -> str:
         """
         Get conversation context from the chat ID
         """
@@ -714,7 +719,7 @@ class CoreAgent:
             return ""
         system_prompt_conversation_context = "\n\nPrevious conversation history (in chronological order):\n"
         # Get last 10 messages (will be in DESC order)
-        conversation_messages = self.message_store.find_messages(
+        conversation_messages = await self.message_store.find_messages_async(
             message_type="agent_response", chat_id=chat_id, limit=10
         )
 
@@ -730,15 +735,15 @@ class CoreAgent:
         # print("system_prompt_conversation_context: ", system_prompt_conversation_context)
         return system_prompt_conversation_context
 
-    def get_similar_messages(
+    async def get_similar_messages(
         self, message: str, message_embedding: List[float], message_type: str = None, chat_id: str = None
     ) -> List[Dict[str, Any]]:
         """
         Get similar messages from the message embedding
         """
         if message_embedding is None:
-            message_embedding = get_embedding(message)
-        similar_messages = self.message_store.find_similar_messages(
+            message_embedding = await get_embedding_async(message)
+        similar_messages = await self.message_store.find_similar_messages_async(
             message_embedding, threshold=0.9, message_type=message_type, chat_id=chat_id
         )
         logger.info(f"Found {len(similar_messages)} similar messages")
@@ -748,7 +753,7 @@ class CoreAgent:
             message_count = 0
             for similar_msg in similar_messages:
                 # Find the agent's response where this similar message was the original_query
-                agent_responses = self.message_store.find_messages(
+                agent_responses = await self.message_store.find_messages_async(
                     message_type="agent_response", original_query=similar_msg["message"]
                 )
 
@@ -771,43 +776,74 @@ class CoreAgent:
 
     logger.info("Added context from similar conversations")
 
-    async def _classify_response_type(self, response: str) -> str:
-        """Classify the type of response (factual, opinion, question, etc.)"""
-        classify_prompt = {
-            "role": "system",
-            "content": "Classify this response as one of: FACTUAL, OPINION, QUESTION, EMOTIONAL, ACTION. Response:",
-        }
+    async def _store_exchange(
+        self,
+        message: str,
+        message_embedding: List[float],
+        text_response: str,
+        message_type: str,
+        chat_id: str,
+        source_interface: str,
+        tool_call: Optional[str],
+        timestamp: str,
+    ) -> None:
+        """Store a message and the agent's response, with the response embedding, type and topics"""
+        message_data = MessageData(
+            message=message,
+            embedding=message_embedding,
+            timestamp=timestamp,
+            message_type=message_type,
+            chat_id=chat_id,
+            source_interface=source_interface,
+            original_query=None,
+            original_embedding=None,
+            response_type=None,
+            key_topics=None,
+            tool_call=None,
+        )
+        await self.message_store.add_message_async(message_data)
+        logger.info("Stored message and embedding in database")
+
+        response_embedding, (response_type, key_topics) = await asyncio.gather(
+            get_embedding_async(text_response),
+            self._analyze_response(text_response),
+        )
+        response_data = MessageData(
+            message=text_response,
+            embedding=response_embedding,
+            timestamp=timestamp,
+            message_type="agent_response",
+            chat_id=chat_id,
+            source_interface=source_interface,
+            original_query=message,
+            original_embedding=message_embedding,
+            response_type=response_type,
+            key_topics=key_topics,
+            tool_call=tool_call,
+        )
+        await self.message_store.add_message_async(response_data)
+
+    async def _analyze_response(self, response: str) -> Tuple[str, List[str]]:
+        """Classify the type of response (factual, opinion, question, etc.) and extract its key topics"""
+        analyze_prompt = (
+            "Classify this response as one of: FACTUAL, OPINION, QUESTION, EMOTIONAL, ACTION, and extract 2-3 main "
+            'topics from it as keywords. Reply with JSON only, like {"response_type": "FACTUAL", "key_topics": '
+            '["topic"]}. Response:'
+        )
         try:
-            classification = await call_llm(
+            analysis = await call_llm_async(
                 HEURIST_BASE_URL,
                 HEURIST_API_KEY,
                 SMALL_MODEL_ID,  # Use smaller model for classification
-                system_prompt=classify_prompt["content"],
+                system_prompt=analyze_prompt,
                 user_prompt=response,
                 temperature=0.3,
             )
-            return classification.strip().upper()
-        except Exception:
-            return "general"
-
-    async def _extract_key_topics(self, text: str) -> List[str]:
-        """Extract key topics from the response for better similarity matching"""
-        topic_prompt = {
-            "role": "system",
-            "content": "Extract 2-3 main topics from this text as comma-separated keywords:",
-        }
-        try:
-            topics = await call_llm(
-                HEURIST_BASE_URL,
-                HEURIST_API_KEY,
-                SMALL_MODEL_ID,
-                system_prompt=topic_prompt["content"],
-                user_prompt=text,
-                temperature=0.3,
-            )
-            return [t.strip() for t in topics.split(",")]
+            result = json.loads(analysis[analysis.index("{") : analysis.rindex("}") + 1])
+            key_topics = result.get("key_topics") or []
+            return str(result.get("response_type") or "general").strip().upper(), [str(t).strip() for t in key_topics]
         except Exception:
-            return []
+            return "general", []
 
     async def send_to_interface(self, target_interface: str, message: dict):
         """
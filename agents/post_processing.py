@@ -0,0 +1,76 @@
+import asyncio
+import atexit
+import concurrent.futures
+import logging
+import threading
+from typing import Awaitable, Callable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# How long to wait for queued jobs when the process exits
+EXIT_FLUSH_TIMEOUT = 10
+
+
+class PostProcessingQueue:
+    """
+    Runs work that doesn't affect a reply, like enriching and storing messages, on a background event loop.
+
+    Interfaces call handle_message from different event loops, some of them short-lived (Flask async views,
+    asyncio.run per bot), so jobs run on a loop in a daemon thread that outlives the caller. At most
+    max_concurrency jobs run at once and at most max_pending are queued; further jobs are dropped.
+    """
+
+    def __init__(self, max_concurrency: int = 4, max_pending: int = 1000):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._pending: Set[concurrent.futures.Future] = set()
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name="post-processing", daemon=True).start()
+                atexit.register(self.flush, EXIT_FLUSH_TIMEOUT)
+            return self._loop
+
+    async def _run(self, job: Callable[[], Awaitable[None]]) -> None:
+        # Created on the background loop, the only loop that uses it
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._semaphore:
+            await job()
+
+    def submit(self, job: Callable[[], Awaitable[None]]) -> bool:
+        """Queue job, a coroutine function, without waiting for it. Returns False if the queue is full."""
+        loop = self._ensure_loop()
+        with self._lock:
+            if len(self._pending) >= self.max_pending:
+                logger.warning(f"Post-processing queue full ({self.max_pending} jobs), dropping job")
+                return False
+            future = asyncio.run_coroutine_threadsafe(self._run(job), loop)
+            self._pending.add(future)
+        future.add_done_callback(self._on_done)
+        return True
+
+    def _on_done(self, future: concurrent.futures.Future) -> None:
+        with self._lock:
+            self._pending.discard(future)
+        if not future.cancelled() and future.exception():
+            logger.error(f"Post-processing job failed: {future.exception()}")
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for the queued jobs. Returns False if some were still running after timeout seconds."""
+        with self._lock:
+            pending = list(self._pending)
+        _, not_done = concurrent.futures.wait(pending, timeout=timeout)
+        return not not_done
+
+    async def flush_async(self, timeout: Optional[float] = None) -> bool:
+        return await asyncio.get_running_loop().run_in_executor(None, self.flush, timeout)
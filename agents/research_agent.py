@@ -9,7 +9,7 @@ import dotenv
 from firecrawl import FirecrawlApp
 
 from core.llm import call_llm
-from core.utils.text_splitter import trim_prompt
+from core.utils.text_splitter import trim_prompt, trim_prompts_async
 
 os.environ.clear()
 dotenv.load_dotenv(override=True)
@@ -206,7 +206,9 @@ async def process_serp_result(
     num_follow_up_questions: int = 3,
 ) -> Dict[str, List[str]]:
     """Process search results to extract learnings and follow-up questions."""
-    contents = [trim_prompt(item.get("markdown", ""), 25_000) for item in search_result["data"] if item.get("markdown")]
+    contents = await trim_prompts_async(
+        [item["markdown"] for item in search_result["data"] if item.get("markdown")], 25_000
+    )
 
     contents_str = "".join(f"<content>\n{content}\n</content>" for content in contents)
 
@@ -5,14 +5,18 @@ import aiohttp
 import requests
 from requests.exceptions import RequestException
 
+from .http_session import get_shared_session
+
 logger = logging.getLogger(__name__)
 
 
 class BaseAPIClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, shared_session: bool = True):
         self.base_url = base_url
         self.timeout = 10
         self.session = requests.Session()
+        # By default async requests go through the process-wide pooled session from clients.http_session
+        self.shared_session = shared_session
         self.async_session: Optional[aiohttp.ClientSession] = None
 
     def _sync_request(self, method: str, endpoint: str, **kwargs) -> Any:
@@ -30,14 +34,18 @@ class BaseAPIClient:
 
     async def _async_request(self, method: str, endpoint: str, **kwargs) -> Any:
         """Async request"""
-        if not self.async_session:
-            self.async_session = aiohttp.ClientSession()
+        if self.shared_session:
+            session = get_shared_session()
+        else:
+            if not self.async_session:
+                self.async_session = aiohttp.ClientSession()
+            session = self.async_session
 
         if "timeout" not in kwargs:
             kwargs["timeout"] = self.timeout
 
         try:
-            async with getattr(self.async_session, method.lower())(f"{self.base_url}{endpoint}", **kwargs) as response:
+            async with getattr(session, method.lower())(f"{self.base_url}{endpoint}", **kwargs) as response:
                 response.raise_for_status()
                 return await response.json()
         except aiohttp.ClientError as e:
@@ -0,0 +1,65 @@
+import logging
+import time
+from typing import Dict, Tuple
+
+import aiohttp
+
+from .http_session import get_shared_session
+
+logger = logging.getLogger(__name__)
+
+
+class CreditsClient:
+    """
+    Client for the Heurist credits deduction API.
+
+    Requests go through the shared connection pool. API keys whose last deduction succeeded are
+    remembered for cache_ttl seconds so callers can start work before the next deduction returns.
+    """
+
+    def __init__(
+        self, api_url: str, auth: str, cache_ttl: float = 60, timeout: float = 10, max_cache_size: int = 10000
+    ):
+        self.api_url = api_url
+        self.auth = auth
+        self.cache_ttl = cache_ttl
+        self.timeout = timeout
+        self.max_cache_size = max_cache_size
+        self._validated: Dict[Tuple[str, str], float] = {}
+
+    def is_recently_validated(self, user_id: str, api_key: str) -> bool:
+        expires_at = self._validated.get((user_id, api_key))
+        if expires_at is None:
+            return False
+        if expires_at < time.monotonic():
+            self._validated.pop((user_id, api_key), None)
+            return False
+        return True
+
+    def _remember(self, user_id: str, api_key: str) -> None:
+        if self.cache_ttl <= 0:
+            return
+        now = time.monotonic()
+        if len(self._validated) >= self.max_cache_size:
+            self._validated = {key: expires_at for key, expires_at in self._validated.items() if expires_at > now}
+            while len(self._validated) >= self.max_cache_size:
+                self._validated.pop(next(iter(self._validated)))
+        self._validated[(user_id, api_key)] = now + self.cache_ttl
+
+    async def deduct(self, user_id: str, api_key: str, model_id: str, model_type: str = "AGENT") -> bool:
+        """Deduct credits for one call. Returns False if the API rejected it, raises on transport errors."""
+        session = get_shared_session()
+        async with session.post(
+            self.api_url,
+            headers={"Authorization": self.auth},
+            json={"user_id": user_id, "api_key": api_key, "model_type": model_type, "model_id": model_id},
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            validated = response.status == 200
+
+        if validated:
+            self._remember(user_id, api_key)
+        else:
+            self._validated.pop((user_id, api_key), None)
+            logger.info(f"Credit deduction rejected for user_id {user_id} with status {response.status}")
+        return validated
@@ -0,0 +1,123 @@
+import asyncio
+import logging
+import os
+import weakref
+from typing import AsyncGenerator, Awaitable, Callable, Optional, Set
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Close callbacks registered per event loop, and strong references to their shutdown hooks, which the loop only
+# keeps weakly
+_shutdown_callbacks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Set[Callable]]" = weakref.WeakKeyDictionary()
+_shutdown_hooks: Set[AsyncGenerator] = set()
+
+
+def close_on_loop_shutdown(close: Callable[[], Awaitable[None]]) -> None:
+    """
+    Await close() on the running event loop when it shuts down, so pools created on short-lived loops
+    (asyncio.run) don't leak their connections. It runs from the loop's shutdown_asyncgens(), which asyncio.run()
+    and uvicorn call before closing the loop. Registering the same close again on a loop does nothing.
+    """
+    loop = asyncio.get_running_loop()
+    callbacks = _shutdown_callbacks.setdefault(loop, set())
+    if close in callbacks:
+        return
+    callbacks.add(close)
+
+    async def wait_for_shutdown():
+        try:
+            yield
+        finally:
+            _shutdown_hooks.discard(hook)
+            callbacks.discard(close)
+            await close()
+
+    hook = wait_for_shutdown()
+    _shutdown_hooks.add(hook)
+    # Run the hook up to its yield, which registers it with the loop
+    try:
+        hook.asend(None).send(None)
+    except StopIteration:
+        pass
+
+
+class SessionRegistry:
+    """
+    Process-wide registry of shared aiohttp sessions.
+
+    aiohttp sessions are bound to the event loop they were created on, so the registry keeps one
+    session per loop and closes it when that loop shuts down. Every session uses a pooled connector with per-host limits, keep-alive and
+    DNS caching, so TCP/TLS connections are reused across agents, clients and requests.
+
+    Settings left as None default to HTTP_POOL_LIMIT, HTTP_POOL_LIMIT_PER_HOST, HTTP_KEEPALIVE_TIMEOUT
+    and HTTP_DNS_CACHE_TTL, read when the first session is created.
+    """
+
+    def __init__(
+        self,
+        limit: Optional[int] = None,
+        limit_per_host: Optional[int] = None,
+        keepalive_timeout: Optional[float] = None,
+        ttl_dns_cache: Optional[int] = None,
+    ):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.ttl_dns_cache = ttl_dns_cache
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared session of the running event loop, creating it on first use"""
+        loop = asyncio.get_running_loop()
+        session = self._sessions.get(loop)
+        if session is None or session.closed:
+            self._read_settings()
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                use_dns_cache=True,
+                ttl_dns_cache=self.ttl_dns_cache,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[loop] = session
+            close_on_loop_shutdown(self.close)
+            logger.debug(f"Created shared HTTP session (limit={self.limit}, limit_per_host={self.limit_per_host})")
+        return session
+
+    def _read_settings(self) -> None:
+        if self.limit is None:
+            self.limit = int(os.getenv("HTTP_POOL_LIMIT", "200"))
+        if self.limit_per_host is None:
+            self.limit_per_host = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "32"))
+        if self.keepalive_timeout is None:
+            self.keepalive_timeout = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "30"))
+        if self.ttl_dns_cache is None:
+            self.ttl_dns_cache = int(os.getenv("HTTP_DNS_CACHE_TTL", "300"))
+
+    async def close(self) -> None:
+        """Close the shared session of the running event loop"""
+        loop = asyncio.get_running_loop()
+        session: Optional[aiohttp.ClientSession] = self._sessions.pop(loop, None)
+        if session and not session.closed:
+            await session.close()
+
+
+session_registry = SessionRegistry()
+
+
+def get_shared_session() -> aiohttp.ClientSession:
+    """
+    Shared aiohttp session for the running event loop.
+
+    Callers must not close it; it is closed when its event loop shuts down, or by close_shared_session().
+    """
+    return session_registry.get_session()
+
+
+async def close_shared_session() -> None:
+    await session_registry.close()
@@ -1,6 +1,10 @@
 # clients/mesh_client.py
 import asyncio
-from typing import Any, Dict, Optional
+import functools
+import os
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
 
 from loguru import logger
 
@@ -88,6 +92,26 @@ class MeshClient(BaseAPIClient):
         except Exception as e:
             logger.error(f"Update failed | Task: {task_id} | Error: {str(e)}")
 
+    async def push_update_async(self, task_id: str, content: str):
+        """Push an update for a running task without blocking the event loop"""
+        try:
+            await self._async_request(
+                method="post", endpoint="/mesh_task_update", json={"task_id": task_id, "content": content}
+            )
+            logger.debug(f"Update pushed | Task: {task_id} | Content: {content}")
+
+        except Exception as e:
+            logger.error(f"Update failed | Task: {task_id} | Error: {str(e)}")
+
+    def enqueue_update(self, task_id: str, content: str):
+        """Queue an update for the background sender, falling back to a blocking push outside an event loop"""
+        try:
+            sender = get_task_update_sender(self.base_url)
+        except RuntimeError:
+            self.push_update(task_id, content)
+            return
+        sender.submit(task_id, content)
+
     async def mesh_request(
         self, agent_id: str, input_data: Dict[str, Any], api_key: Optional[str] = None
     ) -> Dict[str, Any]:
@@ -106,3 +130,148 @@ class MeshClient(BaseAPIClient):
         except Exception as e:
             logger.error(f"Direct request failed | Agent: {agent_id} | Error: {str(e)}")
             raise
+
+
+class TaskUpdateSender:
+    """
+    Background sender for task progress updates.
+
+    submit() only appends to an in-memory buffer, so callers never wait on the network. A single
+    background task drains the buffer every flush_interval. Every update is sent as its own request,
+    in order per task, with the updates of different tasks sent concurrently. When more than
+    max_pending updates are buffered the oldest ones are dropped.
+
+    Settings left as None default to TASK_UPDATE_FLUSH_INTERVAL, TASK_UPDATE_MAX_PENDING and
+    TASK_UPDATE_MAX_CONCURRENCY.
+    """
+
+    def __init__(
+        self,
+        client: MeshClient,
+        flush_interval: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+    ):
+        self.client = client
+        self.flush_interval = (
+            flush_interval if flush_interval is not None else float(os.getenv("TASK_UPDATE_FLUSH_INTERVAL", "0.2"))
+        )
+        self.max_pending = max_pending or int(os.getenv("TASK_UPDATE_MAX_PENDING", "1000"))
+        self.max_concurrency = max_concurrency or int(os.getenv("TASK_UPDATE_MAX_CONCURRENCY", "8"))
+        self.dropped = 0
+        self._pending: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._pending_count = 0
+        # Requests in flight per task ID, so a task's updates can be awaited before its result is submitted
+        self._sending: Dict[str, asyncio.Task] = {}
+        self._wakeup = asyncio.Event()
+        self._worker: Optional[asyncio.Task] = None
+
+    def submit(self, task_id: str, content: str) -> None:
+        """Buffer an update; must be called from the event loop the sender belongs to"""
+        self._pending.setdefault(task_id, []).append(content)
+        self._pending_count += 1
+
+        while self._pending_count > self.max_pending:
+            oldest_task_id, contents = next(iter(self._pending.items()))
+            contents.pop(0)
+            if not contents:
+                del self._pending[oldest_task_id]
+            self._pending_count -= 1
+            self.dropped += 1
+            logger.warning(f"Update dropped under backpressure | Task: {oldest_task_id}")
+
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            # Give closely spaced updates of the same task a chance to be merged
+            await asyncio.sleep(self.flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _send(
+        self, task_id: str, contents: List[str], semaphore: asyncio.Semaphore, previous: Optional[asyncio.Task]
+    ) -> None:
+        # Keep a task's updates in order behind the request already sending its earlier ones
+        if previous is not None:
+            await asyncio.gather(asyncio.shield(previous), return_exceptions=True)
+        async with semaphore:
+            for content in contents:
+                await self.client.push_update_async(task_id, content)
+
+    def _start_send(self, task_id: str, contents: List[str], semaphore: asyncio.Semaphore) -> asyncio.Task:
+        task = asyncio.create_task(self._send(task_id, contents, semaphore, self._sending.get(task_id)))
+        self._sending[task_id] = task
+        task.add_done_callback(functools.partial(self._forget_send, task_id))
+        return task
+
+    def _forget_send(self, task_id: str, task: asyncio.Task) -> None:
+        if self._sending.get(task_id) is task:
+            del self._sending[task_id]
+
+    async def flush(self) -> None:
+        """Send everything buffered so far"""
+        while self._pending:
+            batch, self._pending, self._pending_count = self._pending, OrderedDict(), 0
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            sends = [self._start_send(task_id, contents, semaphore) for task_id, contents in batch.items()]
+            # Shielded so cancelling the worker doesn't lose updates that were already taken from the buffer
+            await asyncio.shield(asyncio.gather(*sends))
+
+    async def flush_task(self, task_id: str) -> None:
+        """Send the updates buffered for task_id now, and wait until all of its updates have been sent"""
+        contents = self._pending.pop(task_id, None)
+        if contents:
+            self._pending_count -= len(contents)
+            self._start_send(task_id, contents, asyncio.Semaphore(1))
+        sending = self._sending.get(task_id)
+        if sending is not None:
+            await asyncio.shield(sending)
+
+    async def close(self) -> None:
+        """Stop the background worker and send what is still buffered or in flight"""
+        if self._worker is not None:
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+            self._worker = None
+        await self.flush()
+        await asyncio.gather(*self._sending.values(), return_exceptions=True)
+
+
+# One sender per event loop and server URL, shared by every agent in the process
+_task_update_senders: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, TaskUpdateSender]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_task_update_sender(base_url: str) -> TaskUpdateSender:
+    """Return the update sender of the running event loop; raises RuntimeError outside an event loop"""
+    loop = asyncio.get_running_loop()
+    senders = _task_update_senders.setdefault(loop, {})
+    if base_url not in senders:
+        senders[base_url] = TaskUpdateSender(MeshClient(base_url=base_url))
+    return senders[base_url]
+
+
+async def flush_task_updates(task_ids: Optional[Iterable[str]] = None) -> None:
+    """
+    Send the buffered task updates of the running event loop. With task_ids, only send those tasks' updates
+    and wait until they are delivered, e.g. so progress doesn't arrive after a task's result.
+    """
+    senders = _task_update_senders.get(asyncio.get_running_loop(), {})
+    for sender in list(senders.values()):
+        if task_ids is None:
+            await sender.flush()
+        else:
+            for task_id in set(task_ids):
+                await sender.flush_task(task_id)
+
+
+async def close_task_update_senders() -> None:
+    """Send the remaining task updates of the running event loop and stop its senders, on shutdown"""
+    senders = _task_update_senders.pop(asyncio.get_running_loop(), {})
+    for sender in senders.values():
+        await sender.close()
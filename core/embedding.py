@@ -1,15 +1,24 @@
+import asyncio
+import hashlib
 import json
 import logging
 import os
 import sqlite3
+import threading
+import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import psycopg2
-from openai import OpenAI
+from psycopg2.extras import execute_values
 from sklearn.metrics.pairwise import cosine_similarity
 
+from core.openai_clients import get_async_openai_client, get_openai_client
+from decorators import TTLCache, cache_registry
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -46,6 +55,12 @@ class SQLiteConfig(StorageConfig):
 
     db_path: str = "embeddings.db"
     table_name: str = "message_embeddings"
+    # Embeddings are stored as binary float32 or float16, existing databases are converted on initialize
+    embedding_dtype: str = field(default_factory=lambda: os.getenv("SQLITE_EMBEDDING_DTYPE", "float32"))
+    # Approximate search over IVF lists for partitions of at least ann_min_rows rows, saved next to the database
+    ann_index: bool = field(default_factory=lambda: os.getenv("SQLITE_ANN_INDEX", "false").lower() == "true")
+    ann_min_rows: int = field(default_factory=lambda: int(os.getenv("SQLITE_ANN_MIN_ROWS", "20000")))
+    ann_probes: int = field(default_factory=lambda: int(os.getenv("SQLITE_ANN_PROBES", "10")))
 
 
 @dataclass
@@ -76,11 +91,28 @@ class VectorStorageProvider(ABC):
         """Store a message and its metadata with embedding"""
         pass
 
+    def store_embeddings_bulk(self, messages: List[MessageData]) -> None:
+        """Store many messages, in a single transaction for providers that override this"""
+        for message_data in messages:
+            self.store_embedding(message_data)
+
     @abstractmethod
     def find_similar(
-        self, embedding: List[float], threshold: float = 0.8, message_type: str = None, chat_id: str = None
+        self,
+        embedding: List[float],
+        threshold: float = 0.8,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Find similar messages based on embedding similarity"""
+        """
+        Find similar messages based on embedding similarity, most similar first, at most limit if given.
+
+        Providers with an approximate index search its probes nearest lists: more probes trade latency for recall.
+        exact=True bypasses the approximate index.
+        """
         pass
 
     @abstractmethod
@@ -188,12 +220,62 @@ class PostgresVectorStorage(VectorStorageProvider):
             logger.error(f"Failed to store message: {str(e)}")
             raise
 
+    def store_embeddings_bulk(self, messages: List[MessageData]) -> None:
+        """Store many messages in PostgreSQL with multi-row inserts, committed once"""
+        if not messages:
+            return
+        try:
+            with self.conn.cursor() as cur:
+                execute_values(
+                    cur,
+                    f"""INSERT INTO {self.config.table_name}
+                    (message, embedding, timestamp, message_type, chat_id,
+                    source_interface, original_query, original_embedding, response_type, key_topics, tool_call)
+                    VALUES %s""",
+                    [
+                        (
+                            message_data.message,
+                            message_data.embedding,
+                            message_data.timestamp,
+                            message_data.message_type,
+                            message_data.chat_id,
+                            message_data.source_interface,
+                            message_data.original_query,
+                            message_data.original_embedding,
+                            message_data.response_type,
+                            message_data.key_topics,
+                            message_data.tool_call,
+                        )
+                        for message_data in messages
+                    ],
+                    page_size=500,
+                )
+            self.conn.commit()
+            logger.info(f"Successfully stored {len(messages)} messages in database")
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"Failed to store messages: {str(e)}")
+            raise
+
     def find_similar(
-        self, embedding: List[float], threshold: float = 0.8, message_type: str = None, chat_id: str = None
+        self,
+        embedding: List[float],
+        threshold: float = 0.8,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
     ) -> List[Dict[str, Any]]:
-        """Find similar messages using vector similarity search"""
+        """Find similar messages using vector similarity search, probing an ivfflat index if the table has one"""
         try:
             with self.conn.cursor() as cur:
+                # SET LOCAL lasts until the end of the transaction, which the commit below closes
+                if exact:
+                    cur.execute("SET LOCAL enable_indexscan = off")
+                elif probes:
+                    cur.execute(f"SET LOCAL ivfflat.probes = {int(probes)}")
+
                 query_conditions = ["1 - (embedding <=> %s::vector) >= %s"]
                 query_params = [embedding, embedding, threshold]
 
@@ -207,12 +289,15 @@ class PostgresVectorStorage(VectorStorageProvider):
 
                 where_clause = " AND ".join(query_conditions)
 
+                limit_clause = f" LIMIT {int(limit)}" if limit else ""
+
                 cur.execute(
                     f"""
                     SELECT message, 1 - (embedding <=> %s::vector) as similarity
                     FROM {self.config.table_name}
                     WHERE {where_clause}
                     ORDER BY similarity DESC
+                    {limit_clause}
                 """,
                     tuple(query_params),
                 )
@@ -220,8 +305,12 @@ class PostgresVectorStorage(VectorStorageProvider):
                 results = []
                 for message, similarity in cur.fetchall():
                     results.append({"message": message, "similarity": similarity})
-                return results
+            if exact or probes:
+                self.conn.commit()
+            return results
         except Exception as e:
+            if exact or probes:
+                self.conn.rollback()
             logger.error(f"Failed to find similar messages: {str(e)}")
             raise
 
@@ -294,10 +383,279 @@ class PostgresVectorStorage(VectorStorageProvider):
             raise
 
 
+# Rows per matrix product when assigning rows to IVF lists, to bound memory
+IVF_ASSIGN_BATCH = 8192
+
+
+class _IVFLists:
+    """
+    Inverted file over one partition, like pgvector's ivfflat: rows are grouped under the nearest of nlist
+    k-means centroids, and a search only scores the rows in the probes lists nearest to the query.
+
+    Each list keeps a contiguous copy of its vectors, rebuilt on the first search after rows were added to it.
+    """
+
+    def __init__(self, centroids: np.ndarray, trained_size: int):
+        self.centroids = centroids
+        self.trained_size = trained_size
+        self.labels: List[int] = []
+        self.lists: List[List[int]] = [[] for _ in range(len(centroids))]
+        self._positions: List[Optional[np.ndarray]] = [None] * len(centroids)
+        self._vectors: List[Optional[np.ndarray]] = [None] * len(centroids)
+
+    @staticmethod
+    def list_count(rows: int) -> int:
+        # pgvector's recommendation: rows / 1000 up to 1M rows, sqrt(rows) above
+        return max(1, rows // 1000) if rows <= 1_000_000 else int(np.sqrt(rows))
+
+    @classmethod
+    def train(cls, vectors: np.ndarray, iterations: int = 10, seed: int = 0) -> "_IVFLists":
+        """Spherical k-means on a sample of vectors, then assign every vector to its list"""
+        rng = np.random.default_rng(seed)
+        nlist = cls.list_count(len(vectors))
+        sample = vectors[rng.choice(len(vectors), min(len(vectors), nlist * 50), replace=False)]
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = cls._nearest(sample, centroids)
+            order = np.argsort(labels, kind="stable")
+            # Empty lists keep their previous centroid
+            present, starts = np.unique(labels[order], return_index=True)
+            sums = np.add.reduceat(sample[order], starts, axis=0)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids[present] = sums / np.where(norms == 0, 1, norms)
+
+        ivf = cls(centroids, len(vectors))
+        ivf.add(cls._nearest(vectors, centroids))
+        return ivf
+
+    @staticmethod
+    def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        return np.concatenate(
+            [
+                np.argmax(vectors[start : start + IVF_ASSIGN_BATCH] @ centroids.T, axis=1)
+                for start in range(0, len(vectors), IVF_ASSIGN_BATCH)
+            ]
+            or [np.empty(0, dtype=np.int64)]
+        )
+
+    def assign(self, vectors: np.ndarray) -> None:
+        """Add rows, in position order after the rows already added"""
+        self.add(self._nearest(vectors, self.centroids))
+
+    def add(self, labels: np.ndarray) -> None:
+        for label in labels.tolist():
+            self.lists[label].append(len(self.labels))
+            self.labels.append(label)
+            self._positions[label] = None
+
+    def search(self, query: np.ndarray, probes: int, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and scores of the rows in the probes lists nearest to query, vectors holding every row"""
+        probes = min(probes, len(self.centroids))
+        nearest = np.argpartition(-(self.centroids @ query), probes - 1)[:probes]
+        positions, scores = [], []
+        for label in nearest:
+            if self._positions[label] is None:
+                self._positions[label] = np.asarray(self.lists[label], dtype=np.int64)
+                self._vectors[label] = vectors[self._positions[label]]
+            positions.append(self._positions[label])
+            scores.append(self._vectors[label] @ query)
+        return np.concatenate(positions), np.concatenate(scores)
+
+
+class _IndexPartition:
+    """Normalized float32 embeddings of one (message_type, chat_id) pair, in a buffer grown by doubling"""
+
+    def __init__(self, dim: int):
+        self.vectors = np.empty((16, dim), dtype=np.float32)
+        self.messages: List[str] = []
+        self.row_ids: List[int] = []
+        self.ivf: Optional[_IVFLists] = None
+
+    @property
+    def dim(self) -> int:
+        return self.vectors.shape[1]
+
+    def add(self, row_id: int, message: str, vector: np.ndarray) -> None:
+        size = len(self.messages)
+        if size == len(self.vectors):
+            self.vectors = np.concatenate([self.vectors, np.empty_like(self.vectors)])
+        self.vectors[size] = vector
+        self.messages.append(message)
+        self.row_ids.append(row_id)
+        if self.ivf is not None:
+            self.ivf.assign(vector[np.newaxis])
+
+    def search(self, query: np.ndarray, threshold: float, probes: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Positions and scores of the rows scoring at least threshold, only looking at probes lists if given"""
+        if probes is None or self.ivf is None:
+            scores = self.vectors[: len(self.messages)] @ query
+            hits = np.flatnonzero(scores >= threshold)
+            return hits, scores[hits]
+        positions, scores = self.ivf.search(query, probes, self.vectors)
+        keep = scores >= threshold
+        return positions[keep], scores[keep]
+
+
+class SimilarityIndex:
+    """
+    In-memory cosine similarity index over stored embeddings, partitioned by message_type and chat_id.
+
+    Vectors are normalized once when added, so a search is one matrix-vector product per matching partition.
+    With ann_min_rows set, partitions of at least that many rows also get IVF lists, so approximate searches
+    only score the rows in the lists nearest to the query.
+    """
+
+    def __init__(self, ann_min_rows: Optional[int] = None, ann_probes: int = 10):
+        self.ann_min_rows = ann_min_rows
+        self.ann_probes = ann_probes
+        self._partitions: Dict[Tuple[Optional[str], Optional[str]], _IndexPartition] = {}
+        self._lock = threading.Lock()
+        self.max_id = 0
+        # IVF changes since the lists were last saved
+        self.unsaved_changes = 0
+
+    def __len__(self) -> int:
+        return sum(len(partition.messages) for partition in self._partitions.values())
+
+    @staticmethod
+    def _normalize(embedding: Sequence[float]) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def add(
+        self, row_id: int, message: str, embedding: Sequence[float], message_type: str, chat_id: Optional[str]
+    ) -> None:
+        vector = self._normalize(embedding)
+        with self._lock:
+            self.max_id = max(self.max_id, row_id)
+            partition = self._partitions.get((message_type, chat_id))
+            if partition is None:
+                partition = self._partitions[(message_type, chat_id)] = _IndexPartition(len(vector))
+            if partition.dim != len(vector):
+                logger.warning(f"Skipping embedding of dimension {len(vector)} in index of dimension {partition.dim}")
+                return
+            partition.add(row_id, message, vector)
+            if partition.ivf is not None:
+                self.unsaved_changes += 1
+
+    def _train_if_needed(self, partition: _IndexPartition) -> None:
+        size = len(partition.messages)
+        if not self.ann_min_rows or size < self.ann_min_rows:
+            return
+        # Lists trained on a much smaller partition get unbalanced, so they are retrained as it grows
+        if partition.ivf is not None and size < 4 * partition.ivf.trained_size:
+            return
+        start = time.monotonic()
+        partition.ivf = _IVFLists.train(partition.vectors[:size])
+        self.unsaved_changes += size
+        elapsed = time.monotonic() - start
+        logger.info(f"Trained {len(partition.ivf.centroids)} IVF lists over {size} embeddings in {elapsed:.2f}s")
+
+    def search(
+        self,
+        embedding: List[float],
+        threshold: float,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        query = self._normalize(embedding)
+        if exact or not self.ann_min_rows:
+            probes = None
+        elif probes is None:
+            probes = self.ann_probes
+        scores, messages = [], []
+        with self._lock:
+            for (partition_type, partition_chat_id), partition in self._partitions.items():
+                if (message_type and partition_type != message_type) or (chat_id and partition_chat_id != chat_id):
+                    continue
+                if partition.dim != len(query):
+                    continue
+                if probes is not None:
+                    self._train_if_needed(partition)
+                hits, hit_scores = partition.search(query, threshold, probes)
+                scores.append(hit_scores)
+                messages.extend(partition.messages[i] for i in hits.tolist())
+
+        if not messages:
+            return []
+        scores = np.concatenate(scores)
+        if limit and len(scores) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            order = top[np.argsort(-scores[top], kind="stable")]
+        else:
+            order = np.argsort(-scores, kind="stable")
+        return [{"message": messages[i], "similarity": float(scores[i])} for i in order]
+
+    def save_ann(self, path: str) -> None:
+        """Write the IVF lists to path, replacing it atomically"""
+        with self._lock:
+            keys, arrays = [], {}
+            for key, partition in self._partitions.items():
+                if partition.ivf is None:
+                    continue
+                i = len(keys)
+                keys.append(list(key))
+                arrays[f"centroids_{i}"] = partition.ivf.centroids
+                arrays[f"trained_size_{i}"] = np.array(partition.ivf.trained_size)
+                arrays[f"row_ids_{i}"] = np.asarray(partition.row_ids, dtype=np.int64)
+                arrays[f"labels_{i}"] = np.asarray(partition.ivf.labels, dtype=np.int32)
+            arrays["keys"] = np.array(json.dumps(keys))
+            self.unsaved_changes = 0
+
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+    def load_ann(self, path: str) -> None:
+        """Restore IVF lists saved by save_ann for the partitions already loaded, assigning rows added since"""
+        if not os.path.exists(path):
+            return
+        with np.load(path) as saved, self._lock:
+            for i, key in enumerate(json.loads(str(saved["keys"]))):
+                partition = self._partitions.get(tuple(key))
+                centroids = saved[f"centroids_{i}"]
+                if partition is None or partition.dim != centroids.shape[1]:
+                    continue
+                ivf = _IVFLists(centroids, int(saved[f"trained_size_{i}"]))
+                saved_row_ids = saved[f"row_ids_{i}"]
+                # Rows are loaded in id order, so the rows known to the saved lists come first
+                known = len(saved_row_ids)
+                if not np.array_equal(np.asarray(partition.row_ids[:known], dtype=np.int64), saved_row_ids):
+                    logger.warning(f"Saved IVF lists for {key} don't match the stored rows, ignoring them")
+                    continue
+                ivf.add(saved[f"labels_{i}"])
+                ivf.assign(partition.vectors[known : len(partition.messages)])
+                partition.ivf = ivf
+                self.unsaved_changes += len(partition.messages) - known
+        logger.info(f"Loaded IVF lists from {path}")
+
+
+# Table recording how each embeddings table stores its vectors, tables missing from it store JSON text
+SQLITE_FORMAT_TABLE = "embedding_storage_format"
+SQLITE_EMBEDDING_DTYPES = ("float32", "float16")
+# IVF list changes after which the lists are saved again
+SQLITE_ANN_SAVE_INTERVAL = 1000
+
+
 class SQLiteVectorStorage(VectorStorageProvider):
     def __init__(self, config: SQLiteConfig):
+        if config.embedding_dtype not in SQLITE_EMBEDDING_DTYPES:
+            raise ValueError(f"embedding_dtype must be one of {SQLITE_EMBEDDING_DTYPES}, got {config.embedding_dtype}")
         self.config = config
+        self.dtype = np.dtype(config.embedding_dtype)
         self.conn = None
+        # Loaded on the first search, unless SQLITE_SIMILARITY_INDEX=false
+        self.index: Optional[SimilarityIndex] = None
+        self._index_lock = threading.Lock()
+        # IVF lists are saved next to the database, so they aren't retrained on every start
+        self.ann_path = None
+        if config.ann_index and config.db_path != ":memory:":
+            self.ann_path = f"{config.db_path}.{config.table_name}.ivf.npz"
 
     def initialize(self) -> None:
         """Initialize SQLite connection and create necessary tables"""
@@ -309,63 +667,180 @@ class SQLiteVectorStorage(VectorStorageProvider):
                     CREATE TABLE IF NOT EXISTS {self.config.table_name} (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         message TEXT NOT NULL,
-                        embedding TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
                         timestamp TEXT NOT NULL,
                         message_type TEXT NOT NULL,
                         chat_id TEXT,
                         source_interface TEXT,
                         original_query TEXT,
-                        original_embedding TEXT,
+                        original_embedding BLOB,
                         response_type TEXT,
                         key_topics TEXT,
                         tool_call TEXT,
                         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
                     )
                 """)
+                cur.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {SQLITE_FORMAT_TABLE} (
+                        table_name TEXT PRIMARY KEY,
+                        dtype TEXT NOT NULL
+                    )
+                """)
+            self._migrate_embeddings()
             logger.info(f"Initialized SQLite storage at {self.config.db_path}")
         except Exception as e:
             logger.error(f"Failed to initialize SQLite storage: {str(e)}")
             raise
 
+    def _row(self, message_data: MessageData) -> Tuple:
+        return (
+            message_data.message,
+            self._encode_embedding(message_data.embedding),
+            message_data.timestamp,
+            message_data.message_type,
+            message_data.chat_id,
+            message_data.source_interface,
+            message_data.original_query,
+            self._encode_embedding(message_data.original_embedding) if message_data.original_embedding else None,
+            message_data.response_type,
+            json.dumps(message_data.key_topics) if message_data.key_topics else None,
+            message_data.tool_call,
+        )
+
+    def _insert_rows(self, rows: List[Tuple]) -> None:
+        with self.conn:
+            self.conn.executemany(
+                f"""INSERT INTO {self.config.table_name}
+                (message, embedding, timestamp, message_type, chat_id,
+                source_interface, original_query, original_embedding, response_type, key_topics, tool_call)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                rows,
+            )
+        with self._index_lock:
+            if self.index is not None:
+                self._sync_index()
+
     def store_embedding(self, message_data: MessageData) -> None:
         """Store a message and its embedding in SQLite"""
         try:
-            embedding_json = json.dumps(message_data.embedding)
-            original_embedding_json = (
-                json.dumps(message_data.original_embedding) if message_data.original_embedding else None
-            )
-            key_topics_json = json.dumps(message_data.key_topics) if message_data.key_topics else None
-
-            with self.conn:
-                self.conn.execute(
-                    f"""INSERT INTO {self.config.table_name}
-                    (message, embedding, timestamp, message_type, chat_id,
-                    source_interface, original_query, original_embedding, response_type, key_topics, tool_call)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                    (
-                        message_data.message,
-                        embedding_json,
-                        message_data.timestamp,
-                        message_data.message_type,
-                        message_data.chat_id,
-                        message_data.source_interface,
-                        message_data.original_query,
-                        original_embedding_json,
-                        message_data.response_type,
-                        key_topics_json,
-                        message_data.tool_call,
-                    ),
-                )
+            self._insert_rows([self._row(message_data)])
             logger.info("Successfully stored message with metadata in database")
         except Exception as e:
             logger.error(f"Failed to store message: {str(e)}")
             raise
 
+    def store_embeddings_bulk(self, messages: List[MessageData]) -> None:
+        """Store many messages in SQLite in a single transaction"""
+        if not messages:
+            return
+        try:
+            self._insert_rows([self._row(message_data) for message_data in messages])
+            logger.info(f"Successfully stored {len(messages)} messages in database")
+        except Exception as e:
+            logger.error(f"Failed to store messages: {str(e)}")
+            raise
+
+    def _encode_embedding(self, embedding: Sequence[float]) -> bytes:
+        return np.asarray(embedding, dtype=self.dtype).tobytes()
+
+    def _decode_embedding(self, value: Union[bytes, str], dtype: Optional[np.dtype] = None) -> np.ndarray:
+        """Read-only view of a stored embedding, rows written as JSON text by older versions are parsed"""
+        if isinstance(value, str):
+            return np.asarray(json.loads(value), dtype=np.float32)
+        return np.frombuffer(value, dtype=dtype or self.dtype)
+
+    def _migrate_embeddings(self) -> None:
+        """Convert stored embeddings to the configured dtype, once per database and dtype"""
+        table = self.config.table_name
+        row = self.conn.execute(f"SELECT dtype FROM {SQLITE_FORMAT_TABLE} WHERE table_name = ?", (table,)).fetchone()
+        stored_dtype = row[0] if row else "json"
+        if stored_dtype == self.dtype.name:
+            return
+
+        count = self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        if count:
+            logger.info(f"Converting {count} embeddings in {table} from {stored_dtype} to {self.dtype.name}")
+        source_dtype = np.dtype(stored_dtype) if stored_dtype in SQLITE_EMBEDDING_DTYPES else None
+
+        def convert(value: Union[bytes, str, None]) -> Optional[bytes]:
+            return self._encode_embedding(self._decode_embedding(value, source_dtype)) if value is not None else None
+
+        last_id = 0
+        with self.conn:
+            while True:
+                rows = self.conn.execute(
+                    f"SELECT id, embedding, original_embedding FROM {table} WHERE id > ? ORDER BY id LIMIT 1000",
+                    (last_id,),
+                ).fetchall()
+                if not rows:
+                    break
+                self.conn.executemany(
+                    f"UPDATE {table} SET embedding = ?, original_embedding = ? WHERE id = ?",
+                    [(convert(embedding), convert(original), row_id) for row_id, embedding, original in rows],
+                )
+                last_id = rows[-1][0]
+            self.conn.execute(
+                f"INSERT OR REPLACE INTO {SQLITE_FORMAT_TABLE} (table_name, dtype) VALUES (?, ?)",
+                (table, self.dtype.name),
+            )
+        if count:
+            # Give the space of the old JSON text back to the file system
+            self.conn.execute("VACUUM")
+            logger.info(f"Converted {count} embeddings in {table} to {self.dtype.name}")
+
+    def _use_index(self) -> bool:
+        return os.getenv("SQLITE_SIMILARITY_INDEX", "true").lower() == "true"
+
+    def _sync_index(self) -> None:
+        """Add the rows stored since the index was last synced, including rows written by other processes"""
+        cur = self.conn.execute(
+            f"""SELECT id, message, embedding, message_type, chat_id FROM {self.config.table_name}
+            WHERE id > ? ORDER BY id""",
+            (self.index.max_id,),
+        )
+        while rows := cur.fetchmany(1000):
+            for row_id, message, embedding, message_type, chat_id in rows:
+                self.index.add(row_id, message, self._decode_embedding(embedding), message_type, chat_id)
+
+    def _get_index(self) -> SimilarityIndex:
+        with self._index_lock:
+            if self.index is None:
+                self.index = SimilarityIndex(
+                    ann_min_rows=self.config.ann_min_rows if self.config.ann_index else None,
+                    ann_probes=self.config.ann_probes,
+                )
+                self._sync_index()
+                logger.info(f"Loaded {len(self.index)} embeddings into the similarity index")
+                if self.ann_path:
+                    self.index.load_ann(self.ann_path)
+            else:
+                self._sync_index()
+            return self.index
+
+    def _save_ann(self, min_changes: int = SQLITE_ANN_SAVE_INTERVAL) -> None:
+        if self.ann_path and self.index is not None and self.index.unsaved_changes >= max(min_changes, 1):
+            try:
+                self.index.save_ann(self.ann_path)
+            except OSError as e:
+                logger.warning(f"Failed to save IVF lists to {self.ann_path}: {str(e)}")
+
     def find_similar(
-        self, embedding: List[float], threshold: float = 0.8, message_type: str = None, chat_id: str = None
+        self,
+        embedding: List[float],
+        threshold: float = 0.8,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
     ) -> List[Dict[str, Any]]:
         """Find similar messages using cosine similarity"""
         try:
+            if self._use_index():
+                results = self._get_index().search(embedding, threshold, message_type, chat_id, limit, probes, exact)
+                self._save_ann()
+                return results
+
             with self.conn:
                 cur = self.conn.cursor()
                 query_conditions = []
@@ -385,19 +860,20 @@ class SQLiteVectorStorage(VectorStorageProvider):
                     f"SELECT message, embedding FROM {self.config.table_name} WHERE {where_clause}", tuple(query_params)
                 )
                 results = []
-                for message, embedding_json in cur.fetchall():
-                    stored_embedding = json.loads(embedding_json)
+                for message, stored_embedding in cur.fetchall():
+                    stored_embedding = self._decode_embedding(stored_embedding)
                     similarity = compute_similarity(embedding, stored_embedding)
                     if similarity >= threshold:
                         results.append({"message": message, "similarity": similarity})
                 results.sort(key=lambda x: x["similarity"], reverse=True)
-                return results
+                return results[:limit] if limit else results
         except Exception as e:
             logger.error(f"Failed to find similar messages: {str(e)}")
             raise
 
     def close(self) -> None:
         """Close SQLite connection"""
+        self._save_ann(min_changes=1)
         if self.conn:
             self.conn.close()
 
@@ -449,7 +925,9 @@ class SQLiteVectorStorage(VectorStorageProvider):
                     tool_call,
                 ) in cur.fetchall():
                     key_topics_list = json.loads(key_topics) if key_topics else None
-                    original_embedding_list = json.loads(orig_embedding) if orig_embedding else None
+                    original_embedding_list = (
+                        self._decode_embedding(orig_embedding).tolist() if orig_embedding else None
+                    )
                     results.append(
                         {
                             "message": message,
@@ -468,6 +946,122 @@ class SQLiteVectorStorage(VectorStorageProvider):
             raise
 
 
+class EmbeddingCache:
+    """
+    Embeddings keyed by (model, sha256(text)), so a text is only sent to the embedding API once per model.
+
+    Lookups go to an in-memory LRU of max_entries embeddings first, then to a SQLite file shared by every
+    process on the host, which keeps embeddings as float32 blobs with no expiry. With db_path=None only
+    the in-memory LRU is used.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, max_entries: int = 10000):
+        self.db_path = db_path
+        self.memory = TTLCache(float("inf"), max_entries=max_entries)
+        self._lock = threading.Lock()
+        self.conn: Optional[sqlite3.Connection] = None
+        if db_path:
+            try:
+                self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+                self.conn.execute("PRAGMA journal_mode=WAL")
+                self.conn.execute("PRAGMA synchronous=NORMAL")
+                self.conn.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS embedding_cache (
+                        model TEXT NOT NULL,
+                        text_hash TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
+                        PRIMARY KEY (model, text_hash)
+                    )
+                """
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open embedding cache at {db_path}, caching in memory only: {str(e)}")
+                self.conn = None
+
+    @staticmethod
+    def _key(text: str, model: str) -> Tuple[str, str]:
+        return model, hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_memory(self, text: str, model: str) -> Optional[list]:
+        """Embedding of text from the in-memory LRU only, which never blocks on disk"""
+        found, embedding = self.memory.get(repr(self._key(text, model)))
+        return embedding if found else None
+
+    def get(self, text: str, model: str) -> Optional[list]:
+        """Cached embedding of text, or None"""
+        embedding = self.get_memory(text, model)
+        return embedding if embedding is not None else self.get_stored(text, model)
+
+    def get_stored(self, text: str, model: str) -> Optional[list]:
+        """Embedding of text from the SQLite file, added to the in-memory LRU when found"""
+        if self.conn is None:
+            return None
+        key = self._key(text, model)
+        try:
+            with self._lock:
+                row = self.conn.execute(
+                    "SELECT embedding FROM embedding_cache WHERE model = ? AND text_hash = ?", key
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache lookup failed: {str(e)}")
+            return None
+        if row is None:
+            return None
+        embedding = np.frombuffer(row[0], dtype=np.float32).tolist()
+        self.memory.set(repr(key), embedding)
+        return embedding
+
+    def set(self, text: str, model: str, embedding: list) -> None:
+        self.set_many(model, [(text, embedding)])
+
+    def set_many(self, model: str, items: List[Tuple[str, list]]) -> None:
+        """Cache (text, embedding) pairs of one model, written to SQLite in a single transaction"""
+        rows = []
+        for text, embedding in items:
+            key = self._key(text, model)
+            self.memory.set(repr(key), embedding)
+            rows.append((*key, np.asarray(embedding, dtype=np.float32).tobytes()))
+        if self.conn is None or not rows:
+            return
+        try:
+            with self._lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_cache (model, text_hash, embedding) VALUES (?, ?, ?)", rows
+                )
+                self.conn.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Embedding cache write failed: {str(e)}")
+
+    def close(self) -> None:
+        if self.conn:
+            self.conn.close()
+            self.conn = None
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Cache used by get_embedding when EMBEDDING_CACHE_ENABLED=true, otherwise None. Embeddings are persisted
+    to EMBEDDING_CACHE_PATH (default embedding_cache.db, empty for memory only).
+    """
+    global _embedding_cache
+    if os.getenv("EMBEDDING_CACHE_ENABLED", "false").lower() != "true":
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.db") or None,
+                max_entries=int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "10000")),
+            )
+            cache_registry["core.embedding"] = _embedding_cache.memory
+    return _embedding_cache
+
+
 def get_embedding(text: str, model: str = "BAAI/bge-large-en-v1.5") -> list:
     """
     Generate an embedding for the given text using Heurist's API.
@@ -477,24 +1071,131 @@ def get_embedding(text: str, model: str = "BAAI/bge-large-en-v1.5") -> list:
         model (str): The model to use for embedding generation (default is kept for compatibility)
 
     Returns:
-        list: The embedding vector
+        list: The embedding vector, from the embedding cache if the text was embedded before
 
     Raises:
         EmbeddingError: If embedding generation fails
     """
+    cache = get_embedding_cache()
+    embedding = cache.get(text, model) if cache else None
+    if embedding is not None:
+        return embedding
     try:
-        client = OpenAI(api_key=os.environ.get("HEURIST_API_KEY"), base_url=os.environ.get("HEURIST_BASE_URL"))
+        client = get_openai_client(os.environ.get("HEURIST_BASE_URL"), os.environ.get("HEURIST_API_KEY"))
 
         response = client.embeddings.create(model=model, input=text, encoding_format="float")
 
         # Return the embedding vector for the input text
-        return response.data[0].embedding
+        embedding = response.data[0].embedding
+        if cache:
+            cache.set(text, model, embedding)
+        return embedding
 
     except Exception as e:
         logger.error(f"Failed to generate embedding: {str(e)}")
         raise EmbeddingError(f"Embedding generation failed: {str(e)}")
 
 
+async def get_embedding_async(text: str, model: str = "BAAI/bge-large-en-v1.5") -> list:
+    """Async version of get_embedding, only looking up the on-disk cache off the event loop"""
+    cache = get_embedding_cache()
+    loop = asyncio.get_running_loop()
+    if cache:
+        embedding = cache.get_memory(text, model)
+        if embedding is None and cache.conn is not None:
+            embedding = await loop.run_in_executor(None, cache.get_stored, text, model)
+        if embedding is not None:
+            return embedding
+    try:
+        client = get_async_openai_client(os.environ.get("HEURIST_BASE_URL"), os.environ.get("HEURIST_API_KEY"))
+
+        response = await client.embeddings.create(model=model, input=text, encoding_format="float")
+
+        # Return the embedding vector for the input text
+        embedding = response.data[0].embedding
+        if cache:
+            await loop.run_in_executor(None, cache.set, text, model, embedding)
+        return embedding
+
+    except Exception as e:
+        logger.error(f"Failed to generate embedding: {str(e)}")
+        raise EmbeddingError(f"Embedding generation failed: {str(e)}")
+
+
+def _plan_embedding_batches(
+    texts: List[str], model: str, batch_size: Optional[int]
+) -> Tuple[Dict[str, list], List[List[str]]]:
+    """Cached embeddings of texts, and the batches of distinct texts left to embed"""
+    cache = get_embedding_cache()
+    found, missing = {}, []
+    for text in dict.fromkeys(texts):
+        embedding = cache.get(text, model) if cache else None
+        if embedding is None:
+            missing.append(text)
+        else:
+            found[text] = embedding
+    batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+    return found, [missing[start : start + batch_size] for start in range(0, len(missing), batch_size)]
+
+
+def _batch_embeddings(batch: List[str], response) -> List[list]:
+    data = sorted(response.data, key=lambda item: item.index)
+    if len(data) != len(batch):
+        raise EmbeddingError(f"Expected {len(batch)} embeddings, got {len(data)}")
+    return [item.embedding for item in data]
+
+
+def get_embeddings(
+    texts: List[str],
+    model: str = "BAAI/bge-large-en-v1.5",
+    batch_size: Optional[int] = None,
+    max_concurrency: Optional[int] = None,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> List[list]:
+    """
+    Generate embeddings for many texts, sending batch_size texts per request and at most max_concurrency
+    requests at once (EMBEDDING_BATCH_SIZE and EMBEDDING_MAX_CONCURRENCY, default 64 and 4).
+
+    Cached and repeated texts are only embedded once. progress, if given, is called with the number of
+    texts embedded so far and the number to embed after each batch.
+
+    Returns:
+        list: The embedding vectors, in the order of texts
+
+    Raises:
+        EmbeddingError: If a batch fails
+    """
+    found, batches = _plan_embedding_batches(texts, model, batch_size)
+    total, done = sum(len(batch) for batch in batches), 0
+    if batches:
+        client = get_openai_client(os.environ.get("HEURIST_BASE_URL"), os.environ.get("HEURIST_API_KEY"))
+        cache = get_embedding_cache()
+        max_concurrency = max_concurrency or int(os.getenv("EMBEDDING_MAX_CONCURRENCY", "4"))
+
+        def embed(batch: List[str]) -> List[list]:
+            response = client.embeddings.create(model=model, input=batch, encoding_format="float")
+            return _batch_embeddings(batch, response)
+
+        with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embeddings") as pool:
+            futures = {pool.submit(embed, batch): batch for batch in batches}
+            try:
+                for future in as_completed(futures):
+                    batch = futures[future]
+                    items = list(zip(batch, future.result()))
+                    found.update(items)
+                    if cache:
+                        cache.set_many(model, items)
+                    done += len(batch)
+                    if progress:
+                        progress(done, total)
+            except Exception as e:
+                # Batches embedded so far are cached, so a retry only sends the rest
+                pool.shutdown(wait=False, cancel_futures=True)
+                logger.error(f"Failed to generate embeddings: {str(e)}")
+                raise EmbeddingError(f"Embedding generation failed: {str(e)}")
+    return [found[text] for text in texts]
+
+
 def compute_similarity(embedding1: list, embedding2: list) -> float:
     """
     Compute cosine similarity between two embeddings.
@@ -509,11 +1210,53 @@ def compute_similarity(embedding1: list, embedding2: list) -> float:
     return cosine_similarity([embedding1], [embedding2])[0][0]
 
 
+def drop_near_duplicates(embeddings: Sequence[Sequence[float]], threshold: float = 0.99) -> List[int]:
+    """
+    Indices of the embeddings to keep, dropping each one whose cosine similarity to an earlier kept one is at
+    least threshold.
+
+    Args:
+        embeddings (list): Embedding vectors, in order of preference
+        threshold (float): Similarity from which two embeddings are considered the same content
+
+    Returns:
+        list: Indices of the kept embeddings, in order
+    """
+    kept: List[int] = []
+    if len(embeddings) == 0:
+        return kept
+    vectors = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors = vectors / np.where(norms == 0, 1, norms)
+    for index, vector in enumerate(vectors):
+        if kept and float(np.max(vectors[kept] @ vector)) >= threshold:
+            continue
+        kept.append(index)
+    return kept
+
+
 class MessageStore:
     def __init__(self, storage_provider: VectorStorageProvider):
         """Initialize the store with a storage provider."""
         self.storage_provider = storage_provider
-        self.storage_provider.initialize()
+        # Storage providers are blocking and share one connection, so every call, sync or async and from any
+        # thread (e.g. the post-processing loop), goes through a single worker thread
+        self._worker_thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="message-store", initializer=self._set_worker_thread
+        )
+        self._run(self.storage_provider.initialize)
+
+    def _set_worker_thread(self) -> None:
+        self._worker_thread = threading.current_thread()
+
+    def _run(self, func, *args):
+        if threading.current_thread() is self._worker_thread:
+            return func(*args)
+        return self._executor.submit(func, *args).result()
+
+    async def _run_in_executor(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
 
     def add_message(self, message_data: MessageData) -> None:
         """
@@ -522,10 +1265,26 @@ class MessageStore:
         Args:
             message_data (MessageData): The message data to store
         """
-        self.storage_provider.store_embedding(message_data)
+        self._run(self.storage_provider.store_embedding, message_data)
+
+    def add_messages(self, messages: List[MessageData]) -> None:
+        """
+        Add many messages and their embeddings to the store, in a single transaction where the provider supports it.
+
+        Args:
+            messages (list): The message data to store
+        """
+        self._run(self.storage_provider.store_embeddings_bulk, messages)
 
     def find_similar_messages(
-        self, embedding: List[float], threshold: float = 0.8, message_type: str = None, chat_id: str = None
+        self,
+        embedding: List[float],
+        threshold: float = 0.8,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Find messages similar to the given embedding.
@@ -535,15 +1294,52 @@ class MessageStore:
             threshold (float): Similarity threshold (0-1) to consider a message as similar
             message_type (str, optional): Filter by message type
             chat_id (str, optional): Filter by chat ID
+            limit (int, optional): Maximum number of messages to return, most similar first
+            probes (int, optional): Index lists to search with approximate search, more is slower with better recall
+            exact (bool): Compare against every stored embedding instead of using an approximate index
 
         Returns:
             list: List of dictionaries containing similar messages and their similarity scores
         """
-        return self.storage_provider.find_similar(embedding, threshold, message_type, chat_id)
+        return self._run(
+            self.storage_provider.find_similar, embedding, threshold, message_type, chat_id, limit, probes, exact
+        )
+
+    async def add_message_async(self, message_data: MessageData) -> None:
+        """Async version of add_message, runs the storage call off the event loop"""
+        await self._run_in_executor(self.storage_provider.store_embedding, message_data)
+
+    async def find_similar_messages_async(
+        self,
+        embedding: List[float],
+        threshold: float = 0.8,
+        message_type: str = None,
+        chat_id: str = None,
+        limit: int = None,
+        probes: int = None,
+        exact: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Async version of find_similar_messages, runs the storage call off the event loop"""
+        return await self._run_in_executor(
+            self.storage_provider.find_similar, embedding, threshold, message_type, chat_id, limit, probes, exact
+        )
+
+    async def find_messages_async(
+        self, message_type: str = None, original_query: str = None, chat_id: str = None, limit: int = None
+    ) -> List[Dict]:
+        """Async version of find_messages, runs the storage call off the event loop"""
+        return await self._run_in_executor(
+            self.storage_provider.find_messages, message_type, original_query, chat_id, limit
+        )
 
     def __del__(self):
         """Cleanup resources when the store is destroyed"""
-        self.storage_provider.close()
+        try:
+            self._executor.submit(self.storage_provider.close)
+        except RuntimeError:
+            # The executor is already shut down, e.g. at interpreter exit
+            self.storage_provider.close()
+        self._executor.shutdown(wait=False)
 
     def find_messages(
         self, message_type: str = None, original_query: str = None, chat_id: str = None, limit: int = None
@@ -560,4 +1356,4 @@ class MessageStore:
         Returns:
             List[Dict]: List of matching messages with their metadata
         """
-        return self.storage_provider.find_messages(message_type, original_query, chat_id, limit)
+        return self._run(self.storage_provider.find_messages, message_type, original_query, chat_id, limit)
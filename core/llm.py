@@ -1,18 +1,29 @@
 import asyncio
+import copy
+import functools
 import json
 import logging
+import os
 import re
 import time
+import weakref
+from dataclasses import dataclass
 from types import SimpleNamespace
-from typing import Dict, List, Union
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple, TypeVar, Union
 
-import requests
-from openai import AsyncOpenAI, OpenAI
+from core.openai_clients import get_async_openai_client, get_openai_client
+from core.resilience import CircuitOpenError, backoff_delay, call_tracked, get_model_health, is_client_error, run_hedged
+from decorators import TTLCache, cache_registry, make_cache_key
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Opt-in cache of non-streamed LLM responses, see _response_cache_key
+_llm_response_cache: Optional[TTLCache] = None
+
+T = TypeVar("T")
+
 
 class LLMError(Exception):
     """Custom exception for LLM-related errors"""
@@ -29,6 +40,236 @@ def _format_messages(system_prompt: str = None, user_prompt: str = None, message
     raise ValueError("Either (system_prompt, user_prompt) or messages must be provided")
 
 
+def _call_key(*args) -> Optional[str]:
+    # Calls whose messages hold values JSON can't represent (e.g. SDK message objects) are neither cached nor coalesced
+    try:
+        return make_cache_key(*args)
+    except (TypeError, ValueError):
+        return None
+
+
+def _response_cache_key(
+    cache: Optional[bool],
+    api_key: str,
+    base_url: str,
+    model_id: str,
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: Optional[int],
+    tools: List[Dict] = None,
+    tool_choice: str = None,
+) -> Optional[str]:
+    """
+    Cache key of an LLM call, or None if its response must not be cached.
+
+    With cache=None, calls are cached when LLM_CACHE_ENABLED=true and their temperature is at most
+    LLM_CACHE_MAX_TEMPERATURE (default 0.2). The key is hashed and includes the API key, so responses are
+    never shared between credentials.
+    """
+    if cache is False:
+        return None
+    if cache is None:
+        if os.getenv("LLM_CACHE_ENABLED", "false").lower() != "true":
+            return None
+        if temperature > float(os.getenv("LLM_CACHE_MAX_TEMPERATURE", "0.2")):
+            return None
+    return _call_key(api_key, base_url, model_id, messages, temperature, max_tokens, tools, tool_choice)
+
+
+def get_llm_response_cache() -> TTLCache:
+    global _llm_response_cache
+    if _llm_response_cache is None:
+        _llm_response_cache = TTLCache(
+            float(os.getenv("LLM_CACHE_TTL", "300")),
+            max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+            max_bytes=None,
+        )
+        cache_registry["core.llm"] = _llm_response_cache
+    return _llm_response_cache
+
+
+def _get_cached_response(cache_key: str) -> Tuple[bool, Any]:
+    # Responses are copied in and out of the cache, callers may modify them (e.g. their tool_calls)
+    found, response = get_llm_response_cache().get(cache_key)
+    return found, copy.deepcopy(response)
+
+
+def _set_cached_response(cache_key: str, response: Any) -> None:
+    get_llm_response_cache().set(cache_key, copy.deepcopy(response))
+
+
+def _create_completion(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    parse: Callable[[Any], Any],
+    max_retries: int,
+    initial_retry_delay: float,
+    **create_kwargs,
+) -> Any:
+    """
+    Create a chat completion and parse it, retrying failures with jittered exponential backoff.
+
+    Calls go through the model's circuit breaker, which fails fast while the model keeps failing.
+    """
+    client = get_openai_client(base_url, api_key)
+    health = get_model_health(base_url, model_id)
+    last_error = None
+
+    for attempt in range(max_retries):
+        try:
+            response = call_tracked(health, lambda: client.chat.completions.create(model=model_id, **create_kwargs))
+            return parse(response)
+
+        except CircuitOpenError as e:
+            raise LLMError(str(e)) from e
+        except Exception as e:
+            if is_client_error(e):
+                raise LLMError(f"Request rejected by {model_id}: {str(e)}") from e
+            last_error = e
+            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
+
+            if attempt < max_retries - 1:
+                retry_delay = backoff_delay(attempt, initial_retry_delay)
+                logger.info(f"Retrying in {retry_delay:.2f} seconds...")
+                time.sleep(retry_delay)
+
+    raise LLMError(f"All retry attempts failed: {last_error}")
+
+
+async def _create_completion_async(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    parse: Callable[[Any], Any],
+    max_retries: int,
+    initial_retry_delay: float,
+    hedge_base_url: Optional[str] = None,
+    hedge_model_id: Optional[str] = None,
+    **create_kwargs,
+) -> Tuple[Any, bool]:
+    """
+    Async version of _create_completion. When hedge_model_id or hedge_base_url name another model, a
+    duplicate request is sent to it once the primary model is slower than its recent p95 latency, or has
+    failed or its circuit is open, and the first response wins.
+
+    Returns the parsed response and whether it came from the hedge model.
+    """
+
+    def create(target_base_url: str, target_model_id: str) -> Callable[[], Any]:
+        client = get_async_openai_client(target_base_url, api_key)
+        return lambda: client.chat.completions.create(model=target_model_id, **create_kwargs)
+
+    health = get_model_health(base_url, model_id)
+    alternate_call = alternate_health = None
+    hedge_target = (hedge_base_url or base_url, hedge_model_id or model_id)
+    if hedge_target != (base_url, model_id):
+        alternate_call = create(*hedge_target)
+        alternate_health = get_model_health(*hedge_target)
+    last_error = None
+
+    for attempt in range(max_retries):
+        try:
+            response, hedged = await run_hedged(create(base_url, model_id), health, alternate_call, alternate_health)
+            return parse(response), hedged
+
+        except CircuitOpenError as e:
+            raise LLMError(str(e)) from e
+        except Exception as e:
+            if is_client_error(e):
+                raise LLMError(f"Request rejected by {model_id}: {str(e)}") from e
+            last_error = e
+            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
+
+            if attempt < max_retries - 1:
+                retry_delay = backoff_delay(attempt, initial_retry_delay)
+                logger.info(f"Retrying in {retry_delay:.2f} seconds...")
+                await asyncio.sleep(retry_delay)
+
+    raise LLMError(f"All retry attempts failed: {last_error}")
+
+
+@dataclass
+class _InflightRequest:
+    task: asyncio.Task
+    waiters: int = 0
+
+
+class RequestCoalescer:
+    """
+    Shares one upstream request between concurrent async callers with the same key.
+
+    The request runs in a task of its own, so a cancelled caller doesn't cancel it for the others. It is
+    only cancelled once every caller waiting on it is gone. Each caller gets its own copy of the result, as
+    callers may modify it (e.g. the tool_calls of a response). Requests are per event loop.
+    """
+
+    def __init__(self):
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, _InflightRequest]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self.requests = 0
+        self.coalesced = 0
+
+    @staticmethod
+    def _forget(inflight: Dict[str, _InflightRequest], key: str, entry: _InflightRequest, task: asyncio.Task) -> None:
+        if inflight.get(key) is entry:
+            del inflight[key]
+        if not task.cancelled():
+            task.exception()  # Mark as retrieved in case every caller was cancelled
+
+    async def run(self, key: str, request: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        inflight = self._inflight.setdefault(loop, {})
+        entry = inflight.get(key)
+        if entry is None:
+            entry = _InflightRequest(loop.create_task(request()))
+            inflight[key] = entry
+            entry.task.add_done_callback(functools.partial(self._forget, inflight, key, entry))
+            self.requests += 1
+        else:
+            self.coalesced += 1
+
+        entry.waiters += 1
+        try:
+            return copy.deepcopy(await asyncio.shield(entry.task))
+        finally:
+            entry.waiters -= 1
+            if entry.waiters == 0 and not entry.task.done():
+                # Everyone waiting was cancelled, new callers start a fresh request
+                if inflight.get(key) is entry:
+                    del inflight[key]
+                entry.task.cancel()
+
+
+llm_request_coalescer = RequestCoalescer()
+
+
+def _coalescing_key(
+    api_key: str,
+    base_url: str,
+    model_id: str,
+    messages: List[Dict],
+    temperature: float,
+    max_tokens: Optional[int],
+    tools: List[Dict] = None,
+    tool_choice: str = None,
+    hedge: Tuple[Optional[str], Optional[str]] = (None, None),
+) -> Optional[str]:
+    """
+    Key under which identical concurrent calls share one request, or None if this call must run on its own.
+
+    Calls are coalesced unless LLM_COALESCE_ENABLED=false, when their temperature is at most
+    LLM_COALESCE_MAX_TEMPERATURE (default 0.2) so one response is as good as another. The API key is part of
+    the key so each caller's request is still made with, and billed to, its own key.
+    """
+    if os.getenv("LLM_COALESCE_ENABLED", "true").lower() != "true":
+        return None
+    if temperature > float(os.getenv("LLM_COALESCE_MAX_TEMPERATURE", "0.2")):
+        return None
+    return _call_key(api_key, base_url, model_id, messages, temperature, max_tokens, tools, tool_choice, hedge)
+
+
 def call_llm(
     base_url: str,
     api_key: str,
@@ -40,6 +281,7 @@ def call_llm(
     max_tokens: int = 500,
     max_retries: int = 3,
     initial_retry_delay: int = 1,
+    cache: Optional[bool] = None,
 ) -> str:
     """
     Call LLM with retry mechanism.
@@ -51,38 +293,39 @@ def call_llm(
         temperature (float): The temperature setting for response generation.
         max_tokens (int): Maximum number of tokens to generate.
         max_retries (int): Number of retry attempts on failure.
-        initial_retry_delay (int): Initial delay between retries, with exponential backoff.
+        initial_retry_delay (int): Initial delay between retries, with jittered exponential backoff.
+        cache (bool): Use the LLM response cache. None follows LLM_CACHE_ENABLED for low temperature calls,
+            False bypasses it.
 
     Returns:
         str: Generated text from LLM.
 
     Raises:
-        LLMError: If all retry attempts fail.
+        LLMError: If all retry attempts fail, or the model's circuit breaker is open.
     """
-    client = OpenAI(base_url=base_url, api_key=api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
-    retry_delay = initial_retry_delay
-
-    for attempt in range(max_retries):
-        try:
-            result = client.chat.completions.create(
-                model=model_id,
-                messages=formatted_messages,
-                stream=False,
-                temperature=temperature,
-                max_tokens=max_tokens,
-            )
-            return _handle_tool_response(result.choices[0].message)
 
-        except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
-            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
-
-            if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2
-
-    raise LLMError("All retry attempts failed")
+    cache_key = _response_cache_key(cache, api_key, base_url, model_id, formatted_messages, temperature, max_tokens)
+    if cache_key:
+        found, response = _get_cached_response(cache_key)
+        if found:
+            return response
+
+    response = _create_completion(
+        base_url,
+        api_key,
+        model_id,
+        lambda result: _handle_tool_response(result.choices[0].message),
+        max_retries,
+        initial_retry_delay,
+        messages=formatted_messages,
+        stream=False,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    if cache_key:
+        _set_cached_response(cache_key, response)
+    return response
 
 
 def call_llm_with_tools(
@@ -97,23 +340,35 @@ def call_llm_with_tools(
     max_retries: int = 3,
     tools: List[Dict] = None,
     tool_choice: str = "auto",
+    cache: Optional[bool] = None,
+    initial_retry_delay: int = 1,
 ) -> Union[str, Dict]:
-    client = OpenAI(base_url=base_url, api_key=api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
 
-    try:
-        response = client.chat.completions.create(
-            model=model_id,
-            messages=formatted_messages,
-            temperature=temperature,
-            tools=tools,
-            tool_choice=tool_choice if tools else None,
-            max_tokens=max_tokens,
-        )
-        return _handle_tool_response(response.choices[0].message)
-
-    except Exception as e:
-        raise LLMError(f"LLM API call failed: {str(e)}")
+    cache_key = _response_cache_key(
+        cache, api_key, base_url, model_id, formatted_messages, temperature, max_tokens, tools, tool_choice
+    )
+    if cache_key:
+        found, result = _get_cached_response(cache_key)
+        if found:
+            return result
+
+    result = _create_completion(
+        base_url,
+        api_key,
+        model_id,
+        lambda response: _handle_tool_response(response.choices[0].message),
+        max_retries,
+        initial_retry_delay,
+        messages=formatted_messages,
+        temperature=temperature,
+        tools=tools,
+        tool_choice=tool_choice if tools else None,
+        max_tokens=max_tokens,
+    )
+    if cache_key:
+        _set_cached_response(cache_key, result)
+    return result
 
 
 async def call_llm_async(
@@ -127,34 +382,171 @@ async def call_llm_async(
     max_tokens: int = 500,
     max_retries: int = 3,
     initial_retry_delay: int = 1,
+    cache: Optional[bool] = None,
+    hedge_model_id: Optional[str] = None,
+    hedge_base_url: Optional[str] = None,
 ) -> str:
-    client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    """
+    Async version of call_llm.
+
+    With hedge_model_id (e.g. the agent's small_model_id) or hedge_base_url, a slow or failing request is
+    duplicated to that model or endpoint and the first response is used. Hedged responses are not cached.
+    """
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+
+    cache_key = _response_cache_key(cache, api_key, base_url, model_id, formatted_messages, temperature, max_tokens)
+    if cache_key:
+        found, content = _get_cached_response(cache_key)
+        if found:
+            return content
+
+    request = functools.partial(
+        _create_completion_async,
+        base_url,
+        api_key,
+        model_id,
+        lambda result: result.choices[0].message.content,
+        max_retries,
+        initial_retry_delay,
+        hedge_base_url=hedge_base_url,
+        hedge_model_id=hedge_model_id,
+        messages=formatted_messages,
+        stream=False,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+    coalescing_key = _coalescing_key(
+        api_key, base_url, model_id, formatted_messages, temperature, max_tokens, hedge=(hedge_base_url, hedge_model_id)
+    )
+    if coalescing_key:
+        content, hedged = await llm_request_coalescer.run(coalescing_key, request)
+    else:
+        content, hedged = await request()
+    if cache_key and not hedged:
+        _set_cached_response(cache_key, content)
+    return content
+
+
+async def call_llm_with_tools_async(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    max_retries: int = 3,
+    tools: List[Dict] = None,
+    tool_choice: str = "auto",
+    cache: Optional[bool] = None,
+    initial_retry_delay: int = 1,
+    hedge_model_id: Optional[str] = None,
+    hedge_base_url: Optional[str] = None,
+) -> Union[str, Dict]:
+    """Async version of call_llm_with_tools, hedged like call_llm_async"""
+    formatted_messages = _format_messages(system_prompt, user_prompt, messages)
+
+    cache_key = _response_cache_key(
+        cache, api_key, base_url, model_id, formatted_messages, temperature, max_tokens, tools, tool_choice
+    )
+    if cache_key:
+        found, result = _get_cached_response(cache_key)
+        if found:
+            return result
+
+    request = functools.partial(
+        _create_completion_async,
+        base_url,
+        api_key,
+        model_id,
+        lambda response: _handle_tool_response(response.choices[0].message),
+        max_retries,
+        initial_retry_delay,
+        hedge_base_url=hedge_base_url,
+        hedge_model_id=hedge_model_id,
+        messages=formatted_messages,
+        temperature=temperature,
+        tools=tools,
+        tool_choice=tool_choice if tools else None,
+        max_tokens=max_tokens,
+    )
+    coalescing_key = _coalescing_key(
+        api_key,
+        base_url,
+        model_id,
+        formatted_messages,
+        temperature,
+        max_tokens,
+        tools,
+        tool_choice,
+        hedge=(hedge_base_url, hedge_model_id),
+    )
+    if coalescing_key:
+        result, hedged = await llm_request_coalescer.run(coalescing_key, request)
+    else:
+        result, hedged = await request()
+    if cache_key and not hedged:
+        _set_cached_response(cache_key, result)
+    return result
+
+
+def call_llm_stream(
+    base_url: str,
+    api_key: str,
+    model_id: str,
+    system_prompt: str = None,
+    user_prompt: str = None,
+    messages: List[Dict] = None,
+    temperature: float = 0.7,
+    max_tokens: int = 500,
+    max_retries: int = 3,
+    initial_retry_delay: int = 1,
+) -> Iterator[str]:
+    """
+    Streaming version of call_llm, yields the generated text as it arrives.
+
+    Failures are retried only until the first chunk has been yielded.
+
+    Raises:
+        LLMError: If all retry attempts fail, or the stream breaks after output has started.
+    """
+    client = get_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
-    retry_delay = initial_retry_delay
 
     for attempt in range(max_retries):
+        started = False
         try:
-            result = await client.chat.completions.create(
+            stream = client.chat.completions.create(
                 model=model_id,
                 messages=formatted_messages,
-                stream=False,
+                stream=True,
                 temperature=temperature,
                 max_tokens=max_tokens,
             )
-            return result.choices[0].message.content
-
-        except (requests.exceptions.RequestException, KeyError, IndexError, json.JSONDecodeError, Exception) as e:
+            for chunk in stream:
+                delta = _stream_delta(chunk)
+                if delta:
+                    started = True
+                    yield delta
+            return
+
+        except Exception as e:
+            if started:
+                raise LLMError(f"LLM stream interrupted: {str(e)}")
+            if is_client_error(e):
+                raise LLMError(f"Request rejected by {model_id}: {str(e)}") from e
             logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
 
             if attempt < max_retries - 1:
-                logger.info(f"Retrying in {retry_delay} seconds...")
-                await asyncio.sleep(retry_delay)
-                retry_delay *= 2
+                retry_delay = backoff_delay(attempt, initial_retry_delay)
+                logger.info(f"Retrying in {retry_delay:.2f} seconds...")
+                time.sleep(retry_delay)
 
     raise LLMError("All retry attempts failed")
 
 
-async def call_llm_with_tools_async(
+async def call_llm_stream_async(
     base_url: str,
     api_key: str,
     model_id: str,
@@ -164,58 +556,94 @@ async def call_llm_with_tools_async(
     temperature: float = 0.7,
     max_tokens: int = 500,
     max_retries: int = 3,
-    tools: List[Dict] = None,
-    tool_choice: str = "auto",
-) -> Union[str, Dict]:
-    client = AsyncOpenAI(base_url=base_url, api_key=api_key)
+    initial_retry_delay: int = 1,
+) -> AsyncIterator[str]:
+    """Async version of call_llm_stream"""
+    client = get_async_openai_client(base_url, api_key)
     formatted_messages = _format_messages(system_prompt, user_prompt, messages)
 
-    try:
-        response = await client.chat.completions.create(
-            model=model_id,
-            messages=formatted_messages,
-            temperature=temperature,
-            tools=tools,
-            tool_choice=tool_choice if tools else None,
-            max_tokens=max_tokens,
-        )
-        return _handle_tool_response(response.choices[0].message)
+    for attempt in range(max_retries):
+        started = False
+        try:
+            stream = await client.chat.completions.create(
+                model=model_id,
+                messages=formatted_messages,
+                stream=True,
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            async for chunk in stream:
+                delta = _stream_delta(chunk)
+                if delta:
+                    started = True
+                    yield delta
+            return
+
+        except Exception as e:
+            if started:
+                raise LLMError(f"LLM stream interrupted: {str(e)}")
+            if is_client_error(e):
+                raise LLMError(f"Request rejected by {model_id}: {str(e)}") from e
+            logger.warning(f"{type(e).__name__} (attempt {attempt + 1}/{max_retries}): {str(e)}")
+
+            if attempt < max_retries - 1:
+                retry_delay = backoff_delay(attempt, initial_retry_delay)
+                logger.info(f"Retrying in {retry_delay:.2f} seconds...")
+                await asyncio.sleep(retry_delay)
+
+    raise LLMError("All retry attempts failed")
 
-    except Exception as e:
-        raise LLMError(f"LLM API call failed: {str(e)}")
+
+def _stream_delta(chunk) -> str:
+    if not chunk.choices:
+        return ""
+    return chunk.choices[0].delta.content or ""
 
 
 def extract_function_calls_to_tool_calls(llm_text: str) -> SimpleNamespace:
     """
     Scan the LLM's text output for a <function=NAME>{...}</function> pattern,
-    and convert to appropriate format for tool calls
+    and convert the first match to appropriate format for tool calls
     """
-    pattern = r"<function=([^>]+)>(.*?)(?:</function>|<function>|<function/>|></function>)"
-    matches = re.findall(pattern, llm_text)
+    tool_calls = extract_all_function_calls_to_tool_calls(llm_text)
+    return tool_calls[0] if tool_calls else None
 
-    # If we find at least one match
-    if matches:
-        function_name, args_json_str = matches[0]  # Just take the first match
-        # Parse the JSON to ensure it's valid
-        parsed_args = json.loads(args_json_str.strip())
 
-        function_obj = SimpleNamespace(name=function_name, arguments=json.dumps(parsed_args))
+def extract_all_function_calls_to_tool_calls(llm_text: str) -> List[SimpleNamespace]:
+    """Like extract_function_calls_to_tool_calls, but converts every <function=NAME>{...}</function> match"""
+    pattern = r"<function=([^>]+)>(.*?)(?:</function>|<function>|<function/>|></function>)"
+    tool_calls = []
+    for index, (function_name, args_json_str) in enumerate(re.findall(pattern, llm_text)):
+        # Parse the JSON to ensure it's valid
+        try:
+            arguments = json.dumps(json.loads(args_json_str.strip()))
+        except json.JSONDecodeError:
+            if index == 0:
+                raise
+            # Further calls are optional, MeshAgent._handle_tool_calls reports their invalid arguments
+            logger.warning(f"Invalid arguments for tool call {function_name}")
+            arguments = args_json_str
+
+        function_obj = SimpleNamespace(name=function_name, arguments=arguments)
         # Build the structure that your existing code expects
-        return SimpleNamespace(function=function_obj)
-
-    # If no matches, return an empty dict or whatever fallback you need
-    return None
+        tool_calls.append(SimpleNamespace(id=f"call_{index}", type="function", function=function_obj))
+    return tool_calls
 
 
 def _handle_tool_response(message):
+    # "tool_calls" is the first call for backward compatibility, "all_tool_calls" has every call in order
     if hasattr(message, "tool_calls") and message.tool_calls:
-        return {"tool_calls": message.tool_calls[0], "content": message.content}
+        return {
+            "tool_calls": message.tool_calls[0],
+            "all_tool_calls": list(message.tool_calls),
+            "content": message.content,
+        }
     if hasattr(message, "content") and message.content:
         text_response = message.content
-        tool_calls = extract_function_calls_to_tool_calls(text_response)
+        tool_calls = extract_all_function_calls_to_tool_calls(text_response)
         if tool_calls:
-            logger.info("found tool calls in response")
-            return {"tool_calls": tool_calls, "content": ""}
+            logger.info(f"found {len(tool_calls)} tool calls in response")
+            return {"tool_calls": tool_calls[0], "all_tool_calls": tool_calls, "content": ""}
         else:
             return {"content": text_response}
     return message
@@ -0,0 +1,146 @@
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, DefaultHttpxClient, OpenAI
+
+from clients.http_session import close_on_loop_shutdown
+
+logger = logging.getLogger(__name__)
+
+# OpenAI wrappers kept per registry, least recently used first out. They share the HTTP clients, so this bounds
+# memory for per-user API keys without closing any connections.
+MAX_CACHED_CLIENTS = 256
+
+ClientKey = Tuple[Optional[str], Optional[str]]
+LoopKeyed = weakref.WeakKeyDictionary
+
+
+class OpenAIClientRegistry:
+    """
+    Process-wide registry of OpenAI clients keyed by (base_url, api_key).
+
+    Every API key of a base_url shares one keep-alive connection pool (an httpx client), so reusing them
+    avoids a new TCP/TLS handshake per LLM or embedding call, also across users. The OpenAI objects
+    wrapping it per key are cheap and kept in a bounded LRU. Async clients are bound to the event loop they
+    were created on, so they are kept per loop like the aiohttp sessions in clients.http_session, and closed
+    when that loop shuts down.
+
+    Pool limits default to LLM_HTTP_MAX_CONNECTIONS, LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS and
+    LLM_HTTP_KEEPALIVE_EXPIRY, read when the first client is created.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        max_cached_clients: int = MAX_CACHED_CLIENTS,
+    ):
+        self._limit_overrides = (max_connections, max_keepalive_connections, keepalive_expiry)
+        self._limits: Optional[httpx.Limits] = None
+        self.max_cached_clients = max_cached_clients
+        self._http_clients: Dict[Optional[str], httpx.Client] = {}
+        self._clients: "OrderedDict[ClientKey, OpenAI]" = OrderedDict()
+        # Both keyed by event loop
+        self._async_http_clients: "LoopKeyed[asyncio.AbstractEventLoop, Dict[Optional[str], httpx.AsyncClient]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._async_clients: "LoopKeyed[asyncio.AbstractEventLoop, OrderedDict[ClientKey, AsyncOpenAI]]" = (
+            weakref.WeakKeyDictionary()
+        )
+        self._lock = threading.Lock()
+
+    @property
+    def limits(self) -> httpx.Limits:
+        if self._limits is None:
+            max_connections, max_keepalive_connections, keepalive_expiry = self._limit_overrides
+            self._limits = httpx.Limits(
+                max_connections=max_connections or int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100")),
+                max_keepalive_connections=max_keepalive_connections
+                or int(os.getenv("LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS", "20")),
+                keepalive_expiry=keepalive_expiry or float(os.getenv("LLM_HTTP_KEEPALIVE_EXPIRY", "30")),
+            )
+        return self._limits
+
+    def _remember(self, clients: OrderedDict, key: ClientKey, client) -> None:
+        clients[key] = client
+        while len(clients) > self.max_cached_clients:
+            clients.popitem(last=False)
+
+    def get_client(self, base_url: Optional[str], api_key: Optional[str]) -> OpenAI:
+        key = (base_url, api_key)
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self._clients.move_to_end(key)
+                return client
+            http_client = self._http_clients.get(base_url)
+            if http_client is None:
+                http_client = self._http_clients[base_url] = DefaultHttpxClient(limits=self.limits)
+                logger.debug(f"Created pooled HTTP client for {base_url}")
+            client = OpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+            self._remember(self._clients, key, client)
+            return client
+
+    def get_async_client(self, base_url: Optional[str], api_key: Optional[str]) -> AsyncOpenAI:
+        loop = asyncio.get_running_loop()
+        clients = self._async_clients.setdefault(loop, OrderedDict())
+        key = (base_url, api_key)
+        client = clients.get(key)
+        if client is not None:
+            clients.move_to_end(key)
+            return client
+        http_clients = self._async_http_clients.setdefault(loop, {})
+        http_client = http_clients.get(base_url)
+        if http_client is None:
+            http_client = http_clients[base_url] = DefaultAsyncHttpxClient(limits=self.limits)
+            logger.debug(f"Created pooled async HTTP client for {base_url}")
+            close_on_loop_shutdown(self._close_loop_clients)
+        client = AsyncOpenAI(base_url=base_url, api_key=api_key, http_client=http_client)
+        self._remember(clients, key, client)
+        return client
+
+    def close(self) -> None:
+        """Close the sync connection pools"""
+        with self._lock:
+            http_clients, self._http_clients = self._http_clients, {}
+            self._clients.clear()
+        for http_client in http_clients.values():
+            http_client.close()
+
+    async def _close_loop_clients(self) -> None:
+        loop = asyncio.get_running_loop()
+        self._async_clients.pop(loop, None)
+        for http_client in self._async_http_clients.pop(loop, {}).values():
+            await http_client.aclose()
+
+    async def aclose(self) -> None:
+        """Close the async connection pools of the running event loop and the sync ones"""
+        await self._close_loop_clients()
+        self.close()
+
+
+client_registry = OpenAIClientRegistry()
+
+
+def get_openai_client(base_url: Optional[str], api_key: Optional[str]) -> OpenAI:
+    """Shared OpenAI client for base_url and api_key. Callers must not close it."""
+    return client_registry.get_client(base_url, api_key)
+
+
+def get_async_openai_client(base_url: Optional[str], api_key: Optional[str]) -> AsyncOpenAI:
+    """
+    Shared AsyncOpenAI client for base_url and api_key on the running event loop. Callers must not close it, it is
+    closed when the loop shuts down.
+    """
+    return client_registry.get_async_client(base_url, api_key)
+
+
+async def close_openai_clients() -> None:
+    await client_registry.aclose()
@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+import openai
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a model whose circuit breaker is open"""
+
+    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after failure_threshold consecutive failures and rejects calls for reset_timeout seconds.
+    After that a single trial call is let through: success closes the breaker, failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        """Forget a call that was cancelled before it succeeded or failed"""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LatencyTracker:
+    """Latencies of the last window successful calls"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The q quantile of recent latencies, or None until min_samples calls have been recorded"""
+        samples = sorted(self.samples)
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(int(q * len(samples)), len(samples) - 1)]
+
+
+@dataclass
+class ModelHealth:
+    name: str
+    breaker: CircuitBreaker
+    latency: LatencyTracker
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for a call before hedging it: the p95 latency, or LLM_HEDGE_DEFAULT_DELAY until known"""
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "5"))
+        return max(p95, float(os.getenv("LLM_HEDGE_MIN_DELAY", "0.5")))
+
+
+# Health of every model called so far, keyed by (base_url, model_id)
+_model_health: Dict[Tuple[Optional[str], str], ModelHealth] = {}
+_model_health_lock = threading.Lock()
+
+
+def get_model_health(base_url: Optional[str], model_id: str) -> ModelHealth:
+    key = (base_url, model_id)
+    health = _model_health.get(key)
+    if health is None:
+        with _model_health_lock:
+            health = _model_health.get(key)
+            if health is None:
+                breaker = CircuitBreaker(
+                    failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURE_THRESHOLD", "5")),
+                    reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET_TIMEOUT", "30")),
+                )
+                health = ModelHealth(name=model_id, breaker=breaker, latency=LatencyTracker())
+                _model_health[key] = health
+    return health
+
+
+def get_model_health_stats() -> Dict[str, Dict[str, Any]]:
+    """Circuit breaker state and recent latency of every model"""
+    stats = {}
+    for (base_url, model_id), health in list(_model_health.items()):
+        p50, p95 = health.latency.percentile(0.5), health.latency.percentile(0.95)
+        stats[f"{base_url}|{model_id}"] = {
+            "state": health.breaker.state,
+            "consecutive_failures": health.breaker.failures,
+            "samples": len(health.latency.samples),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+        }
+    return stats
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """
+    Whether error says the model is unavailable or overloaded: timeouts, connection errors, 429 and 5xx.
+    Other errors, like 4xx responses to a bad API key or an oversized prompt, are the caller's fault.
+    """
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return isinstance(error, (openai.APIConnectionError, asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+
+def is_client_error(error: BaseException) -> bool:
+    """Whether error is a response to a bad request, which fails again when retried"""
+    return isinstance(error, openai.APIStatusError) and not is_transient_error(error)
+
+
+def backoff_delay(attempt: int, initial_delay: float, max_delay: float = 30.0) -> float:
+    """Exponential backoff with jitter, so callers that failed together don't retry together"""
+    delay = min(max_delay, initial_delay * 2**attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def call_tracked(health: ModelHealth, call: Callable[[], T]) -> T:
+    """
+    Run call through the model's circuit breaker and record its latency. Only transient errors count
+    as failures, a bad request from one caller doesn't open the breaker for everyone.
+    """
+    if not health.breaker.allow():
+        raise CircuitOpenError(f"Circuit breaker open for {health.name}")
+    start = time.monotonic()
+    try:
+        result = call()
+    except Exception as e:
+        if is_transient_error(e):
+            health.breaker.record_failure()
+        else:
+            health.breaker.release()
+        raise
+    health.latency.record(time.monotonic() - start)
+    health.breaker.record_success()
+    return result
+
+
+async def call_tracked_async(health: ModelHealth, call: Callable[[], Awaitable[T]]) -> T:
+    """Async version of call_tracked"""
+    if not health.breaker.allow():
+        raise CircuitOpenError(f"Circuit breaker open for {health.name}")
+    start = time.monotonic()
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        health.breaker.release()
+        raise
+    except Exception as e:
+        if is_transient_error(e):
+            health.breaker.record_failure()
+        else:
+            health.breaker.release()
+        raise
+    health.latency.record(time.monotonic() - start)
+    health.breaker.record_success()
+    return result
+
+
+async def run_hedged(
+    call: Callable[[], Awaitable[T]],
+    health: ModelHealth,
+    alternate_call: Optional[Callable[[], Awaitable[T]]] = None,
+    alternate_health: Optional[ModelHealth] = None,
+) -> Tuple[T, bool]:
+    """
+    Run call, and if it hasn't succeeded within the model's hedge delay, also run alternate_call.
+    The first success wins and the other call is cancelled. If call fails early with a transient error or
+    because its circuit is open, alternate_call is started right away. Other errors are raised as is.
+
+    Returns the result and whether it came from alternate_call. If both fail, the error of call is raised.
+    """
+    if alternate_call is None:
+        return await call_tracked_async(health, call), False
+
+    primary = asyncio.ensure_future(call_tracked_async(health, call))
+    tasks = {primary: False}
+    try:
+        delay = health.hedge_delay()
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            error = primary.exception()
+            if error is None:
+                return primary.result(), False
+            if not isinstance(error, CircuitOpenError) and not is_transient_error(error):
+                raise error
+        else:
+            logger.info(f"Hedging {health.name} with {alternate_health.name} after {delay:.2f}s")
+
+        tasks[asyncio.ensure_future(call_tracked_async(alternate_health, alternate_call))] = True
+        pending = {task for task in tasks if not task.done()}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), tasks[task]
+        raise primary.exception()
+    finally:
+        losers = [task for task in tasks if not task.done()]
+        for task in losers:
+            task.cancel()
+        if losers:
+            await asyncio.gather(*losers, return_exceptions=True)
@@ -1,6 +1,8 @@
+import asyncio
+import functools
 import os
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from typing import List, Optional, Sequence
 
 import tiktoken
 
@@ -111,30 +113,68 @@ class RecursiveCharacterTextSplitter(TextSplitter):
 
 
 MIN_CHUNK_SIZE = 140
+# Separators a trimmed prompt may end on, most preferred first
+TRIM_SEPARATORS = ["\n\n", "\n", ". ", ", ", ">", " "]
+# How far back from the token budget the cut may move to land on a separator, as a fraction of the kept text
+TRIM_SNAP_WINDOW = 0.1
 encoder = tiktoken.get_encoding("cl100k_base")  # Updated to use OpenAI's current encoding
 
 
-def trim_prompt(prompt: str, context_size: int = int(os.environ.get("CONTEXT_SIZE", "128000"))) -> str:
-    """Trims a prompt to fit within the specified context size."""
-    if not prompt:
-        return ""
+def _snap_to_separator(text: str) -> str:
+    """Cut text back to the last preferred separator near its end, if there is one"""
+    window_start = len(text) - max(int(len(text) * TRIM_SNAP_WINDOW), MIN_CHUNK_SIZE)
+    for separator in TRIM_SEPARATORS:
+        index = text.rfind(separator, max(window_start, 0))
+        if index > 0:
+            return text[: index + len(separator)]
+    return text
 
-    length = len(encoder.encode(prompt))
-    if length <= context_size:
-        return prompt
 
-    overflow_tokens = length - context_size
-    # Estimate characters to remove (3 chars per token on average)
-    chunk_size = len(prompt) - overflow_tokens * 3
-    if chunk_size < MIN_CHUNK_SIZE:
-        return prompt[:MIN_CHUNK_SIZE]
+def _trim_tokens(prompt: str, tokens: List[int], context_size: int) -> str:
+    # A negative size would slice from the end and never fit, trim everything instead
+    context_size = max(context_size, 0)
+    if len(tokens) <= context_size:
+        return prompt
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    while True:
+        # Token bytes concatenate to the prompt bytes, so this is an exact prefix of the prompt,
+        # minus any character split across the last token
+        prefix = encoder.decode_bytes(tokens[:context_size]).decode("utf-8", errors="ignore")
+        trimmed = _snap_to_separator(prefix).strip()
+        # Re-encoding a prefix very rarely merges into more tokens, so check once more on the short text
+        tokens = encoder.encode_ordinary(trimmed)
+        if len(tokens) <= context_size:
+            return trimmed
 
-    trimmed_prompt = splitter.split_text(prompt)[0] if splitter.split_text(prompt) else ""
 
-    # Handle edge case where trimmed prompt is same length
-    if len(trimmed_prompt) == len(prompt):
-        return trim_prompt(prompt[:chunk_size], context_size)
+def trim_prompt(prompt: str, context_size: int = int(os.environ.get("CONTEXT_SIZE", "128000"))) -> str:
+    """
+    Trims a prompt to fit within the specified context size.
 
-    return trim_prompt(trimmed_prompt, context_size)
+    The prompt is encoded once and cut at the token budget, then moved back to the nearest paragraph,
+    line, sentence or word boundary.
+    """
+    if not prompt:
+        return ""
+    return _trim_tokens(prompt, encoder.encode_ordinary(prompt), context_size)
+
+
+def trim_prompts(
+    prompts: Sequence[str],
+    context_size: int = int(os.environ.get("CONTEXT_SIZE", "128000")),
+    num_threads: int = 1,
+) -> List[str]:
+    """Trims each prompt like trim_prompt, encoding them on num_threads threads"""
+    texts = [prompt or "" for prompt in prompts]
+    token_lists = encoder.encode_ordinary_batch(texts, num_threads=num_threads)
+    return [_trim_tokens(text, tokens, context_size) if text else "" for text, tokens in zip(texts, token_lists)]
+
+
+async def trim_prompts_async(
+    prompts: Sequence[str],
+    context_size: int = int(os.environ.get("CONTEXT_SIZE", "128000")),
+    num_threads: int = 4,
+) -> List[str]:
+    """trim_prompts in the default executor, so trimming large documents doesn't block the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(trim_prompts, prompts, context_size, num_threads))
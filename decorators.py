@@ -1,49 +1,357 @@
 import asyncio
+import hashlib
+import json
 import logging
-from datetime import datetime, timedelta
+import os
+import pickle
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
+from datetime import datetime
 from functools import wraps
-from typing import Any, Callable, TypeVar
+from typing import Any, Callable, Dict, Optional, Tuple, TypeVar
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T", bound=Callable)
 
 
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    coalesced: int = 0
+    shared_hits: int = 0
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after ttl_seconds.
+
+    Entries are evicted least recently used first once max_entries (or max_bytes, measured as the
+    pickled size of the values) is exceeded, and expired entries are purged at most every
+    purge_interval seconds, so the cache never grows past its bounds in a long-running process.
+    """
+
+    def __init__(
+        self,
+        ttl_seconds: float,
+        max_entries: Optional[int] = 1024,
+        max_bytes: Optional[int] = None,
+        purge_interval: Optional[float] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.purge_interval = purge_interval if purge_interval is not None else min(ttl_seconds, 60)
+        self.stats = CacheStats()
+        self.total_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._last_purge = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """Return (found, value), counting the lookup as a hit or a miss"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at, _ = entry
+                if expires_at > time.monotonic():
+                    self._entries.move_to_end(key)
+                    self.stats.hits += 1
+                    return True, value
+                self._remove(key)
+                self.stats.expirations += 1
+            self.stats.misses += 1
+            return False, None
+
+    def set(self, key: str, value: Any, ttl_seconds: Optional[float] = None) -> None:
+        size = _estimate_size(value) if self.max_bytes else 0
+        if self.max_bytes and size > self.max_bytes:
+            logger.debug(f"Not caching value of {size} bytes, larger than max_bytes={self.max_bytes}")
+            return
+
+        with self._lock:
+            now = time.monotonic()
+            if key in self._entries:
+                self._remove(key)
+            ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+            self._entries[key] = (value, now + ttl, size)
+            self.total_bytes += size
+
+            if now - self._last_purge >= self.purge_interval:
+                self._purge_expired(now)
+            while self._entries and (
+                (self.max_entries and len(self._entries) > self.max_entries)
+                or (self.max_bytes and self.total_bytes > self.max_bytes)
+            ):
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self.total_bytes -= size
+
+    def _purge_expired(self, now: float) -> None:
+        expired = [key for key, (_, expires_at, _) in self._entries.items() if expires_at <= now]
+        for key in expired:
+            self._remove(key)
+        self.stats.expirations += len(expired)
+        self._last_purge = now
+
+
+def _estimate_size(value: Any) -> int:
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def make_cache_key(*args, **kwargs) -> str:
+    """
+    Stable hashed key for call arguments, independent of keyword argument and dict key order.
+
+    Arguments are serialized as canonical JSON so the key is the same in every process. Raises TypeError
+    (or ValueError for circular references) for values JSON can't represent, such as sets or objects.
+    """
+    raw = json.dumps([args, kwargs], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# All with_cache caches, keyed by "<Class>.<function>"
+cache_registry: Dict[str, TTLCache] = {}
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Hit/miss/eviction counters and sizes of every with_cache cache"""
+    return {
+        name: {**asdict(cache.stats), "entries": len(cache), "bytes": cache.total_bytes}
+        for name, cache in cache_registry.items()
+    }
+
+
+class CacheBackend(ABC):
+    """Shared (L2) cache behind the in-process with_cache caches. Methods are called from a worker thread."""
+
+    @abstractmethod
+    def get(self, key: str) -> Tuple[bool, Any, float]:
+        """Return (found, value, remaining ttl in seconds)"""
+        pass
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        pass
+
+
+class SQLiteCacheBackend(CacheBackend):
+    """
+    Cache stored in a local SQLite file, shared by every process (e.g. uvicorn workers) on the host.
+
+    Values are stored as JSON; results that JSON can't represent exactly (e.g. tuples, or dicts with non-string
+    keys, which would come back as lists and string keys) only live in the in-process cache.
+    Expired rows are deleted periodically, and once the table holds more than max_entries rows the
+    ones closest to expiry are evicted.
+    """
+
+    def __init__(self, db_path: str, max_entries: int = 100000, purge_interval: float = 60):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.purge_interval = purge_interval
+        self._last_purge = 0.0
+        self._lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False, timeout=5)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)")
+        self.conn.commit()
+
+    def get(self, key: str) -> Tuple[bool, Any, float]:
+        with self._lock:
+            row = self.conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None, 0
+        remaining = row[1] - time.time()
+        if remaining <= 0:
+            return False, None, 0
+        return True, json.loads(row[0]), remaining
+
+    def set(self, key: str, value: Any, ttl_seconds: float) -> None:
+        try:
+            serialized = json.dumps(value)
+        except (TypeError, ValueError):
+            return
+        if json.loads(serialized) != value:
+            return
+
+        now = time.time()
+        with self._lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, serialized, now + ttl_seconds),
+            )
+            if now - self._last_purge >= self.purge_interval:
+                self._purge(now)
+            self.conn.commit()
+
+    def _purge(self, now: float) -> None:
+        self.conn.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        excess = self.conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] - self.max_entries
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY expires_at LIMIT ?)", (excess,)
+            )
+        self._last_purge = now
+
+
+def _backend_from_env() -> Optional[CacheBackend]:
+    backend = os.getenv("CACHE_BACKEND", "").lower()
+    if not backend or backend == "memory":
+        return None
+    if backend == "sqlite":
+        db_path = os.getenv("CACHE_SQLITE_PATH", os.path.join(tempfile.gettempdir(), "heurist_cache.sqlite"))
+        try:
+            return SQLiteCacheBackend(db_path, max_entries=int(os.getenv("CACHE_SQLITE_MAX_ENTRIES", "100000")))
+        except sqlite3.Error as e:
+            logger.error(f"Failed to open SQLite cache at {db_path}, using in-process cache only: {e}")
+            return None
+    logger.warning(f"Unknown CACHE_BACKEND '{backend}', using in-process cache only")
+    return None
+
+
+_cache_backend: Optional[CacheBackend] = None
+_cache_backend_configured = False
+
+
+def get_cache_backend() -> Optional[CacheBackend]:
+    """Shared cache behind every with_cache cache, configured from CACHE_BACKEND on first use"""
+    global _cache_backend, _cache_backend_configured
+    if not _cache_backend_configured:
+        _cache_backend = _backend_from_env()
+        _cache_backend_configured = True
+    return _cache_backend
+
+
+def set_cache_backend(backend: Optional[CacheBackend]) -> None:
+    """Use backend as the shared cache behind every with_cache cache, or None for in-process caching only"""
+    global _cache_backend, _cache_backend_configured
+    _cache_backend = backend
+    _cache_backend_configured = True
+
+
+async def _run_backend(method: Callable, *args) -> Any:
+    try:
+        return await asyncio.get_event_loop().run_in_executor(None, method, *args)
+    except Exception as e:
+        logger.warning(f"Shared cache {method.__name__} failed: {e}")
+        return None
+
+
 # Features:
 # Shares cache across all instances of the same agent class
-# Python's dict operations are atomic so it's thread-safe
-def with_cache(ttl_seconds: int = 300):
+# Optionally shares results across processes through a cache backend (L2), see CACHE_BACKEND
+# Bounded LRU with TTL expiry, see TTLCache
+# Concurrent calls with the same arguments share a single in-flight execution
+def with_cache(ttl_seconds: int = 300, max_entries: Optional[int] = None, max_bytes: Optional[int] = None):
     """Cache function results for specified duration"""
 
     def decorator(func: T) -> T:
         # Move cache to class level using a unique key
         cache_key_base = f"_cache_{func.__name__}"
-        ttl_key = f"_cache_ttl_{func.__name__}"
+        inflight_key = f"_cache_inflight_{func.__name__}"
+
+        def get_cache(cls) -> TTLCache:
+            # Look the cache up on the class itself so subclasses don't share their parent's cache
+            cache = cls.__dict__.get(cache_key_base)
+            if cache is None:
+                cache = TTLCache(
+                    ttl_seconds,
+                    max_entries=max_entries if max_entries is not None else int(os.getenv("CACHE_MAX_ENTRIES", "1024")),
+                    max_bytes=max_bytes if max_bytes is not None else int(os.getenv("CACHE_MAX_BYTES", "0")) or None,
+                )
+                setattr(cls, cache_key_base, cache)
+                setattr(cls, inflight_key, {})
+                cache_registry[f"{cls.__name__}.{func.__name__}"] = cache
+            return cache
 
         @wraps(func)
         async def wrapper(self, *args, **kwargs) -> Any:
-            # Initialize class-level cache
-            if not hasattr(self.__class__, cache_key_base):
-                setattr(self.__class__, cache_key_base, {})
-                setattr(self.__class__, ttl_key, {})
-
-            cache = getattr(self.__class__, cache_key_base)
-            cache_ttl = getattr(self.__class__, ttl_key)
-
-            cache_key = f"{str(args)}:{str(kwargs)}"
-
-            # Check cache
-            if cache_key in cache and datetime.now() < cache_ttl[cache_key]:
-                logger.debug(f"Cache hit for {func.__name__}")
-                return cache[cache_key]
-
-            # Execute function
-            result = await func(self, *args, **kwargs)
+            cache = get_cache(self.__class__)
+            inflight: Dict[str, asyncio.Future] = self.__class__.__dict__[inflight_key]
+            try:
+                cache_key = make_cache_key(*args, **kwargs)
+            except (TypeError, ValueError) as e:
+                logger.debug(f"Not caching {func.__name__}, its arguments can't be keyed: {e}")
+                return await func(self, *args, **kwargs)
+
+            while True:
+                # Check cache
+                found, result = cache.get(cache_key)
+                if found:
+                    logger.debug(f"Cache hit for {func.__name__}")
+                    return result
+
+                # Wait for an identical call that is already running instead of repeating it
+                pending = inflight.get(cache_key)
+                if pending is None or pending.get_loop() is not asyncio.get_running_loop():
+                    break
+                cache.stats.coalesced += 1
+                try:
+                    return await asyncio.shield(pending)
+                except asyncio.CancelledError:
+                    if not pending.cancelled():
+                        raise
+                    # The call we were waiting on was cancelled, try again
+
+            future = asyncio.get_running_loop().create_future()
+            inflight[cache_key] = future
+            backend = get_cache_backend()
+            backend_key = f"{self.__class__.__name__}.{func.__name__}:{cache_key}"
+            try:
+                # Check the shared cache, another worker may have fetched it already
+                cached = await _run_backend(backend.get, backend_key) if backend else None
+                if cached and cached[0]:
+                    _, result, remaining_ttl = cached
+                    cache.set(cache_key, result, ttl_seconds=remaining_ttl)
+                    cache.stats.shared_hits += 1
+                    future.set_result(result)
+                    return result
+
+                # Execute function
+                result = await func(self, *args, **kwargs)
+            except asyncio.CancelledError:
+                future.cancel()
+                raise
+            except Exception as e:
+                future.set_exception(e)
+                future.exception()  # Mark as retrieved in case nobody was waiting
+                raise
+            finally:
+                if inflight.get(cache_key) is future:
+                    del inflight[cache_key]
 
             # Update cache
-            cache[cache_key] = result
-            cache_ttl[cache_key] = datetime.now() + timedelta(seconds=ttl_seconds)
-
+            cache.set(cache_key, result)
+            future.set_result(result)
+            if backend:
+                await _run_backend(backend.set, backend_key, result, ttl_seconds)
             return result
 
         return wrapper
@@ -51,39 +359,14 @@ def with_cache(ttl_seconds: int = 300):
     return decorator
 
 
-# TODO: Use Redis in a multi-process environment
-# def with_cache(ttl_seconds: int = 300):
-#     """Cache function results using Redis"""
-#     def decorator(func: T) -> T:
-#         redis_client = redis.Redis(host='localhost', port=6379, db=0)
-
-#         @wraps(func)
-#         async def wrapper(*args, **kwargs) -> Any:
-#             cache_key = f"{func.__name__}:{str(args)}:{str(kwargs)}"
-
-#             # Check Redis cache
-#             cached = redis_client.get(cache_key)
-#             if cached:
-#                 logger.debug(f"Cache hit for {func.__name__}")
-#                 return json.loads(cached)
-
-#             # Execute function
-#             result = await func(*args, **kwargs)
-
-#             # Update Redis cache
-#             redis_client.setex(
-#                 cache_key,
-#                 ttl_seconds,
-#                 json.dumps(result)
-#             )
-
-#             return result
-#         return wrapper
-#     return decorator
+def _stream_started(args: tuple) -> bool:
+    """Whether the mesh agent call being retried already sent events to a streaming client"""
+    stream = getattr(getattr(args[0], "request_context", None), "stream", None) if args else None
+    return bool(getattr(stream, "data_sent", False))
 
 
 def with_retry(max_retries: int = 3, delay: float = 1.0):
-    """Retry function execution on failure"""
+    """Retry function execution on failure, unless part of the response was already streamed"""
 
     def decorator(func: T) -> T:
         @wraps(func)
@@ -94,6 +377,10 @@ def with_retry(max_retries: int = 3, delay: float = 1.0):
                     return await func(*args, **kwargs)
                 except Exception as e:
                     last_error = e
+                    # A retry would send the data and tokens to the client a second time
+                    if _stream_started(args):
+                        logger.error(f"Not retrying {func.__name__}, its response was already partly streamed: {e}")
+                        raise
                     if attempt < max_retries - 1:
                         delay_time = delay * (2**attempt)  # Exponential backoff
                         logger.warning(f"Retry {attempt + 1}/{max_retries} for {func.__name__} after {delay_time}s")
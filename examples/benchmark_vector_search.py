@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(project_root)
+
+from core.embedding import SimilarityIndex  # noqa: E402
+
+
+def make_embeddings(rng: np.random.Generator, rows: int, dim: int, clusters: int) -> np.ndarray:
+    """Random embeddings grouped around topics, like embeddings of real messages"""
+    centers = rng.normal(size=(clusters, dim))
+    vectors = centers[rng.integers(clusters, size=rows)] + 0.5 * rng.normal(size=(rows, dim))
+    return vectors.astype(np.float32)
+
+
+def timed_search(index: SimilarityIndex, queries: np.ndarray, k: int, **kwargs):
+    results, start = [], time.perf_counter()
+    for query in queries:
+        results.append({hit["message"] for hit in index.search(query, -1.0, "knowledge_base", limit=k, **kwargs)})
+    return results, (time.perf_counter() - start) / len(queries) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare exact and IVF search of the SQLite similarity index")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=1024)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--probes", type=int, nargs="+", default=[1, 5, 10, 20, 50])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = make_embeddings(rng, args.rows, args.dim, args.clusters)
+    queries = make_embeddings(rng, args.queries, args.dim, args.clusters)
+
+    index = SimilarityIndex(ann_min_rows=1)
+    for row_id, vector in enumerate(vectors, start=1):
+        index.add(row_id, str(row_id), vector, "knowledge_base", None)
+
+    start = time.perf_counter()
+    index.search(queries[0], 1.0, "knowledge_base")  # trains the IVF lists
+    print(f"{args.rows} rows of dimension {args.dim}, IVF trained in {time.perf_counter() - start:.2f}s\n")
+
+    exact, exact_ms = timed_search(index, queries, args.k, exact=True)
+    print(f"{'search':<12}{'recall@' + str(args.k):>12}{'ms/query':>12}{'speedup':>10}")
+    print(f"{'exact':<12}{1.0:>12.3f}{exact_ms:>12.2f}{1.0:>10.1f}")
+    for probes in args.probes:
+        approximate, ms = timed_search(index, queries, args.k, probes=probes)
+        recall = np.mean([len(a & e) / len(e) for a, e in zip(approximate, exact)])
+        print(f"{'probes=' + str(probes):<12}{recall:>12.3f}{ms:>12.2f}{exact_ms / ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
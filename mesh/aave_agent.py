@@ -7,7 +7,7 @@ from dotenv import load_dotenv
 from eth_defi.aave_v3.reserve import AaveContractsNotConfigured, fetch_reserve_data, get_helper_contracts
 from web3 import Web3
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -118,7 +118,8 @@ class AaveAgent(MeshAgent):
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -375,10 +376,7 @@ class AaveAgent(MeshAgent):
             tool_call_name = tool_call.function.name
             tool_call_args = json.loads(tool_call.function.arguments)
 
-            data = await self._handle_tool_logic(
-                tool_name=tool_call_name,
-                function_args=tool_call_args,
-            )
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
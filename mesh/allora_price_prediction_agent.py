@@ -6,7 +6,8 @@ from typing import Any, Dict, List
 import aiohttp
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -108,7 +109,8 @@ class AlloraPricePredictionAgent(MeshAgent):
     # ------------------------------------------------------------------------
     async def _respond_with_llm(self, query: str, tool_call_id: str, data: dict, temperature: float) -> str:
         """Generate a natural language response using the LLM"""
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -134,10 +136,7 @@ class AlloraPricePredictionAgent(MeshAgent):
     @with_retry(max_retries=3)
     async def get_allora_prediction(self, token: str, timeframe: str) -> Dict:
         """Fetch price prediction data from Allora API"""
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
+        session = self.session or get_shared_session()
 
         try:
             base_url = "https://api.upshot.xyz/v2/allora/consumer/price/ethereum-11155111"
@@ -148,7 +147,7 @@ class AlloraPricePredictionAgent(MeshAgent):
                 "x-api-key": os.getenv("ALLORA_API_KEY"),
             }
 
-            async with self.session.get(url, headers=headers) as response:
+            async with session.get(url, headers=headers) as response:
                 response.raise_for_status()
                 data = await response.json()
 
@@ -165,10 +164,6 @@ class AlloraPricePredictionAgent(MeshAgent):
                 }
         except Exception as e:
             return {"error": f"Failed to fetch prediction: {str(e)}"}
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
 
     # ------------------------------------------------------------------------
     #                      COMMON HANDLER LOGIC
@@ -254,7 +249,7 @@ class AlloraPricePredictionAgent(MeshAgent):
             tool_call_name = tool_call.function.name
             tool_call_args = json.loads(tool_call.function.arguments)
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
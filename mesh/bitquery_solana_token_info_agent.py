@@ -1,16 +1,18 @@
 import datetime
 import json
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 import requests
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
+from .tool_router import SOLANA_ADDRESS_PATTERN, ToolRouter
 
 load_dotenv()
 
@@ -215,7 +217,8 @@ class BitquerySolanaTokenInfoAgent(MeshAgent):
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -227,6 +230,16 @@ class BitquerySolanaTokenInfoAgent(MeshAgent):
             temperature=temperature,
         )
 
+    def build_tool_router(self) -> Optional[ToolRouter]:
+        router = super().build_tool_router()
+        # A bare mint address is a request for its trading metrics
+        router.add_rule(
+            rf"^\s*({SOLANA_ADDRESS_PATTERN.pattern})\s*$",
+            "query_token_metrics",
+            lambda match: {"token_address": match.group(1)},
+        )
+        return router
+
     def _handle_error(self, maybe_error: dict) -> dict:
         """
         Small helper to return the error if present in
@@ -438,16 +451,16 @@ class BitquerySolanaTokenInfoAgent(MeshAgent):
             payload["variables"] = variables
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload, headers=headers) as response:
-                    response.raise_for_status()
-                    data = await response.json()
+            session = get_shared_session()
+            async with session.post(url, json=payload, headers=headers) as response:
+                response.raise_for_status()
+                data = await response.json()
 
-                    if "errors" in data:
-                        error_messages = [error.get("message", "Unknown error") for error in data["errors"]]
-                        raise Exception(f"GraphQL errors: {', '.join(error_messages)}")
+                if "errors" in data:
+                    error_messages = [error.get("message", "Unknown error") for error in data["errors"]]
+                    raise Exception(f"GraphQL errors: {', '.join(error_messages)}")
 
-                    return data
+                return data
         except aiohttp.ClientResponseError as e:
             if e.status == 429:
                 # Rate limit error
@@ -999,7 +1012,7 @@ class BitquerySolanaTokenInfoAgent(MeshAgent):
             tool_call_name = tool_call.function.name
             tool_call_args = json.loads(tool_call.function.arguments)
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
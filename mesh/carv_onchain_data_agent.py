@@ -6,7 +6,8 @@ from typing import Any, Dict, List
 import aiohttp
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -143,7 +144,8 @@ class CarvOnchainDataAgent(MeshAgent):
         tool_name = tool_name or "query_onchain_data"
         tool_args = tool_args or {}
 
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -185,10 +187,7 @@ class CarvOnchainDataAgent(MeshAgent):
         """
         Query the CARV API with a natural language question about blockchain metrics.
         """
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
+        session = self.session or get_shared_session()
 
         try:
             # Validate blockchain
@@ -212,7 +211,7 @@ class CarvOnchainDataAgent(MeshAgent):
 
             logger.info(f"Querying CARV API for blockchain {blockchain}: {processed_query}")
 
-            async with self.session.post(self.api_url, json=data, headers=headers) as response:
+            async with session.post(self.api_url, json=data, headers=headers) as response:
                 if response.status != 200:
                     error_text = await response.text()
                     return {"error": f"CARV API error ({response.status}): {error_text}"}
@@ -223,10 +222,6 @@ class CarvOnchainDataAgent(MeshAgent):
         except Exception as e:
             logger.error(f"Error querying CARV API: {str(e)}")
             return {"error": f"Failed to query blockchain metrics: {str(e)}"}
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
 
     # ------------------------------------------------------------------------
     #                      TOOL HANDLING LOGIC
@@ -309,7 +304,7 @@ class CarvOnchainDataAgent(MeshAgent):
             tool_call_name = tool_call.function.name
             tool_call_args = json.loads(tool_call.function.arguments)
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
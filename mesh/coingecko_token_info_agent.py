@@ -1,3 +1,4 @@
+import asyncio
 import json
 import logging
 import os
@@ -13,6 +14,7 @@ from core.llm import call_llm_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
+from .tool_router import RouteMatch
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -861,7 +863,8 @@ class CoinGeckoTokenInfoAgent(MeshAgent):
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -882,6 +885,57 @@ class CoinGeckoTokenInfoAgent(MeshAgent):
             return {"error": maybe_error["error"]}
         return {}
 
+    async def _handle_tool_logic(self, tool_name: str, function_args: dict) -> Optional[Dict[str, Any]]:
+        """
+        Call a tool directly and return its raw data, or None for an unknown tool.
+        """
+        if tool_name == "get_trending_coins":
+            result = await self._get_trending_coins()
+        elif tool_name == "get_token_info":
+            result = await self._get_token_info(function_args["coingecko_id"])
+            if not isinstance(result, dict) or "error" not in result:
+                result = self.format_token_info(result)
+        elif tool_name == "get_coingecko_id":
+            result = await self._get_coingecko_id(function_args["token_name"])
+            if isinstance(result, str):
+                result = {"coingecko_id": result}
+            elif result is None:
+                result = {"error": f"No token found for {function_args['token_name']}"}
+        elif tool_name == "get_token_price_multi":
+            result = await self._get_token_price_multi(
+                ids=function_args["ids"],
+                vs_currencies=function_args["vs_currencies"],
+                include_market_cap=function_args.get("include_market_cap", False),
+                include_24hr_vol=function_args.get("include_24hr_vol", False),
+                include_24hr_change=function_args.get("include_24hr_change", False),
+                include_last_updated_at=function_args.get("include_last_updated_at", False),
+                precision=function_args.get("precision", None),
+            )
+            if "error" not in result:
+                result = {"price_data": result}
+        elif tool_name == "get_categories_list":
+            result = await self._get_categories_list()
+        elif tool_name == "get_category_data":
+            order = function_args.get("order", "market_cap_desc")
+            result = await self._get_category_data(order)
+        elif tool_name == "get_tokens_by_category":
+            category_id = function_args["category_id"]
+            vs_currency = function_args.get("vs_currency", "usd")
+            order = function_args.get("order", "market_cap_desc")
+            per_page = function_args.get("per_page", 100)
+            page = function_args.get("page", 1)
+            result = await self._get_tokens_by_category(category_id, vs_currency, order, per_page, page)
+        else:
+            return None
+        return result
+
+    async def _run_prerouted_tool(self, params: Dict[str, Any], match: RouteMatch) -> Dict[str, Any]:
+        self.current_message = params
+        try:
+            return await super()._run_prerouted_tool(params, match)
+        finally:
+            self.current_message = {}
+
     @monitor_execution()
     @with_retry(max_retries=3)
     async def handle_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -903,43 +957,8 @@ class CoinGeckoTokenInfoAgent(MeshAgent):
             if tool_name:
                 logger.info(f"Direct tool call: {tool_name} with args {tool_args}")
 
-                if tool_name == "get_trending_coins":
-                    result = await self._get_trending_coins()
-                elif tool_name == "get_token_info":
-                    result = await self._get_token_info(tool_args["coingecko_id"])
-                    if not isinstance(result, dict) or "error" not in result:
-                        result = self.format_token_info(result)
-                elif tool_name == "get_coingecko_id":
-                    result = await self._get_coingecko_id(tool_args["token_name"])
-                    if isinstance(result, str):
-                        result = {"coingecko_id": result}
-                    elif result is None:
-                        result = {"error": f"No token found for {tool_args['token_name']}"}
-                elif tool_name == "get_token_price_multi":
-                    result = await self._get_token_price_multi(
-                        ids=tool_args["ids"],
-                        vs_currencies=tool_args["vs_currencies"],
-                        include_market_cap=tool_args.get("include_market_cap", False),
-                        include_24hr_vol=tool_args.get("include_24hr_vol", False),
-                        include_24hr_change=tool_args.get("include_24hr_change", False),
-                        include_last_updated_at=tool_args.get("include_last_updated_at", False),
-                        precision=tool_args.get("precision", None),
-                    )
-                    if "error" not in result:
-                        result = {"price_data": result}
-                elif tool_name == "get_categories_list":
-                    result = await self._get_categories_list()
-                elif tool_name == "get_category_data":
-                    order = tool_args.get("order", "market_cap_desc")
-                    result = await self._get_category_data(order)
-                elif tool_name == "get_tokens_by_category":
-                    category_id = tool_args["category_id"]
-                    vs_currency = tool_args.get("vs_currency", "usd")
-                    order = tool_args.get("order", "market_cap_desc")
-                    per_page = tool_args.get("per_page", 100)
-                    page = tool_args.get("page", 1)
-                    result = await self._get_tokens_by_category(category_id, vs_currency, order, per_page, page)
-                else:
+                result = await self._handle_tool_logic(tool_name, tool_args)
+                if result is None:
                     return {"error": f"Unsupported tool: {tool_name}"}
 
                 if raw_data_only:
@@ -959,14 +978,16 @@ class CoinGeckoTokenInfoAgent(MeshAgent):
             if query:
                 logger.info(f"Processing natural language query: {query}")
 
-                result = self.agent.run(
+                # smolagents is synchronous, run it off the event loop so progress updates go out meanwhile
+                result = await asyncio.to_thread(
+                    self.agent.run,
                     f"""Analyze this query and provide insights: {query}
 
                         Guidelines:
                         - Use appropriate tools to find and analyze cryptocurrency data
                         - Format numbers clearly (e.g. $1.5M, 15.2%)
                         - Keep response concise and focused on key insights
-                        """
+                        """,
                 )
                 response_text = result.to_string()
 
@@ -8,7 +8,7 @@ from dotenv import load_dotenv
 from firecrawl import FirecrawlApp
 
 from core.llm import call_llm_async, call_llm_with_tools_async
-from core.utils.text_splitter import trim_prompt
+from core.utils.text_splitter import trim_prompts_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -205,11 +205,9 @@ class DeepResearchAgent(MeshAgent):
     @with_retry(max_retries=3)
     async def analyze_results(self, query: str, search_results: Dict) -> Dict[str, Any]:
         """Analyze search results and generate insights"""
-        contents = [
-            trim_prompt(item.get("markdown", ""), 25000)
-            for item in search_results.get("data", [])
-            if item.get("markdown")
-        ]
+        contents = await trim_prompts_async(
+            [item["markdown"] for item in search_results.get("data", []) if item.get("markdown")], 25000
+        )
 
         if not contents:
             return {"analysis": "No search results found to analyze.", "key_findings": [], "recommendations": []}
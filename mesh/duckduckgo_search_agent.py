@@ -4,7 +4,7 @@ from typing import Any, Dict, List
 from dotenv import load_dotenv
 from duckduckgo_search import DDGS
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -101,7 +101,8 @@ class DuckDuckGoSearchAgent(MeshAgent):
     # ------------------------------------------------------------------------
     async def _respond_with_llm(self, query: str, tool_call_id: str, data: dict, temperature: float) -> str:
         """Generate a natural language response using the LLM"""
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -232,7 +233,7 @@ class DuckDuckGoSearchAgent(MeshAgent):
             if "max_results" not in tool_call_args:
                 tool_call_args["max_results"] = max_results
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
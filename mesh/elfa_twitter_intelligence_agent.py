@@ -344,7 +344,7 @@ class ElfaTwitterIntelligenceAgent(MeshAgent):
         tool_call_name = tool_call.function.name
         tool_call_args = json.loads(tool_call.function.arguments)
 
-        data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+        data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
         if raw_data_only:
             return {"response": "", "data": data}
@@ -5,7 +5,7 @@ from typing import Any, Dict, List
 import requests
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -140,7 +140,8 @@ class GoplusAnalysisAgent(MeshAgent):
         ]
 
     async def _respond_with_llm(self, query: str, tool_call_id: str, data: dict, temperature: float) -> str:
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -389,7 +390,7 @@ class GoplusAnalysisAgent(MeshAgent):
             if "solana" in query.lower() and tool_call_name == "fetch_security_details":
                 tool_call_args["chain_id"] = "solana"
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
@@ -1,13 +1,22 @@
 import asyncio
+import json
 import os
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional
+from contextvars import ContextVar
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Dict, Optional
 
 import dotenv
 from loguru import logger
 
 from clients.mesh_client import MeshClient
+from core.llm import call_llm_async, call_llm_stream_async
+from decorators import monitor_execution, with_retry
 
+from .tool_router import RouteMatch, ToolRouter
+
+# Replaces the environment with .env after core, clients and decorators were imported. Those modules therefore read
+# their settings (LLM_*, HTTP_POOL_*, TASK_UPDATE_*, CACHE_*, EMBEDDING_*, ...) when first used, never at import time.
 os.environ.clear()
 dotenv.load_dotenv()
 
@@ -18,12 +27,42 @@ HEURIST_BASE_URL = os.getenv("HEURIST_BASE_URL")
 HEURIST_API_KEY = os.getenv("HEURIST_API_KEY")
 
 
+class ResponseStream:
+    """Events of a streamed agent call, in the order the client should receive them"""
+
+    def __init__(self):
+        self.events: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self.data_sent = False
+
+    def send(self, event: str, data: Any) -> None:
+        self.events.put_nowait({"event": event, "data": data})
+
+    def close(self) -> None:
+        self.events.put_nowait(None)
+
+
+@dataclass(frozen=True)
+class RequestContext:
+    """Per-request state of an agent call, kept apart from the agent instance so instances can be reused"""
+
+    # The agent handling the request, so an agent called by another one doesn't see the caller's state
+    agent: Optional["MeshAgent"] = None
+    task_id: Optional[str] = None
+    origin_task_id: Optional[str] = None
+    heurist_api_key: Optional[str] = None
+    stream: Optional[ResponseStream] = None
+    # Event loop running the request, so updates pushed from worker threads reach its update sender
+    loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+_request_context: ContextVar[RequestContext] = ContextVar("mesh_agent_request_context", default=RequestContext())
+
+
 class MeshAgent(ABC):
     """Base class for all mesh agents"""
 
     def __init__(self):
         self.agent_name: str = self.__class__.__name__
-        self._task_id = None
 
         self.metadata: Dict[str, Any] = {
             "name": self.agent_name,
@@ -43,19 +82,35 @@ class MeshAgent(ABC):
             "examples": [],
         }
         self.heurist_base_url = HEURIST_BASE_URL
-        self.heurist_api_key = HEURIST_API_KEY
+        self._default_heurist_api_key = HEURIST_API_KEY
         self._api_clients: Dict[str, Any] = {}
 
         self.mesh_client = MeshClient(base_url=os.getenv("PROTOCOL_V2_SERVER_URL", "https://sequencer-v2.heurist.xyz"))
         self._api_clients["mesh"] = self.mesh_client
 
-        self._task_id = None
-        self._origin_task_id = None
+    @property
+    def request_context(self) -> RequestContext:
+        """State of the request currently handled by this agent in the running context"""
+        context = _request_context.get()
+        return context if context.agent is self else RequestContext(agent=self)
 
     @property
     def task_id(self) -> Optional[str]:
         """Access the current task ID"""
-        return self._task_id
+        return self.request_context.task_id
+
+    @property
+    def origin_task_id(self) -> Optional[str]:
+        return self.request_context.origin_task_id
+
+    @property
+    def heurist_api_key(self) -> Optional[str]:
+        """API key of the current request, falling back to the one from the environment"""
+        return self.request_context.heurist_api_key or self._default_heurist_api_key
+
+    @heurist_api_key.setter
+    def heurist_api_key(self, api_key: Optional[str]) -> None:
+        self._default_heurist_api_key = api_key
 
     @abstractmethod
     async def handle_message(self, params: Dict[str, Any]) -> Dict[str, Any]:
@@ -64,25 +119,179 @@ class MeshAgent(ABC):
 
     async def call_agent(self, params: Dict[str, Any]) -> Dict[str, Any]:
         """Main entry point that handles the message flow with hooks."""
-        # Set task tracking IDs
-        self._task_id = params.get("origin_task_id") or params.get("task_id")
-        self._origin_task_id = params.get("origin_task_id")
+        # Set task tracking IDs for this request only
+        token = _request_context.set(
+            replace(
+                self.request_context,
+                task_id=params.get("origin_task_id") or params.get("task_id"),
+                origin_task_id=params.get("origin_task_id"),
+                loop=asyncio.get_running_loop(),
+            )
+        )
 
         try:
             # Pre-process params through hook
             modified_params = await self._before_handle_message(params)
             input_params = modified_params or params
 
-            # Process message through main handler
-            handler_response = await self.handle_message(input_params)
+            # Answer obvious tool calls without the routing LLM call, otherwise process through main handler
+            handler_response = await self._handle_prerouted_query(input_params)
+            if handler_response is None:
+                handler_response = await self.handle_message(input_params)
 
             # Post-process response through hook
             modified_response = await self._after_handle_message(handler_response)
             return modified_response or handler_response
 
         except Exception as e:
-            logger.error(f"Task failed | Agent: {self.agent_name} | Task: {self._task_id} | Error: {str(e)}")
+            logger.error(f"Task failed | Agent: {self.agent_name} | Task: {self.task_id} | Error: {str(e)}")
             raise
+        finally:
+            _request_context.reset(token)
+
+    async def call_agent_stream(self, params: Dict[str, Any]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming version of call_agent. Yields events as {"event": ..., "data": ...}:
+        - "data": the tool result, as soon as it is ready
+        - "token": a chunk of the LLM explanation of that result
+        - "result": the final response, without "data" if it was already sent
+        """
+        stream = ResponseStream()
+        token = _request_context.set(replace(self.request_context, stream=stream))
+        try:
+            # The task copies the current context, including the stream
+            task = asyncio.create_task(self.call_agent(params))
+        finally:
+            _request_context.reset(token)
+        task.add_done_callback(lambda _: stream.close())
+
+        try:
+            while True:
+                event = await stream.events.get()
+                if event is None:
+                    break
+                yield event
+
+            result = task.result()
+            if stream.data_sent and isinstance(result, dict):
+                result = {key: value for key, value in result.items() if key != "data"}
+            yield {"event": "result", "data": result}
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
+
+    async def _explain_with_llm(self, data: Any, **llm_kwargs) -> str:
+        """
+        Ask the LLM to explain a tool result, with the same arguments as call_llm_async.
+
+        When the request is streamed, data is sent to the client first and the explanation follows token by token.
+        Otherwise a slow or failing call is hedged with the agent's small model.
+        """
+        stream = self.request_context.stream
+        if stream is None:
+            return await call_llm_async(**{"hedge_model_id": self.metadata["small_model_id"], **llm_kwargs})
+
+        stream.send("data", data)
+        stream.data_sent = True
+        chunks = []
+        async for chunk in call_llm_stream_async(**llm_kwargs):
+            chunks.append(chunk)
+            stream.send("token", chunk)
+        return "".join(chunks)
+
+    async def _handle_tool_calls(self, response: Dict[str, Any], tool_name: str, function_args: Dict[str, Any]) -> Any:
+        """
+        Run the tool call chosen by the LLM through _handle_tool_logic, together with any further tool calls
+        from the same response (response["all_tool_calls"]), concurrently.
+
+        tool_name and function_args are the first call, possibly adjusted by the agent. A single call returns
+        its result unchanged, so "data" keeps the shape callers already handle. Several calls return a list of
+        {"tool", "arguments", "result"} in the order requested instead of a dict; a call that failed, or whose
+        arguments are not valid JSON, has {"error": ...} as its result.
+        """
+        extra_calls = response.get("all_tool_calls", [])[1:]
+        if not extra_calls:
+            return await self._handle_tool_logic(tool_name=tool_name, function_args=function_args)
+
+        calls, invalid = [(tool_name, function_args)], {}
+        for tool_call in extra_calls:
+            try:
+                arguments = json.loads(tool_call.function.arguments)
+            except json.JSONDecodeError as e:
+                logger.warning(f"Invalid arguments for tool call {tool_call.function.name}: {e}")
+                arguments = tool_call.function.arguments
+                invalid[len(calls)] = ValueError(f"Invalid tool arguments: {e}")
+            calls.append((tool_call.function.name, arguments))
+
+        async def run(index: int, name: str, arguments: Any) -> Any:
+            if index in invalid:
+                raise invalid[index]
+            return await self._handle_tool_logic(tool_name=name, function_args=arguments)
+
+        logger.info(f"Running {len(calls)} tool calls concurrently | Agent: {self.agent_name} | Task: {self.task_id}")
+        results = await asyncio.gather(
+            *(run(index, name, args) for index, (name, args) in enumerate(calls)),
+            return_exceptions=True,
+        )
+        return [
+            {
+                "tool": name,
+                "arguments": args,
+                "result": {"error": str(result)} if isinstance(result, Exception) else result,
+            }
+            for (name, args), result in zip(calls, results)
+        ]
+
+    def build_tool_router(self) -> Optional[ToolRouter]:
+        """
+        Pre-router for natural language queries, built once per agent class. Override to add agent specific
+        rules, or return None to always let the LLM pick the tool.
+        """
+        if not all(hasattr(self, name) for name in ("get_tool_schemas", "_handle_tool_logic", "_respond_with_llm")):
+            return None
+        return ToolRouter(
+            self.get_tool_schemas(), min_confidence=float(os.getenv("MESH_PREROUTER_MIN_CONFIDENCE", "0.8"))
+        )
+
+    @property
+    def tool_router(self) -> Optional[ToolRouter]:
+        cls = self.__class__
+        if "_tool_router" not in cls.__dict__:
+            cls._tool_router = self.build_tool_router()
+        return cls._tool_router
+
+    async def _handle_prerouted_query(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Handle a query whose tool call the pre-router resolved locally, or return None to use handle_message"""
+        query = params.get("query")
+        if not query or params.get("tool") or os.getenv("MESH_PREROUTER_ENABLED", "false").lower() != "true":
+            return None
+        router = self.tool_router
+        match = router.route(query) if router else None
+        if match is None:
+            return None
+
+        logger.info(
+            f"Pre-routed query | Agent: {self.agent_name} | Tool: {match.tool} | Source: {match.source} | "
+            f"Confidence: {match.confidence:.2f} | Hit rate: {router.stats.hit_rate:.2f}"
+        )
+        return await self._run_prerouted_tool(params, match)
+
+    @monitor_execution()
+    @with_retry(max_retries=3)
+    async def _run_prerouted_tool(self, params: Dict[str, Any], match: RouteMatch) -> Dict[str, Any]:
+        """
+        Call the pre-routed tool and explain its result, retried and monitored like handle_message. Agents
+        that keep per-request state in handle_message (e.g. the message for progress updates) set it here too.
+        """
+        data = await self._handle_tool_logic(tool_name=match.tool, function_args=match.arguments)
+        if params.get("raw_data_only"):
+            return {"response": "", "data": data}
+
+        explanation = await self._respond_with_llm(
+            query=params["query"], tool_call_id=f"prerouted_{match.tool}", data=data, temperature=0.7
+        )
+        return {"response": explanation, "data": data}
 
     async def _before_handle_message(self, params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Hook called before message handling. Return modified params or None"""
@@ -95,14 +304,27 @@ class MeshAgent(ABC):
         return None
 
     def set_heurist_api_key(self, api_key: str) -> None:
-        self.heurist_api_key = api_key
+        """Use api_key for the request handled in the current context only"""
+        _request_context.set(replace(self.request_context, heurist_api_key=api_key))
 
     def push_update(self, params: Dict[str, Any], content: str) -> None:
-        """Always push to origin_task_id if available"""
-        update_task_id = self._origin_task_id or self._task_id
-        if update_task_id:
-            logger.info(f"Pushing update | Task: {update_task_id} | Content: {content}")
-            self.mesh_client.push_update(update_task_id, content)
+        """
+        Always push to origin_task_id if available. Updates are sent in the background, never blocking.
+        Also safe to call from a worker thread running blocking work, e.g. with asyncio.to_thread.
+        """
+        update_task_id = self.origin_task_id or self.task_id
+        if not update_task_id:
+            return
+        logger.info(f"Pushing update | Task: {update_task_id} | Content: {content}")
+        loop = self.request_context.loop
+        try:
+            on_loop = asyncio.get_running_loop() is loop
+        except RuntimeError:
+            on_loop = False
+        if loop is None or on_loop or loop.is_closed():
+            self.mesh_client.enqueue_update(update_task_id, content)
+        else:
+            loop.call_soon_threadsafe(self.mesh_client.enqueue_update, update_task_id, content)
 
     async def cleanup(self):
         """Cleanup API clients"""
@@ -112,6 +334,8 @@ class MeshAgent(ABC):
 
     def __del__(self):
         """Destructor to ensure cleanup of resources"""
+        if not getattr(self, "_api_clients", None):
+            return  # Already cleaned up, no need to touch the event loop
         try:
             loop = asyncio.get_event_loop()
             if loop.is_running():
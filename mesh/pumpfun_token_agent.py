@@ -7,7 +7,8 @@ from typing import Any, Dict, List
 import aiohttp
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -401,8 +402,7 @@ Guidelines:
         Returns:
             Dict: Query results
         """
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        session = self.session or get_shared_session()
 
         url = "https://streaming.bitquery.io/eap"
         headers = {"Content-Type": "application/json", "Authorization": f"Bearer {os.getenv('BITQUERY_API_KEY')}"}
@@ -412,7 +412,7 @@ Guidelines:
             payload["variables"] = variables
 
         try:
-            async with self.session.post(url, json=payload, headers=headers) as response:
+            async with session.post(url, json=payload, headers=headers) as response:
                 response.raise_for_status()
                 data = await response.json()
 
@@ -450,7 +450,8 @@ Guidelines:
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
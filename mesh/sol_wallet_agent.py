@@ -9,7 +9,8 @@ import pydash as _py
 from dotenv import load_dotenv
 from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -64,28 +65,28 @@ class SolWalletAgent(MeshAgent):
         )
 
     async def _request(self, method, url, data=None, json=None, headers=None, params=None, timeout=30):
-        """Make a request to the Helius API using a new session for each request"""
+        """Make a request to the Helius API through the shared connection pool"""
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
-                    method,
-                    url,
-                    data=data,
-                    json=json,
-                    headers=headers,
-                    params=params,
-                    timeout=aiohttp.ClientTimeout(total=timeout),
-                ) as response:
-                    match response.status:
-                        case 200:
-                            return await response.json()
-                        case 429:
-                            raise aiohttp.ClientError("Rate limit exceeded")
-                        case _:
-                            # should add better error log
-                            txt = await response.text()
-                            logger.error(txt)
-                            return {}
+            session = get_shared_session()
+            async with session.request(
+                method,
+                url,
+                data=data,
+                json=json,
+                headers=headers,
+                params=params,
+                timeout=aiohttp.ClientTimeout(total=timeout),
+            ) as response:
+                match response.status:
+                    case 200:
+                        return await response.json()
+                    case 429:
+                        raise aiohttp.ClientError("Rate limit exceeded")
+                    case _:
+                        # should add better error log
+                        txt = await response.text()
+                        logger.error(txt)
+                        return {}
 
         except aiohttp.ClientResponseError as e:
             error_msg = f"HTTP error {e.status}: {e.message}"
@@ -185,7 +186,8 @@ class SolWalletAgent(MeshAgent):
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -556,7 +558,7 @@ class SolWalletAgent(MeshAgent):
             tool_call_name = tool_call.function.name
             tool_call_args = json.loads(tool_call.function.arguments)
 
-            data = await self._handle_tool_logic(tool_name=tool_call_name, function_args=tool_call_args)
+            data = await self._handle_tool_calls(response, tool_call_name, tool_call_args)
 
             if raw_data_only:
                 return {"response": "", "data": data}
@@ -0,0 +1,212 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Pattern, Set, Tuple
+
+EVM_ADDRESS_PATTERN = re.compile(r"\b0x[a-fA-F0-9]{40}\b")
+SOLANA_ADDRESS_PATTERN = re.compile(r"\b[1-9A-HJ-NP-Za-km-z]{32,44}\b")
+
+# Words that say nothing about which tool to pick
+# fmt: off
+STOPWORDS = {
+    "a", "about", "all", "an", "and", "any", "are", "at", "by", "can", "check", "current", "currently", "data",
+    "details", "do", "for", "from", "get", "give", "i", "in", "info", "information", "is", "it", "latest", "list",
+    "me", "most", "my", "now", "of", "on", "please", "query", "right", "search", "show", "tell", "the", "this",
+    "to", "today", "top", "what", "whats", "which", "with", "you",
+}
+# fmt: on
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Keywords can't tell "trending coins" from "coins that are not trending", so negated queries go to the LLM
+NEGATION_PATTERN = re.compile(r"\b(?:not|no|non|none|never|without|except|excluding)\b|n't\b", re.IGNORECASE)
+
+
+def _normalize(word: str) -> str:
+    # Crude singularization so "tokens" matches "token"
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def _keywords(text: str) -> Set[str]:
+    return {_normalize(word) for word in TOKEN_PATTERN.findall(text.lower()) if word not in STOPWORDS}
+
+
+def _find_addresses(query: str) -> Tuple[List[str], List[str]]:
+    evm = EVM_ADDRESS_PATTERN.findall(query)
+    solana = [address for address in SOLANA_ADDRESS_PATTERN.findall(query) if not address.startswith("0x")]
+    return evm, solana
+
+
+def _strip_addresses(query: str) -> str:
+    return SOLANA_ADDRESS_PATTERN.sub(" ", EVM_ADDRESS_PATTERN.sub(" ", query))
+
+
+@dataclass
+class RouteMatch:
+    tool: str
+    arguments: Dict[str, Any]
+    confidence: float
+    source: str
+
+
+@dataclass
+class RouterStats:
+    rule_hits: int = 0
+    keyword_hits: int = 0
+    fallbacks: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        hits = self.rule_hits + self.keyword_hits
+        total = hits + self.fallbacks
+        return hits / total if total else 0.0
+
+
+@dataclass
+class RouteRule:
+    """Route queries matching pattern to tool, with arguments built from the regex match"""
+
+    pattern: Pattern
+    tool: str
+    build_arguments: Callable[[re.Match], Dict[str, Any]] = lambda match: {}
+    confidence: float = 1.0
+
+
+@dataclass
+class _ToolProfile:
+    name: str
+    name_keywords: Set[str]
+    description_keywords: Set[str]
+    address_param: Optional[str]
+    address_kind: Optional[str]
+    fillable: bool = field(default=True)
+
+
+class ToolRouter:
+    """
+    Resolves a natural language query to a tool call without asking the LLM, when the answer is obvious.
+
+    Queries are tried against, in order:
+    - explicit regex rules added with add_rule()
+    - keyword maps built from the tool names and descriptions in the tool schemas, for tools whose
+      required arguments are either absent or a single address that can be taken from the query
+
+    Queries containing a negation ("not", "without", ...) are only tried against the rules. A route is
+    only returned when its confidence reaches min_confidence, otherwise the caller should fall back to
+    the LLM.
+    """
+
+    def __init__(
+        self,
+        tool_schemas: List[Dict[str, Any]],
+        min_confidence: float = 0.8,
+        min_margin: float = 0.2,
+        max_query_words: int = 12,
+    ):
+        self.min_confidence = min_confidence
+        self.min_margin = min_margin
+        self.max_query_words = max_query_words
+        self.rules: List[RouteRule] = []
+        self.stats = RouterStats()
+        self.tools = {profile.name: profile for profile in map(self._profile_tool, tool_schemas)}
+
+    def add_rule(
+        self,
+        pattern: str,
+        tool: str,
+        build_arguments: Callable[[re.Match], Dict[str, Any]] = lambda match: {},
+        confidence: float = 1.0,
+    ) -> None:
+        self.rules.append(RouteRule(re.compile(pattern, re.IGNORECASE), tool, build_arguments, confidence))
+
+    @staticmethod
+    def _profile_tool(schema: Dict[str, Any]) -> _ToolProfile:
+        function = schema.get("function", schema)
+        parameters = function.get("parameters", {})
+        properties = parameters.get("properties", {})
+        required = parameters.get("required", [])
+        description = function.get("description", "")
+
+        address_param, address_kind, fillable = None, None, True
+        for param in required:
+            spec = properties.get(param, {})
+            if address_param is None and "address" in param and spec.get("type") == "string":
+                address_param = param
+                text = f"{description} {spec.get('description', '')}".lower()
+                if "solana" in text and "0x" not in text:
+                    address_kind = "solana"
+                elif "0x" in text or "evm" in text or "ethereum" in text:
+                    address_kind = "evm"
+            else:
+                fillable = False
+
+        return _ToolProfile(
+            name=function["name"],
+            name_keywords=_keywords(function["name"].replace("_", " ")),
+            description_keywords=_keywords(description),
+            address_param=address_param,
+            address_kind=address_kind,
+            fillable=fillable,
+        )
+
+    def _fill_arguments(self, profile: _ToolProfile, query: str) -> Optional[Dict[str, Any]]:
+        if not profile.fillable:
+            return None
+        if profile.address_param is None:
+            return {}
+        evm, solana = _find_addresses(query)
+        candidates = {"evm": evm, "solana": solana}.get(profile.address_kind, evm + solana)
+        if len(set(candidates)) != 1:
+            return None
+        return {profile.address_param: candidates[0]}
+
+    def _route_by_rules(self, query: str) -> Optional[RouteMatch]:
+        for rule in self.rules:
+            match = rule.pattern.search(query)
+            if match:
+                return RouteMatch(rule.tool, rule.build_arguments(match), rule.confidence, "rule")
+        return None
+
+    def _route_by_keywords(self, query: str) -> Optional[RouteMatch]:
+        query_keywords = _keywords(_strip_addresses(query))
+        if not query_keywords:
+            return None
+
+        scored = []
+        for profile in self.tools.values():
+            if not profile.name_keywords:
+                continue
+            # How much of the tool name the query mentions, and how much of the query the tool explains
+            name_ratio = len(profile.name_keywords & query_keywords) / len(profile.name_keywords)
+            tool_keywords = profile.name_keywords | profile.description_keywords
+            coverage = len(query_keywords & tool_keywords) / len(query_keywords)
+            scored.append((0.6 * name_ratio + 0.4 * coverage, profile))
+        if not scored:
+            return None
+
+        scored.sort(key=lambda item: item[0], reverse=True)
+        confidence, profile = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if confidence < self.min_confidence or confidence - runner_up < self.min_margin:
+            return None
+        arguments = self._fill_arguments(profile, query)
+        if arguments is None:
+            return None
+        return RouteMatch(profile.name, arguments, confidence, "keywords")
+
+    def route(self, query: str) -> Optional[RouteMatch]:
+        """Return the tool call for query, or None if the LLM should decide"""
+        match = None
+        if len(query.split()) <= self.max_query_words:
+            match = self._route_by_rules(query)
+            if match is None and not NEGATION_PATTERN.search(query):
+                match = self._route_by_keywords(query)
+
+        if match is None or match.tool not in self.tools or match.confidence < self.min_confidence:
+            self.stats.fallbacks += 1
+            return None
+
+        if match.source == "rule":
+            self.stats.rule_hits += 1
+        else:
+            self.stats.keyword_hits += 1
+        return match
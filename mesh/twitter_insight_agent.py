@@ -6,7 +6,8 @@ from typing import Any, Dict, List
 import aiohttp
 from dotenv import load_dotenv
 
-from core.llm import call_llm_async, call_llm_with_tools_async
+from clients.http_session import get_shared_session
+from core.llm import call_llm_with_tools_async
 from decorators import monitor_execution, with_cache, with_retry
 
 from .mesh_agent import MeshAgent
@@ -186,7 +187,8 @@ class TwitterInsightAgent(MeshAgent):
         Reusable helper to ask the LLM to generate a user-friendly explanation
         given a piece of data from a tool call.
         """
-        return await call_llm_async(
+        return await self._explain_with_llm(
+            data,
             base_url=self.heurist_base_url,
             api_key=self.heurist_api_key,
             model_id=self.metadata["large_model_id"],
@@ -198,6 +200,10 @@ class TwitterInsightAgent(MeshAgent):
             temperature=temperature,
         )
 
+    def build_tool_router(self) -> None:
+        # _handle_tool_logic here also explains the result, so queries always go through handle_message
+        return None
+
     def _handle_error(self, maybe_error: dict) -> dict:
         """
         Small helper to return the error if present in
@@ -221,10 +227,7 @@ class TwitterInsightAgent(MeshAgent):
     @with_retry(max_retries=3)
     async def get_smart_followers_history(self, username: str, timeframe: str = "D7") -> Dict:
         """Get historical data on smart followers count"""
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
+        session = self.session or get_shared_session()
 
         try:
             clean_username = self._clean_username(username)
@@ -233,7 +236,7 @@ class TwitterInsightAgent(MeshAgent):
 
             headers = {"accept": "application/json", "Api-Key": self.api_key}
 
-            async with self.session.get(url, headers=headers, params=params) as response:
+            async with session.get(url, headers=headers, params=params) as response:
                 if response.status != 200:
                     return {"error": f"Failed to get followers history for {clean_username}: {response.status}"}
 
@@ -242,19 +245,12 @@ class TwitterInsightAgent(MeshAgent):
         except Exception as e:
             logger.error(f"Error getting smart followers history: {str(e)}")
             return {"error": f"Failed to fetch smart followers history: {str(e)}"}
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
 
     @with_cache(ttl_seconds=3600)  # Cache for 1 hour
     @with_retry(max_retries=3)
     async def get_smart_followers_categories(self, username: str) -> Dict:
         """Get categories of smart followers"""
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
+        session = self.session or get_shared_session()
 
         try:
             clean_username = self._clean_username(username)
@@ -262,7 +258,7 @@ class TwitterInsightAgent(MeshAgent):
 
             headers = {"accept": "application/json", "Api-Key": self.api_key}
 
-            async with self.session.get(url, headers=headers) as response:
+            async with session.get(url, headers=headers) as response:
                 if response.status != 200:
                     return {"error": f"Failed to get follower categories for {clean_username}: {response.status}"}
 
@@ -271,10 +267,6 @@ class TwitterInsightAgent(MeshAgent):
         except Exception as e:
             logger.error(f"Error getting smart followers categories: {str(e)}")
             return {"error": f"Failed to fetch smart followers categories: {str(e)}"}
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
 
     @with_cache(ttl_seconds=1800)  # Cache for 30 minutes
     @with_retry(max_retries=3)
@@ -282,10 +274,7 @@ class TwitterInsightAgent(MeshAgent):
         self, username: str, limit: int = 100, fromDate: int = None, toDate: int = None
     ) -> Dict:
         """Get recent smart mentions feed"""
-        should_close = False
-        if not self.session:
-            self.session = aiohttp.ClientSession()
-            should_close = True
+        session = self.session or get_shared_session()
 
         try:
             clean_username = self._clean_username(username)
@@ -299,7 +288,7 @@ class TwitterInsightAgent(MeshAgent):
 
             headers = {"accept": "application/json", "Api-Key": self.api_key}
 
-            async with self.session.get(url, headers=headers, params=params) as response:
+            async with session.get(url, headers=headers, params=params) as response:
                 if response.status != 200:
                     return {"error": f"Failed to get mentions feed for {clean_username}: {response.status}"}
 
@@ -308,10 +297,6 @@ class TwitterInsightAgent(MeshAgent):
         except Exception as e:
             logger.error(f"Error getting smart mentions feed: {str(e)}")
             return {"error": f"Failed to fetch smart mentions feed: {str(e)}"}
-        finally:
-            if should_close and self.session:
-                await self.session.close()
-                self.session = None
 
     # ------------------------------------------------------------------------
     #                      COMMON HANDLER LOGIC
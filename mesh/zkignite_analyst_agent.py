@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from typing import Any, Dict, List, Optional
@@ -303,14 +304,16 @@ class ZkIgniteAnalystAgent(MeshAgent):
         self.current_message = params
 
         try:
-            result = self.agent.run(
+            # smolagents is synchronous, run it off the event loop so progress updates go out meanwhile
+            result = await asyncio.to_thread(
+                self.agent.run,
                 f"""Analyze this query and provide insights: {query}
 
 Guidelines:
 - Combine data from multiple tools when needed
 - Format numbers clearly (e.g. $1.5M, 15.2%) without too many decimals
 - Keep response concise and focused on key insights
-"""
+""",
             )
 
             return {"response": result.to_string(), "reasoning_steps": self.agent.memory.get_succinct_steps()}
@@ -1,15 +1,23 @@
+import asyncio
+import gzip
+import hashlib
+import json
 import logging
 import os
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
 
-import aiohttp
 import uvicorn
-from fastapi import Depends, FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from pydantic import BaseModel
 
-from mesh_manager import AgentLoader, Config
+from clients.credits_client import CreditsClient
+from clients.http_session import close_shared_session
+from clients.mesh_client import close_task_update_senders
+from core.openai_clients import close_openai_clients
+from mesh_manager import AgentLoader, AgentPool, Config, LazyAgentRegistry
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
 logger = logging.getLogger("MeshAPI")
@@ -31,6 +39,98 @@ app.add_middleware(
 
 config = Config()
 agents_dict = AgentLoader(config).load_agents()
+agent_pool = AgentPool(agents_dict, max_idle=config.agent_pool_size)
+
+# API credit deduction, enabled when HEURIST_CREDITS_DEDUCTION_API is set
+credits_api_url = os.getenv("HEURIST_CREDITS_DEDUCTION_API")
+credits_api_auth = os.getenv("HEURIST_CREDITS_DEDUCTION_AUTH")
+credits_client = (
+    CreditsClient(credits_api_url, credits_api_auth, cache_ttl=float(os.getenv("HEURIST_CREDITS_CACHE_TTL", "60")))
+    if credits_api_url and credits_api_auth
+    else None
+)
+# Opt-in: for API keys whose credits were recently deducted, start the agent while credits are being deducted,
+# cancelling it if the deduction fails. Otherwise credits are always deducted before the agent starts.
+credits_concurrent_validation = os.getenv("HEURIST_CREDITS_CONCURRENT_VALIDATION", "false").lower() == "true"
+
+
+class AgentCatalog:
+    """
+    Pre-serialized /agents response. It is built on first use and only rebuilt when the set of
+    registered agents changes, and kept both as plain and gzip-compressed JSON with an ETag.
+    """
+
+    def __init__(self, agents: Dict):
+        self.agents = agents
+        self._registry_key: Optional[Tuple[str, ...]] = None
+        self.body: bytes = b""
+        self.gzip_body: bytes = b""
+        self.etag: str = ""
+
+    def invalidate(self) -> None:
+        self._registry_key = None
+
+    def _build_agents_info(self) -> Dict[str, Any]:
+        if isinstance(self.agents, LazyAgentRegistry):
+            # Serve the manifest so listing agents doesn't import every agent module
+            return {
+                agent_id: {"metadata": entry["metadata"], "module": entry["module"], "tools": entry.get("tools")}
+                for agent_id, entry in self.agents.manifest["agents"].items()
+            }
+
+        agents_info = {}
+        for agent_id, agent_cls in self.agents.items():
+            agent = agent_cls()
+            tools = None
+            if hasattr(agent, "get_tool_schemas") and callable(agent.get_tool_schemas):
+                tools = agent.get_tool_schemas()
+
+            agents_info[agent_id] = {
+                "metadata": agent.metadata,
+                "module": agent_cls.__module__.split(".")[-1],
+                "tools": tools,
+            }
+        return agents_info
+
+    def refresh(self) -> None:
+        """Rebuild the serialized catalog if the agent registry changed since the last build"""
+        registry_key = tuple(self.agents)
+        if registry_key == self._registry_key:
+            return
+
+        self.body = json.dumps(self._build_agents_info(), separators=(",", ":"), default=str).encode("utf-8")
+        self.gzip_body = gzip.compress(self.body)
+        self.etag = f'"{hashlib.sha256(self.body).hexdigest()[:32]}"'
+        self._registry_key = registry_key
+        logger.info(f"Built agent catalog for {len(registry_key)} agents ({len(self.body)} bytes)")
+
+
+agent_catalog = AgentCatalog(agents_dict)
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in candidates or any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def _accepts_gzip(accept_encoding: Optional[str]) -> bool:
+    """Whether Accept-Encoding allows gzip, by name or through "*", with a non-zero q-value"""
+    qualities = {}
+    for item in (accept_encoding or "").split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if coding:
+            qualities[coding.lower()] = quality
+    return qualities.get("gzip", qualities.get("*", 0.0)) > 0
 
 
 class MeshRequest(BaseModel):
@@ -38,6 +138,8 @@ class MeshRequest(BaseModel):
     input: Dict[str, Any]
     api_key: str | None = None
     heurist_api_key: str | None = None
+    # Respond with server-sent events: the tool data first, then the explanation token by token
+    stream: bool = False
 
 
 async def get_api_key(
@@ -55,19 +157,10 @@ async def process_mesh_request(request: MeshRequest, api_key: str = Depends(get_
     if request.agent_id not in agents_dict:
         raise HTTPException(status_code=404, detail=f"Agent {request.agent_id} not found")
 
-    agent_cls = agents_dict[request.agent_id]
-    agent = agent_cls()
-
-    if request.heurist_api_key:
-        agent.set_heurist_api_key(
-            request.heurist_api_key
-        )  # this is the api key for the agent to authenticate with the heurist api, from config file if not provided
-
     # Handle API credit deduction if enabled
-    credits_api_url = os.getenv("HEURIST_CREDITS_DEDUCTION_API")
-    credits_api_auth = os.getenv("HEURIST_CREDITS_DEDUCTION_AUTH")
+    credits_task = None
     if credits_api_url:
-        if not credits_api_auth:
+        if not credits_client:
             raise HTTPException(status_code=500, detail="Credits API auth not configured")
         try:
             # Parse user_id and api_key, split by first occurrence only, this is passed in from the user
@@ -75,55 +168,99 @@ async def process_mesh_request(request: MeshRequest, api_key: str = Depends(get_
                 user_id, api_key = api_key.split("#", 1)
             else:
                 user_id, api_key = api_key.split("-", 1)
-
-            logger.info(f"Deducting credits for agent {request.agent_id} with user_id {user_id} and api_key {api_key}")
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    credits_api_url,
-                    headers={"Authorization": credits_api_auth},
-                    json={"user_id": user_id, "api_key": api_key, "model_type": "AGENT", "model_id": request.agent_id},
-                ) as response:
-                    if response.status != 200:
-                        raise HTTPException(status_code=403, detail="API credit validation failed")
         except ValueError:
             raise HTTPException(status_code=401, detail="Invalid API key format")
-        except Exception as e:
-            logger.error(f"Error validating API credits: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail="Error validating API credits")
+
+        logger.info(f"Deducting credits for agent {request.agent_id} with user_id {user_id} and api_key {api_key}")
+        overlap = credits_concurrent_validation and credits_client.is_recently_validated(user_id, api_key)
+        credits_task = asyncio.create_task(credits_client.deduct(user_id, api_key, request.agent_id))
+        if not overlap or request.stream:
+            # A streamed response commits to a 200 status, so credits are settled before it starts
+            await _check_credits(credits_task)
+            credits_task = None
+
+    if request.stream:
+        return StreamingResponse(
+            _stream_mesh_request(request),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     try:
-        result = await agent.call_agent(request.input)
-        await agent.cleanup()
-        return result
+        async with agent_pool.acquire(request.agent_id) as agent:
+            if request.heurist_api_key:
+                agent.set_heurist_api_key(
+                    request.heurist_api_key
+                )  # this is the api key for the agent to authenticate with the heurist api, from config file if not provided
+
+            agent_task = asyncio.create_task(agent.call_agent(request.input))
+            if credits_task:
+                try:
+                    await _check_credits(credits_task)
+                except HTTPException:
+                    agent_task.cancel()
+                    await asyncio.gather(agent_task, return_exceptions=True)
+                    raise
+            return await agent_task
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error processing request: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _stream_mesh_request(request: MeshRequest) -> AsyncIterator[str]:
+    try:
+        async with agent_pool.acquire(request.agent_id) as agent:
+            if request.heurist_api_key:
+                agent.set_heurist_api_key(request.heurist_api_key)
+
+            async for event in agent.call_agent_stream(request.input):
+                yield _format_sse(event["event"], event["data"])
+    except Exception as e:
+        logger.error(f"Error processing streamed request: {e}", exc_info=True)
+        yield _format_sse("error", {"detail": str(e)})
+
+
+def _format_sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _check_credits(credits_task: asyncio.Task) -> None:
+    try:
+        validated = await credits_task
+    except Exception as e:
+        logger.error(f"Error validating API credits: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Error validating API credits")
+    if not validated:
+        raise HTTPException(status_code=403, detail="API credit validation failed")
+
+
+@app.on_event("shutdown")
+async def close_agent_pool():
+    await agent_pool.close()
+    await close_task_update_senders()
+    await close_shared_session()
+    await close_openai_clients()
+
+
 @app.get("/agents")
-async def list_agents():
+async def list_agents(request: Request):
     """
     Return a list of available agents and their metadata,
     including any tools that each agent supports.
     """
-    agents_info = {}
-    for agent_id, agent_cls in agents_dict.items():
-        agent = agent_cls()
-        # We can optionally re-generate or just rely on the stored metadata from S3.
-        # For a quick approach, re-attach the tools right now.
-        tools = None
-        if hasattr(agent, "get_tool_schemas") and callable(agent.get_tool_schemas):
-            tools = agent.get_tool_schemas()
-
-        agents_info[agent_id] = {
-            "metadata": agent.metadata,
-            "module": agent_cls.__module__.split(".")[-1],
-            "tools": tools,
-        }
-
-        logger.info(f"Agent {agent_id} has tools: {tools}")
-
-    return agents_info
+    agent_catalog.refresh()
+    headers = {"ETag": agent_catalog.etag, "Vary": "Accept-Encoding"}
+
+    if _etag_matches(request.headers.get("if-none-match"), agent_catalog.etag):
+        return Response(status_code=304, headers=headers)
+
+    if _accepts_gzip(request.headers.get("accept-encoding")):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=agent_catalog.gzip_body, media_type="application/json", headers=headers)
+
+    return Response(content=agent_catalog.body, media_type="application/json", headers=headers)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,13 @@
+import argparse
 import asyncio
 import json
 import os
 import re
 import sys
+import threading
 import time
+from collections.abc import Mapping
+from contextlib import asynccontextmanager
 
 try:
     from datetime import UTC, datetime
@@ -14,15 +18,20 @@ except ImportError:
 from importlib import import_module
 from pathlib import Path
 from pkgutil import iter_modules
-from typing import Dict, Type
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional, Type
 
 import aiohttp
-import boto3
 from dotenv import load_dotenv
 from loguru import logger
 
+from clients.http_session import close_shared_session, get_shared_session
+from clients.mesh_client import close_task_update_senders, flush_task_updates
+from core.openai_clients import close_openai_clients
 from mesh.mesh_agent import MeshAgent
 
+if TYPE_CHECKING:
+    import boto3
+
 # Configure loguru
 logger.remove()  # Remove default handler
 logger.add(
@@ -42,9 +51,23 @@ class Config:
         # Server configuration
         self.protocol_v2_url = os.getenv("PROTOCOL_V2_SERVER_URL", "https://sequencer-v2.heurist.xyz")
         self.poll_interval = float(os.getenv("POLL_INTERVAL_SECONDS", "2.0"))
+        # "per_agent" runs one poll loop per agent, "multiplexed" polls for all agents in a single request
+        self.poll_mode = os.getenv("POLL_MODE", "per_agent").lower()
+        # Max in-flight tasks per agent, overridable per agent e.g. "DeepResearchAgent=2,EchoAgent=8"
+        self.max_concurrent_tasks = int(os.getenv("MAX_CONCURRENT_TASKS_PER_AGENT", "1"))
+        self.agent_max_concurrent_tasks = self._parse_agent_limits(os.getenv("AGENT_MAX_CONCURRENT_TASKS", ""))
+        # Max idle agent instances kept per agent ID by AgentPool
+        self.agent_pool_size = int(os.getenv("AGENT_POOL_SIZE", "4"))
         self.auth_token = os.getenv("PROTOCOL_V2_AUTH_TOKEN", "test_key")
         self.agent_type = "AGENT"
 
+        # Agent loading: with LAZY_AGENT_LOADING=true agents come from the manifest written by
+        # `python mesh_manager.py sync-metadata` and their modules are imported on first use
+        self.lazy_agent_loading = os.getenv("LAZY_AGENT_LOADING", "false").lower() == "true"
+        self.agent_manifest_path = Path(
+            os.getenv("AGENT_MANIFEST_PATH", str(Path(__file__).parent / "mesh" / "agents_manifest.json"))
+        )
+
         # S3 configuration
         self.s3_endpoint = os.getenv("S3_ENDPOINT")
         self.s3_access_key = os.getenv("ACCESS_KEY")
@@ -52,16 +75,74 @@ class Config:
         self.s3_bucket = os.getenv("S3_BUCKET", "mesh")
         self.s3_region = "enam"
 
+    @staticmethod
+    def _parse_agent_limits(value: str) -> Dict[str, int]:
+        limits = {}
+        for item in value.split(","):
+            if "=" not in item:
+                continue
+            agent_id, limit = item.split("=", 1)
+            try:
+                limits[agent_id.strip()] = max(1, int(limit))
+            except ValueError:
+                logger.warning(f"Ignoring invalid concurrency limit for {agent_id.strip()}: {limit}")
+        return limits
+
+    def get_max_concurrent_tasks(self, agent_id: str) -> int:
+        return self.agent_max_concurrent_tasks.get(agent_id, max(1, self.max_concurrent_tasks))
+
+
+class LazyAgentRegistry(Mapping):
+    """
+    Read-only mapping of agent ID to agent class backed by the agent manifest.
+    An agent's module is only imported the first time its class is looked up.
+    """
+
+    def __init__(self, manifest: Dict):
+        self.manifest = manifest
+        self._classes: Dict[str, Type[MeshAgent]] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, agent_id: str) -> Type[MeshAgent]:
+        agent_cls = self._classes.get(agent_id)
+        if agent_cls is not None:
+            return agent_cls
+
+        entry = self.manifest["agents"][agent_id]
+        with self._lock:
+            if agent_id not in self._classes:
+                mod = import_module(f"mesh.{entry['module']}")
+                self._classes[agent_id] = getattr(mod, agent_id)
+                logger.info(f"Loaded agent {agent_id} ({entry['module']})")
+        return self._classes[agent_id]
+
+    def __contains__(self, agent_id: object) -> bool:
+        return agent_id in self.manifest["agents"]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.manifest["agents"])
+
+    def __len__(self) -> int:
+        return len(self.manifest["agents"])
+
 
 class AgentLoader:
     """Handles dynamic loading of agent modules and metadata management"""
 
     def __init__(self, config: Config):
         self.config = config
-        self.s3_client = self._init_s3_client()
+        self._s3_client = None
+
+    @property
+    def s3_client(self) -> "boto3.client":
+        if self._s3_client is None:
+            self._s3_client = self._init_s3_client()
+        return self._s3_client
 
-    def _init_s3_client(self) -> boto3.client:
+    def _init_s3_client(self) -> "boto3.client":
         """Initialize S3 client"""
+        import boto3
+
         return boto3.client(
             "s3",
             region_name=self.config.s3_region,
@@ -85,28 +166,10 @@ class AgentLoader:
             logger.error(f"Failed to download metadata from S3: {e}")
             return {"last_updated": datetime.now(UTC).isoformat(), "agents": {}}
 
-    def _create_metadata(self, agents_dict: Dict[str, Type[MeshAgent]]) -> Dict:
-        """Update metadata for discovered agents"""
-        # First download existing metadata
-        metadata = self._download_existing_metadata()
-
-        # Update the timestamp
-        metadata["last_updated"] = datetime.now(UTC).isoformat()
-        metadata["last_updated_by"] = "mesh_manager.py"
-
-        # Ensure agents key exists
-        if "agents" not in metadata:
-            metadata["agents"] = {}
-
-        # track current agent ids for cleanup
-        current_agent_ids = set()
-
+    def _build_agent_entries(self, agents_dict: Dict[str, Type[MeshAgent]]) -> Dict[str, Dict]:
+        """Instantiate every agent once and collect its metadata, module and tool schemas"""
+        entries = {}
         for agent_id, agent_cls in agents_dict.items():
-            # Skip EchoAgent
-            if "EchoAgent" in agent_id:
-                continue
-
-            current_agent_ids.add(agent_id)
             logger.info(f"Updating metadata for agent {agent_id}")
             agent = agent_cls()
 
@@ -142,22 +205,48 @@ class AgentLoader:
             # Update agent metadata with tool-derived inputs
             agent.metadata["inputs"] = inputs
 
+            entries[agent_id] = {
+                "metadata": agent.metadata,
+                "module": agent_cls.__module__.split(".")[-1],
+                "tools": tools,
+            }
+        return entries
+
+    def _create_metadata(self, agent_entries: Dict[str, Dict]) -> Dict:
+        """Update metadata for discovered agents"""
+        # First download existing metadata
+        metadata = self._download_existing_metadata()
+
+        # Update the timestamp
+        metadata["last_updated"] = datetime.now(UTC).isoformat()
+        metadata["last_updated_by"] = "mesh_manager.py"
+
+        # Ensure agents key exists
+        if "agents" not in metadata:
+            metadata["agents"] = {}
+
+        # track current agent ids for cleanup
+        current_agent_ids = set()
+
+        for agent_id, entry in agent_entries.items():
+            # Skip EchoAgent
+            if "EchoAgent" in agent_id:
+                continue
+
+            current_agent_ids.add(agent_id)
+
             # Create new agent entry or update existing one
             if agent_id not in metadata["agents"]:
-                metadata["agents"][agent_id] = {
-                    "metadata": agent.metadata,
-                    "module": agent_cls.__module__.split(".")[-1],
-                    "tools": tools,
-                }
+                metadata["agents"][agent_id] = entry
             else:
                 # Update only the fields from the agent class, preserving other fields
                 existing_metadata = metadata["agents"][agent_id].get("metadata", {})
-                for key, value in agent.metadata.items():
+                for key, value in entry["metadata"].items():
                     existing_metadata[key] = value
 
                 metadata["agents"][agent_id]["metadata"] = existing_metadata
-                metadata["agents"][agent_id]["module"] = agent_cls.__module__.split(".")[-1]
-                metadata["agents"][agent_id]["tools"] = tools
+                metadata["agents"][agent_id]["module"] = entry["module"]
+                metadata["agents"][agent_id]["tools"] = entry["tools"]
 
         # remove any old agents that no longer exist
         old_agent_ids = set(metadata["agents"].keys()) - current_agent_ids
@@ -235,50 +324,97 @@ class AgentLoader:
         except Exception as e:
             logger.error(f"Failed to update README: {e}")
 
-    def load_agents(self) -> Dict[str, Type[MeshAgent]]:
+    def _write_manifest(self, agent_entries: Dict[str, Dict]) -> None:
+        """Persist the agent manifest used by lazy agent loading"""
+        manifest = {"generated_at": datetime.now(UTC).isoformat(), "agents": agent_entries}
+        try:
+            self.config.agent_manifest_path.write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+            logger.info(f"Wrote agent manifest with {len(agent_entries)} agents to {self.config.agent_manifest_path}")
+        except Exception as e:
+            logger.error(f"Failed to write agent manifest {self.config.agent_manifest_path}: {e}")
+
+    def load_agent_manifest(self) -> Optional[Dict]:
+        """Read the persisted agent manifest, None if it is missing or unreadable"""
+        try:
+            with open(self.config.agent_manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Failed to read agent manifest {self.config.agent_manifest_path}: {e}")
+            return None
+
+    def discover_agents(self) -> Dict[str, Type[MeshAgent]]:
+        """Import every module in mesh/ and collect the MeshAgent subclasses"""
         agents_dict = {}
         package_name = "mesh"
         found_agents = []
         import_errors = []
 
-        try:
-            package = import_module(package_name)
-            package_path = Path(package.__file__).parent
+        package = import_module(package_name)
+        package_path = Path(package.__file__).parent
 
-            for _, module_name, is_pkg in iter_modules([str(package_path)]):
-                if is_pkg:
-                    continue
+        for _, module_name, is_pkg in iter_modules([str(package_path)]):
+            if is_pkg:
+                continue
 
-                full_module_name = f"{package_name}.{module_name}"
-                try:
-                    mod = import_module(full_module_name)
-                    for attr_name in dir(mod):
-                        attr = getattr(mod, attr_name)
-                        if isinstance(attr, type) and issubclass(attr, MeshAgent) and attr is not MeshAgent:
-                            agents_dict[attr.__name__] = attr
-                            found_agents.append(f"{attr.__name__} ({module_name})")
-
-                except ImportError as e:
-                    import_errors.append(f"{module_name}: {str(e)}")
-                    continue
-                except Exception as e:
-                    import_errors.append(f"{module_name}: Unexpected error: {str(e)}")
-                    continue
+            full_module_name = f"{package_name}.{module_name}"
+            try:
+                mod = import_module(full_module_name)
+                for attr_name in dir(mod):
+                    attr = getattr(mod, attr_name)
+                    if isinstance(attr, type) and issubclass(attr, MeshAgent) and attr is not MeshAgent:
+                        agents_dict[attr.__name__] = attr
+                        found_agents.append(f"{attr.__name__} ({module_name})")
+
+            except ImportError as e:
+                import_errors.append(f"{module_name}: {str(e)}")
+                continue
+            except Exception as e:
+                import_errors.append(f"{module_name}: Unexpected error: {str(e)}")
+                continue
 
-            # Log consolidated messages
-            if found_agents:
-                logger.info(f"Found agents: {', '.join(found_agents)}")
-            if import_errors:
-                logger.warning(f"Import errors: {', '.join(import_errors)}")
+        # Log consolidated messages
+        if found_agents:
+            logger.info(f"Found agents: {', '.join(found_agents)}")
+        if import_errors:
+            logger.warning(f"Import errors: {', '.join(import_errors)}")
+
+        return agents_dict
+
+    def sync_metadata(
+        self, agents_dict: Dict[str, Type[MeshAgent]], upload: bool = True, write_manifest: bool = False
+    ) -> None:
+        """Upload the agent metadata to S3 and refresh the README table, and write the local agent manifest if asked"""
+        agent_entries = self._build_agent_entries(agents_dict)
+        if write_manifest:
+            self._write_manifest(agent_entries)
+        if not upload:
+            return
 
-            try:
-                metadata = self._create_metadata(agents_dict)
-                self._upload_metadata(metadata)
+        try:
+            metadata = self._create_metadata(agent_entries)
+            self._upload_metadata(metadata)
+
+            table_content = self._generate_agent_table(metadata)
+            self._update_readme_with_agents(table_content)
+        except Exception as e:
+            logger.error(f"Failed to upload metadata to S3: {e}")
 
-                table_content = self._generate_agent_table(metadata)
-                self._update_readme_with_agents(table_content)
+    def load_agents(self) -> Mapping:
+        if self.config.lazy_agent_loading:
+            manifest = self.load_agent_manifest()
+            if manifest is not None:
+                logger.info(f"Lazily loading {len(manifest['agents'])} agents from {self.config.agent_manifest_path}")
+                return LazyAgentRegistry(manifest)
+            logger.warning(f"Agent manifest {self.config.agent_manifest_path} not found, loading all agents eagerly")
+
+        try:
+            agents_dict = self.discover_agents()
+            try:
+                self.sync_metadata(agents_dict)
             except Exception as e:
-                logger.error(f"Failed to upload metadata to S3: {e}")
+                logger.error(f"Failed to sync agent metadata: {e}")
 
             return agents_dict
 
@@ -287,10 +423,53 @@ class AgentLoader:
             return {}
 
 
+class AgentPool:
+    """
+    Keeps pre-built agent instances per agent ID so requests don't pay for agent construction.
+    Each instance serves one request at a time; per-request state lives in MeshAgent.request_context.
+    """
+
+    def __init__(self, agents_dict: Dict[str, Type[MeshAgent]], max_idle: int = 4):
+        self.agents_dict = agents_dict
+        self.max_idle = max_idle
+        self._idle: Dict[str, List[MeshAgent]] = {}
+
+    @asynccontextmanager
+    async def acquire(self, agent_id: str) -> AsyncIterator[MeshAgent]:
+        """Check out an agent instance, creating one if none is idle"""
+        idle = self._idle.setdefault(agent_id, [])
+        agent = idle.pop() if idle else self.agents_dict[agent_id]()
+
+        try:
+            yield agent
+        except BaseException:
+            # The instance may be left in an inconsistent state, don't hand it out again
+            await agent.cleanup()
+            raise
+
+        if len(idle) < self.max_idle:
+            idle.append(agent)
+        else:
+            await agent.cleanup()
+
+    async def close(self) -> None:
+        """Cleanup all idle instances"""
+        for idle in self._idle.values():
+            for agent in idle:
+                try:
+                    await agent.cleanup()
+                except Exception as e:
+                    logger.error(f"Cleanup failed | Agent: {agent.agent_name} | Error: {str(e)}")
+        self._idle.clear()
+
+
 class MeshManager:
     """
     The MeshManager coordinates tasks between the Protocol V2 server
-    and the various MeshAgent implementations. Each agent has its own poll loop.
+    and the various MeshAgent implementations. By default each agent has its own poll loop;
+    with POLL_MODE=multiplexed a single poll loop requests tasks for every agent with free capacity at once.
+    Tasks run in the background so polling continues while earlier tasks are in flight, bounded per agent
+    by Config.get_max_concurrent_tasks.
     """
 
     def __init__(self, config: Config):
@@ -300,24 +479,37 @@ class MeshManager:
         self.agents_dict = self.agent_loader.load_agents()
         self.active_tasks = {}
         self.tasks = {}  # Tracking poll tasks
+        self.task_handlers = set()  # Tracking in-flight task handlers
+        self._task_slot_freed = asyncio.Condition()
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self.session = get_shared_session()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        for task in self.tasks.values():
+        pending = list(self.tasks.values()) + list(self.task_handlers)
+        for task in pending:
             task.cancel()
         try:
-            await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+            await asyncio.gather(*pending, return_exceptions=True)
         except Exception:
             pass
+        await close_task_update_senders()
+        await close_openai_clients()
         if self.session:
-            await self.session.close()
+            await close_shared_session()
             self.session = None
 
     async def poll_server(self, agent_id: str) -> Dict:
         """Handle polling the server for new tasks"""
+        return await self._poll(agent_ids=[agent_id])
+
+    async def poll_server_multiplexed(self, agent_ids: List[str]) -> List[Dict]:
+        """Poll the server for a new task of any of several agents in one request"""
+        resp_data = await self._poll(agent_ids=agent_ids)
+        return self._extract_tasks(resp_data, agent_ids)
+
+    async def _poll(self, agent_ids: List[str]) -> Dict:
         headers = {"Authorization": self.config.auth_token, "Content-Type": "application/json"}
         payload = {
             "agent_info": [
@@ -325,6 +517,7 @@ class MeshManager:
                     "agent_id": agent_id,
                     "agent_type": self.config.agent_type,
                 }
+                for agent_id in agent_ids
             ]
         }
 
@@ -335,9 +528,22 @@ class MeshManager:
                 resp_data = await resp.json()
                 return resp_data
         except Exception as e:
-            logger.error(f"Poll error | Agent: {agent_id} | Error: {str(e)}")
+            logger.error(f"Poll error | Agent: {', '.join(agent_ids)} | Error: {str(e)}")
             return {}
 
+    @staticmethod
+    def _extract_tasks(resp_data: Dict, agent_ids: List[str]) -> List[Dict]:
+        """
+        A poll answers with the same object however many agents were polled: {} when there is no task,
+        otherwise the one task it claimed, {"task_id", "agent_id", "input", ...}. agent_id says which of
+        the polled agents the task is for; when a single agent was polled it may be left out.
+        """
+        if not isinstance(resp_data, dict) or "input" not in resp_data:
+            return []
+        if not resp_data.get("agent_id") and len(agent_ids) == 1:
+            resp_data["agent_id"] = agent_ids[0]
+        return [resp_data]
+
     async def process_task(self, agent_id: str, agent_cls: Type[MeshAgent], task_data: Dict) -> Dict:
         """Handle individual task processing logic"""
         task_id = task_data.get("task_id")
@@ -385,28 +591,54 @@ class MeshManager:
             logger.error(f"Result submission failed | Agent: {agent_id} | Task: {task_id} | Error: {str(e)}")
             raise
 
-    async def run_agent_task_loop(self, agent_id: str, agent_cls: Type[MeshAgent]):
-        """Main task loop for each agent - polls for tasks and processes them"""
+    async def handle_task(self, agent_id: str, agent_cls: Type[MeshAgent], task_data: Dict):
+        """Process a polled task and submit its result, tracking it in active_tasks while it runs"""
+        task_id = task_data.get("task_id")
+        self.active_tasks[agent_id].add(task_id)
+
+        try:
+            logger.info(f"Task started | Agent: {agent_id} | Task: {task_id}")
+            result = await self.process_task(agent_id, agent_cls, task_data)
+            # Progress updates go to the origin task, send them before the result so none arrive after it
+            await flush_task_updates({task_id, task_data.get("origin_task_id", task_id)})
+            await self.submit_result(agent_id, task_id, result)
+            logger.info(f"Task completed | Agent: {agent_id} | Task: {task_id}")
+        finally:
+            self.active_tasks[agent_id].discard(task_id)
+            async with self._task_slot_freed:
+                self._task_slot_freed.notify_all()
+
+    def _has_capacity(self, agent_id: str) -> bool:
+        return len(self.active_tasks[agent_id]) < self.config.get_max_concurrent_tasks(agent_id)
+
+    async def _wait_for_task_slot(self, predicate) -> None:
+        """Wait until a running task finishes and predicate holds, or at most one poll interval"""
+        async with self._task_slot_freed:
+            try:
+                await asyncio.wait_for(self._task_slot_freed.wait_for(predicate), timeout=self.config.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_agent_task_loop(self, agent_id: str):
+        """
+        Main task loop for each agent - polls for tasks and processes them.
+        The agent class is only looked up when a task arrives, so lazily loaded agents aren't imported up front.
+        """
         self.active_tasks[agent_id] = set()
 
         while True:
             try:
+                if not self._has_capacity(agent_id):
+                    await self._wait_for_task_slot(lambda: self._has_capacity(agent_id))
+                    continue
+
                 # Just poll with timeout
                 poll_task = asyncio.create_task(self.poll_server(agent_id))
                 try:
                     resp_data = await asyncio.wait_for(poll_task, timeout=self.config.poll_interval)
 
                     if resp_data and "input" in resp_data:
-                        task_id = resp_data.get("task_id")
-                        self.active_tasks[agent_id].add(task_id)
-
-                        try:
-                            logger.info(f"Task started | Agent: {agent_id} | Task: {task_id}")
-                            result = await self.process_task(agent_id, agent_cls, resp_data)
-                            await self.submit_result(agent_id, task_id, result)
-                            logger.info(f"Task completed | Agent: {agent_id} | Task: {task_id}")
-                        finally:
-                            self.active_tasks[agent_id].remove(task_id)
+                        self._dispatch_task(agent_id, resp_data)
 
                 except asyncio.TimeoutError:
                     pass  # No task found within timeout
@@ -414,8 +646,71 @@ class MeshManager:
             except Exception as e:
                 logger.error(f"Task loop error | Agent: {agent_id} | Error: {str(e)}")
 
+    def _dispatch_task(self, agent_id: Optional[str], task_data: Dict) -> None:
+        """
+        Hand a polled task to its agent's worker pool without blocking the poll loop. The server has already
+        claimed the task, so one that can't be run is answered with an error result instead of dropped.
+        """
+        task_id = task_data.get("task_id")
+        try:
+            if agent_id not in self.active_tasks:
+                raise KeyError(f"agent {agent_id} was not polled")
+            # Lazily loaded agents are imported here, which may fail
+            agent_cls = self.agents_dict[agent_id]
+        except Exception as e:
+            logger.error(f"Cannot run task | Agent: {agent_id} | Task: {task_id} | Error: {str(e)}")
+            self._start_handler(self._reject_task(agent_id, task_id, f"Agent {agent_id} is unavailable: {e}"))
+            return
+
+        # Count the task against the agent's limit right away so the next poll respects it
+        self.active_tasks[agent_id].add(task_id)
+        self._start_handler(self._run_dispatched_task(agent_id, agent_cls, task_data))
+
+    def _start_handler(self, coro) -> None:
+        handler = asyncio.create_task(coro)
+        self.task_handlers.add(handler)
+        handler.add_done_callback(self.task_handlers.discard)
+
+    async def _reject_task(self, agent_id: Optional[str], task_id: str, error: str) -> None:
+        result = {"results": {"success": "false", "error": error}, "inference_latency": 0}
+        try:
+            await self.submit_result(agent_id, task_id, result)
+        except Exception:
+            pass  # Logged by submit_result
+
+    async def _run_dispatched_task(self, agent_id: str, agent_cls: Type[MeshAgent], task_data: Dict):
+        try:
+            await self.handle_task(agent_id, agent_cls, task_data)
+        except Exception as e:
+            logger.error(f"Task error | Agent: {agent_id} | Task: {task_data.get('task_id')} | Error: {str(e)}")
+
+    async def run_multiplexed_task_loop(self):
+        """Single poll loop that requests tasks for every agent with free capacity and dispatches them"""
+        for agent_id in self.agents_dict:
+            self.active_tasks[agent_id] = set()
+
+        while True:
+            try:
+                available_agent_ids = [agent_id for agent_id in self.agents_dict if self._has_capacity(agent_id)]
+                if not available_agent_ids:
+                    # Every agent is at its limit, wait for a task to finish before polling again
+                    await self._wait_for_task_slot(lambda: any(map(self._has_capacity, self.agents_dict)))
+                    continue
+
+                poll_task = asyncio.create_task(self.poll_server_multiplexed(available_agent_ids))
+                try:
+                    tasks = await asyncio.wait_for(poll_task, timeout=self.config.poll_interval)
+                    for task_data in tasks:
+                        self._dispatch_task(task_data.get("agent_id"), task_data)
+
+                except asyncio.TimeoutError:
+                    pass  # No task found within timeout
+
+            except Exception as e:
+                logger.error(f"Multiplexed task loop error | Error: {str(e)}")
+
     async def run_forever(self):
-        """Creates a polling task for each known agent ID and runs them in parallel."""
+        """Creates the polling task(s) for the known agent IDs and runs them in parallel."""
         if not self.agents_dict:
             logger.warning("No agents found to run.")
             return
@@ -424,11 +719,14 @@ class MeshManager:
         self.tasks = {}  # Reset tasks dict
         agent_ids = list(self.agents_dict.keys())
 
-        for agent_id, agent_cls in self.agents_dict.items():
-            task = asyncio.create_task(self.run_agent_task_loop(agent_id, agent_cls))
-            self.tasks[agent_id] = task
+        if self.config.poll_mode == "multiplexed":
+            self.tasks["multiplexed"] = asyncio.create_task(self.run_multiplexed_task_loop())
+            logger.info(f"Started multiplexed task loop for agents: {', '.join(agent_ids)}")
+        else:
+            for agent_id in agent_ids:
+                self.tasks[agent_id] = asyncio.create_task(self.run_agent_task_loop(agent_id))
 
-        logger.info(f"Started task loops for agents: {', '.join(agent_ids)}")
+            logger.info(f"Started task loops for agents: {', '.join(agent_ids)}")
 
         try:
             await asyncio.gather(*self.tasks.values())
@@ -446,8 +744,23 @@ async def main():
         await manager.run_forever()
 
 
+def sync_metadata(upload: bool = True) -> None:
+    """Offline metadata sync: rebuild the agent manifest, upload metadata to S3 and update mesh/README.md"""
+    loader = AgentLoader(Config())
+    loader.sync_metadata(loader.discover_agents(), upload=upload, write_manifest=True)
+
+
 if __name__ == "__main__":
-    try:
-        asyncio.run(main())
-    except KeyboardInterrupt:
-        logger.info("MeshManager stopped by user.")
+    parser = argparse.ArgumentParser(description="Heurist Mesh Manager")
+    subparsers = parser.add_subparsers(dest="command")
+    sync_parser = subparsers.add_parser("sync-metadata", help="Rebuild the agent manifest and sync agent metadata")
+    sync_parser.add_argument("--no-upload", action="store_true", help="Only write the local agent manifest")
+    args = parser.parse_args()
+
+    if args.command == "sync-metadata":
+        sync_metadata(upload=not args.no_upload)
+    else:
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            logger.info("MeshManager stopped by user.")
@@ -0,0 +1,50 @@
+import asyncio
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from clients import credits_client
+from clients.credits_client import CreditsClient
+
+
+@pytest.fixture
+def credits_api(monkeypatch):
+    """Fake credits API answering with the status in credits_api["status"], and a controllable clock"""
+    state = {"status": 200, "requests": 0, "now": 1000.0}
+
+    @asynccontextmanager
+    async def post(url, headers, json, timeout):
+        state["requests"] += 1
+        yield SimpleNamespace(status=state["status"])
+
+    monkeypatch.setattr(credits_client, "get_shared_session", lambda: SimpleNamespace(post=post))
+    monkeypatch.setattr(credits_client.time, "monotonic", lambda: state["now"])
+    return state
+
+
+def test_successful_deduction_is_remembered_until_it_expires(credits_api):
+    client = CreditsClient("https://credits.example", "auth", cache_ttl=60)
+    assert not client.is_recently_validated("user", "key")
+    assert asyncio.run(client.deduct("user", "key", "EchoAgent"))
+    assert client.is_recently_validated("user", "key")
+    assert not client.is_recently_validated("user", "other-key")
+
+    credits_api["now"] += 61
+    assert not client.is_recently_validated("user", "key")
+
+
+def test_rejected_deduction_forgets_the_key(credits_api):
+    client = CreditsClient("https://credits.example", "auth", cache_ttl=60)
+    asyncio.run(client.deduct("user", "key", "EchoAgent"))
+    credits_api["status"] = 402
+    assert not asyncio.run(client.deduct("user", "key", "EchoAgent"))
+    assert not client.is_recently_validated("user", "key")
+    assert credits_api["requests"] == 2
+
+
+def test_remembered_keys_are_bounded(credits_api):
+    client = CreditsClient("https://credits.example", "auth", cache_ttl=60, max_cache_size=2)
+    for api_key in ["a", "b", "c"]:
+        asyncio.run(client.deduct("user", api_key, "EchoAgent"))
+    assert [client.is_recently_validated("user", api_key) for api_key in ["a", "b", "c"]] == [False, True, True]
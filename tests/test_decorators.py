@@ -0,0 +1,168 @@
+import asyncio
+
+import pytest
+
+import decorators
+from decorators import SQLiteCacheBackend, TTLCache, make_cache_key, with_cache, with_retry
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(decorators.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_ttl_cache_evicts_least_recently_used(clock):
+    cache = TTLCache(ttl_seconds=60, max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert [cache.get(key) for key in ("a", "b", "c")] == [(True, 1), (False, None), (True, 3)]
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.evictions) == (3, 1, 1)
+
+
+def test_ttl_cache_expires_and_purges_entries(clock):
+    cache = TTLCache(ttl_seconds=10, max_entries=None, purge_interval=5)
+    cache.set("a", 1)
+    cache.set("short", 2, ttl_seconds=1)
+    clock[0] += 2
+    assert cache.get("short") == (False, None)
+    clock[0] += 10
+    cache.set("b", 3)  # purges "a" as well
+    assert len(cache) == 1
+    assert cache.stats.expirations == 2
+
+
+def test_ttl_cache_bounds_bytes():
+    cache = TTLCache(ttl_seconds=60, max_entries=None, max_bytes=200)
+    cache.set("big", "x" * 500)
+    assert len(cache) == 0
+    for key in "abcdef":
+        cache.set(key, "x" * 50)
+    assert 0 < cache.total_bytes <= 200
+    assert cache.get("f") == (True, "x" * 50)
+
+
+def test_cache_key_ignores_keyword_order():
+    assert make_cache_key(1, a=1, b=2) == make_cache_key(1, b=2, a=1)
+    assert make_cache_key({"a": 1, "b": 2}) == make_cache_key({"b": 2, "a": 1})
+    assert make_cache_key(1) != make_cache_key("1")
+
+
+@pytest.mark.parametrize("value", [{"a", "b"}, object()])
+def test_cache_key_rejects_values_without_a_stable_serialization(value):
+    with pytest.raises(TypeError):
+        make_cache_key(value)
+
+
+@pytest.mark.asyncio
+async def test_calls_with_unkeyable_arguments_are_not_cached():
+    upstream = Upstream()
+    await upstream.fetch({"a"})
+    await upstream.fetch({"a"})
+    assert upstream.calls == 2
+
+
+class Upstream:
+    def __init__(self):
+        self.calls = 0
+
+    @with_cache(ttl_seconds=60)
+    async def fetch(self, key, fail=False):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if fail:
+            raise RuntimeError("upstream failed")
+        return {"key": key}
+
+
+@pytest.fixture(autouse=True)
+def fresh_caches():
+    decorators.set_cache_backend(None)
+    for name in [name for name in vars(Upstream) if name.startswith("_cache_")]:
+        delattr(Upstream, name)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_share_one_call():
+    upstream = Upstream()
+    results = await asyncio.gather(*(upstream.fetch("trending") for _ in range(5)), upstream.fetch("other"))
+    assert results == [{"key": "trending"}] * 5 + [{"key": "other"}]
+    assert upstream.calls == 2
+    assert Upstream._cache_fetch.stats.coalesced == 4
+
+    await Upstream().fetch("trending")
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_call_is_shared_but_not_cached():
+    upstream = Upstream()
+    results = await asyncio.gather(*(upstream.fetch("a", fail=True) for _ in range(3)), return_exceptions=True)
+    assert [str(result) for result in results] == ["upstream failed"] * 3
+    assert upstream.calls == 1
+    assert await upstream.fetch("a") == {"key": "a"}
+
+
+@pytest.mark.asyncio
+async def test_cancelled_call_lets_waiters_retry():
+    upstream = Upstream()
+    first = asyncio.create_task(upstream.fetch("a"))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(upstream.fetch("a"))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await waiter == {"key": "a"}
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_shared_backend_serves_other_workers(tmp_path):
+    decorators.set_cache_backend(SQLiteCacheBackend(str(tmp_path / "cache.db")))
+    first = Upstream()
+    await first.fetch("a")
+
+    # A new class cache, like the one of another worker process
+    del Upstream._cache_fetch
+    second = Upstream()
+    assert await second.fetch("a") == {"key": "a"}
+    assert second.calls == 0
+    assert Upstream._cache_fetch.stats.shared_hits == 1
+
+
+def test_sqlite_backend_round_trips_values_or_skips_them(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    value = {"prices": [1.5, 2], "name": "eth", "nested": {"ok": True, "missing": None}}
+    backend.set("json", value, ttl_seconds=60)
+    assert backend.get("json")[:2] == (True, value)
+
+    # Would come back as a list and with string keys, so they stay in the in-process cache only
+    backend.set("tuple", (1, 2), ttl_seconds=60)
+    backend.set("int_keys", {1: "a"}, ttl_seconds=60)
+    assert backend.get("tuple")[0] is False
+    assert backend.get("int_keys")[0] is False
+
+
+def test_sqlite_backend_expires_entries(tmp_path):
+    backend = SQLiteCacheBackend(str(tmp_path / "cache.db"))
+    backend.set("a", [1, 2], ttl_seconds=60)
+    found, value, remaining = backend.get("a")
+    assert found and value == [1, 2] and 0 < remaining <= 60
+    backend.set("b", 1, ttl_seconds=-1)
+    assert backend.get("b")[0] is False
+
+
+@pytest.mark.asyncio
+async def test_with_retry_gives_up_after_max_retries():
+    calls = []
+
+    @with_retry(max_retries=3, delay=0)
+    async def flaky():
+        calls.append(1)
+        raise ValueError("nope")
+
+    with pytest.raises(ValueError):
+        await flaky()
+    assert len(calls) == 3
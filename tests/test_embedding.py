@@ -0,0 +1,308 @@
+import json
+import sqlite3
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from core import embedding
+from core.embedding import (
+    SQLITE_FORMAT_TABLE,
+    EmbeddingCache,
+    MessageData,
+    MessageStore,
+    SimilarityIndex,
+    SQLiteConfig,
+    SQLiteVectorStorage,
+    VectorStorageProvider,
+    drop_near_duplicates,
+    get_embedding,
+    get_embeddings,
+)
+
+DIM = 32
+
+
+def clustered_vectors(rng: np.random.Generator, rows: int, clusters: int = 20) -> np.ndarray:
+    centers = rng.normal(size=(clusters, DIM))
+    return (centers[rng.integers(clusters, size=rows)] + 0.3 * rng.normal(size=(rows, DIM))).astype(np.float32)
+
+
+def build_index(vectors: np.ndarray, ann_min_rows=1) -> SimilarityIndex:
+    index = SimilarityIndex(ann_min_rows=ann_min_rows)
+    for row_id, vector in enumerate(vectors, start=1):
+        index.add(row_id, str(row_id), vector, "knowledge_base", None)
+    return index
+
+
+def top_messages(index: SimilarityIndex, query: np.ndarray, k: int = 10, **kwargs) -> set:
+    return {hit["message"] for hit in index.search(query, -1.0, "knowledge_base", limit=k, **kwargs)}
+
+
+def test_ivf_search_recall_against_exact_search():
+    rng = np.random.default_rng(0)
+    index = build_index(clustered_vectors(rng, 5000))
+    queries = clustered_vectors(rng, 50)
+
+    recalls = {probes: [] for probes in (1, 5)}
+    for query in queries:
+        exact = top_messages(index, query, exact=True)
+        for probes in recalls:
+            recalls[probes].append(len(top_messages(index, query, probes=probes) & exact) / len(exact))
+
+    assert np.mean(recalls[5]) >= 0.95
+    assert np.mean(recalls[5]) >= np.mean(recalls[1])
+    # Probing every list is exact
+    nlist = index._partitions[("knowledge_base", None)].ivf.centroids.shape[0]
+    assert top_messages(index, queries[0], probes=nlist) == top_messages(index, queries[0], exact=True)
+
+
+def test_exact_search_orders_by_similarity_and_filters_partitions():
+    index = SimilarityIndex()
+    index.add(1, "same", [1.0, 0.0], "knowledge_base", "chat")
+    index.add(2, "close", [1.0, 0.5], "knowledge_base", "chat")
+    index.add(3, "other chat", [1.0, 0.0], "knowledge_base", "other")
+    index.add(4, "wrong dimension", [1.0, 0.0, 0.0], "knowledge_base", "chat")
+
+    hits = index.search([2.0, 0.0], 0.5, "knowledge_base", "chat")
+    assert [hit["message"] for hit in hits] == ["same", "close"]
+    assert hits[0]["similarity"] == pytest.approx(1.0)
+
+
+def test_saved_ivf_lists_are_restored_and_extended(tmp_path):
+    rng = np.random.default_rng(1)
+    vectors = clustered_vectors(rng, 2000)
+    path = str(tmp_path / "index.ivf.npz")
+    index = build_index(vectors[:1500])
+    index.search(vectors[0], 1.0, "knowledge_base")  # trains the lists
+    index.save_ann(path)
+
+    restored = build_index(vectors)
+    restored.load_ann(path)
+    ivf = restored._partitions[("knowledge_base", None)].ivf
+    assert ivf is not None and len(ivf.labels) == 2000
+    assert restored.unsaved_changes == 500
+    assert top_messages(restored, vectors[1999], k=1, probes=2) == {"2000"}
+
+
+def test_saved_ivf_lists_for_other_rows_are_ignored(tmp_path):
+    rng = np.random.default_rng(2)
+    vectors = clustered_vectors(rng, 1500)
+    path = str(tmp_path / "index.ivf.npz")
+    index = build_index(vectors)
+    index.search(vectors[0], 1.0, "knowledge_base")
+    index.save_ann(path)
+
+    # Same rows under different ids, e.g. the lists of another database
+    stale = SimilarityIndex(ann_min_rows=1)
+    for row_id, vector in enumerate(vectors, start=10):
+        stale.add(row_id, str(row_id), vector, "knowledge_base", None)
+    stale.load_ann(path)
+    assert stale._partitions[("knowledge_base", None)].ivf is None
+
+
+def message(text: str, embedding) -> MessageData:
+    return MessageData(
+        text, embedding, "2025-01-01T00:00:00", "knowledge_base", None, None, None, embedding, None, None, None
+    )
+
+
+def create_json_database(path: str, rows) -> None:
+    """Table as written by versions storing embeddings as JSON text"""
+    conn = sqlite3.connect(path)
+    with conn:
+        conn.execute(
+            """CREATE TABLE message_embeddings (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, message TEXT NOT NULL, embedding BLOB NOT NULL,
+                timestamp TEXT NOT NULL, message_type TEXT NOT NULL, chat_id TEXT, source_interface TEXT,
+                original_query TEXT, original_embedding BLOB, response_type TEXT, key_topics TEXT, tool_call TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"""
+        )
+        conn.executemany(
+            "INSERT INTO message_embeddings (message, embedding, timestamp, message_type, original_embedding) "
+            "VALUES (?, ?, '2024-01-01', 'knowledge_base', ?)",
+            [
+                (text, json.dumps(embedding), json.dumps(embedding) if original else None)
+                for text, embedding, original in rows
+            ],
+        )
+    conn.close()
+
+
+def open_storage(path: str, dtype: str) -> SQLiteVectorStorage:
+    storage = SQLiteVectorStorage(SQLiteConfig(db_path=path, embedding_dtype=dtype, ann_index=False))
+    storage.initialize()
+    return storage
+
+
+def stored_embeddings(storage: SQLiteVectorStorage):
+    return storage.conn.execute("SELECT embedding, original_embedding FROM message_embeddings ORDER BY id").fetchall()
+
+
+@pytest.mark.parametrize("similarity_index", ["true", "false"])
+def test_json_embeddings_are_migrated_to_float32_then_float16(tmp_path, monkeypatch, similarity_index):
+    monkeypatch.setenv("SQLITE_SIMILARITY_INDEX", similarity_index)
+    path = str(tmp_path / "embeddings.db")
+    create_json_database(path, [("a", [1.0, 0.0, 0.5], True), ("b", [0.0, 1.0, 0.25], False)])
+
+    storage = open_storage(path, "float32")
+    rows = stored_embeddings(storage)
+    assert all(isinstance(embedding, bytes) and len(embedding) == 3 * 4 for embedding, _ in rows)
+    assert rows[1][1] is None
+    assert np.frombuffer(rows[0][1], dtype=np.float32).tolist() == [1.0, 0.0, 0.5]
+    storage.store_embedding(message("c", [0.0, 0.0, 1.0]))
+    assert [hit["message"] for hit in storage.find_similar([1.0, 0.0, 0.5], threshold=0.99)] == ["a"]
+    storage.close()
+
+    storage = open_storage(path, "float16")
+    rows = stored_embeddings(storage)
+    assert all(len(embedding) == 3 * 2 for embedding, _ in rows)
+    assert np.frombuffer(rows[1][0], dtype=np.float16).tolist() == [0.0, 1.0, 0.25]
+    assert storage.conn.execute(f"SELECT dtype FROM {SQLITE_FORMAT_TABLE}").fetchall() == [("float16",)]
+    assert [hit["message"] for hit in storage.find_similar([0.0, 0.0, 1.0], threshold=0.99)] == ["c"]
+    storage.close()
+
+
+def test_unknown_embedding_dtype_is_rejected():
+    with pytest.raises(ValueError):
+        SQLiteVectorStorage(SQLiteConfig(db_path=":memory:", embedding_dtype="float64"))
+
+
+def fake_embedding(text: str, model: str = "model-a") -> list:
+    return [float(len(text)), 1.0 if model == "model-a" else 2.0]
+
+
+@pytest.fixture
+def embedding_requests(monkeypatch):
+    """Fake embedding API recording (model, input) of every request, with no embedding cache created yet"""
+    requests = []
+
+    def create(model, input, encoding_format):
+        requests.append((model, input))
+        texts = input if isinstance(input, list) else [input]
+        data = [SimpleNamespace(index=index, embedding=fake_embedding(text, model)) for index, text in enumerate(texts)]
+        # Answered out of order, index says which input an embedding belongs to
+        return SimpleNamespace(data=data[::-1])
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    monkeypatch.setattr(embedding, "get_openai_client", lambda base_url, api_key: client)
+    monkeypatch.setattr(embedding, "_embedding_cache", None)
+    return requests
+
+
+def test_embedding_cache_is_opt_in(embedding_requests, monkeypatch):
+    monkeypatch.delenv("EMBEDDING_CACHE_ENABLED", raising=False)
+    assert embedding.get_embedding_cache() is None
+    get_embedding("hello", "model-a")
+    get_embedding("hello", "model-a")
+    assert len(embedding_requests) == 2
+
+
+def test_embedding_cache_hits_per_model(embedding_requests, monkeypatch, tmp_path):
+    db_path = str(tmp_path / "embedding_cache.db")
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", db_path)
+
+    assert get_embedding("hello", "model-a") == [5.0, 1.0]
+    assert get_embedding("hello", "model-a") == [5.0, 1.0]
+    assert get_embedding("hello", "model-b") == [5.0, 2.0]
+    assert embedding_requests == [("model-a", "hello"), ("model-b", "hello")]
+
+    # Another process reads the embeddings back from the SQLite file
+    other = EmbeddingCache(db_path)
+    assert other.get("hello", "model-a") == [5.0, 1.0]
+    assert other.get("hello", "model-b") == [5.0, 2.0]
+    assert other.get("other text", "model-a") is None
+    other.close()
+    embedding.get_embedding_cache().close()
+
+
+def test_get_embeddings_sends_distinct_texts_in_batches(embedding_requests):
+    progress = []
+    texts = ["a", "bb", "a", "ccc", "dddd", "bb", "eeeee"]
+    embeddings = get_embeddings(
+        texts, "model-a", batch_size=2, max_concurrency=2, progress=lambda done, total: progress.append((done, total))
+    )
+    assert embeddings == [fake_embedding(text) for text in texts]
+    batches = [batch for _, batch in embedding_requests]
+    assert sorted(text for batch in batches for text in batch) == ["a", "bb", "ccc", "dddd", "eeeee"]
+    assert sorted(map(len, batches)) == [1, 2, 2]
+    # Batches finish in any order
+    assert len(progress) == 3 and progress[-1] == (5, 5)
+    assert [done for done, _ in progress] == sorted(done for done, _ in progress)
+
+
+def test_get_embeddings_only_sends_uncached_texts(embedding_requests, monkeypatch):
+    monkeypatch.setenv("EMBEDDING_CACHE_ENABLED", "true")
+    monkeypatch.setenv("EMBEDDING_CACHE_PATH", "")
+    get_embeddings(["a", "bb"], "model-a")
+    assert get_embeddings(["bb", "ccc", "a"], "model-a") == [fake_embedding(text) for text in ["bb", "ccc", "a"]]
+    assert [batch for _, batch in embedding_requests] == [["a", "bb"], ["ccc"]]
+
+
+def test_get_embeddings_rejects_incomplete_batches(embedding_requests, monkeypatch):
+    def create(model, input, encoding_format):
+        return SimpleNamespace(data=[SimpleNamespace(index=0, embedding=fake_embedding(input[0]))])
+
+    client = SimpleNamespace(embeddings=SimpleNamespace(create=create))
+    monkeypatch.setattr(embedding, "get_openai_client", lambda base_url, api_key: client)
+    with pytest.raises(embedding.EmbeddingError):
+        get_embeddings(["a", "bb"], "model-a")
+
+
+def test_add_messages_stores_a_batch_in_one_transaction(tmp_path):
+    store = MessageStore(open_storage(str(tmp_path / "embeddings.db"), "float32"))
+    store.add_messages([message("a", [1.0, 0.0, 0.0]), message("b", [0.0, 1.0, 0.0])])
+    store.add_messages([])
+    assert [hit["message"] for hit in store.find_similar_messages([0.0, 1.0, 0.0], threshold=0.99)] == ["b"]
+
+    # A row that can't be stored rolls back the whole batch
+    with pytest.raises(sqlite3.IntegrityError):
+        store.add_messages([message("c", [0.0, 0.0, 1.0]), message(None, [0.0, 0.0, 1.0])])
+    storage = store.storage_provider
+    assert storage.conn.execute("SELECT message FROM message_embeddings ORDER BY id").fetchall() == [("a",), ("b",)]
+    assert storage.find_similar([0.0, 0.0, 1.0], threshold=0.99) == []
+    storage.close()
+
+
+def test_near_duplicates_are_dropped_in_favour_of_the_first():
+    embeddings = [[1.0, 0.0], [0.0, 1.0], [2.0, 0.01], [0.7, 0.7], [0.0, 0.0], [0.0, 0.0]]
+    assert drop_near_duplicates(embeddings, threshold=0.99) == [0, 1, 3, 4, 5]
+    assert drop_near_duplicates(embeddings, threshold=0.5) == [0, 1, 4, 5]
+    assert drop_near_duplicates([]) == []
+
+
+class ThreadRecordingStorage(VectorStorageProvider):
+    """Storage provider recording the thread of every call"""
+
+    def __init__(self):
+        self.threads = []
+
+    def _record(self, *args):
+        self.threads.append(threading.current_thread())
+        return []
+
+    initialize = store_embedding = store_embeddings_bulk = find_similar = find_messages = close = _record
+
+
+@pytest.mark.asyncio
+async def test_message_store_calls_storage_from_a_single_worker_thread():
+    storage = ThreadRecordingStorage()
+    store = MessageStore(storage)
+    store.add_messages([message("a", [1.0, 0.0])])
+    store.find_similar_messages([1.0, 0.0])
+    await store.add_message_async(message("b", [0.0, 1.0]))
+    await store.find_similar_messages_async([1.0, 0.0])
+    await store.find_messages_async("knowledge_base")
+
+    # Callers on other threads, like the post-processing loop
+    callers = [threading.Thread(target=store.find_messages, args=("knowledge_base",)) for _ in range(4)]
+    for caller in callers:
+        caller.start()
+    for caller in callers:
+        caller.join()
+
+    assert len(storage.threads) == 10
+    assert len(set(storage.threads)) == 1
+    assert storage.threads[0] is not threading.current_thread()
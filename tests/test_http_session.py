@@ -0,0 +1,31 @@
+import asyncio
+
+from clients.http_session import SessionRegistry
+
+
+def test_settings_read_when_first_session_is_created(monkeypatch):
+    registry = SessionRegistry(limit_per_host=4)
+    monkeypatch.setenv("HTTP_POOL_LIMIT", "50")
+    monkeypatch.setenv("HTTP_POOL_LIMIT_PER_HOST", "99")
+
+    async def connector_limits():
+        session = registry.get_session()
+        assert registry.get_session() is session
+        limits = session.connector.limit, session.connector.limit_per_host
+        await registry.close()
+        return limits
+
+    assert asyncio.run(connector_limits()) == (50, 4)
+
+
+def test_session_closed_when_its_loop_shuts_down():
+    registry = SessionRegistry()
+
+    async def open_session():
+        assert registry.get_session() is registry.get_session()
+        return registry.get_session()
+
+    first = asyncio.run(open_session())
+    second = asyncio.run(open_session())
+    assert first.closed and second.closed
+    assert first is not second
@@ -0,0 +1,232 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import openai
+import pytest
+
+from core import llm
+from core.resilience import get_model_health
+
+
+def status_error(status_code: int) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://llm.example/v1/chat/completions")
+    return openai.APIStatusError(
+        f"status {status_code}", response=httpx.Response(status_code, request=request), body=None
+    )
+
+
+class FakeCompletions:
+    def __init__(self, error: Exception):
+        self.error = error
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        raise self.error
+
+
+class FakeClient:
+    def __init__(self, error: Exception):
+        self.chat = type("Chat", (), {"completions": FakeCompletions(error)})()
+
+
+@pytest.mark.parametrize("status_code", [400, 401])
+def test_client_errors_are_not_retried(monkeypatch, status_code):
+    client = FakeClient(status_error(status_code))
+    monkeypatch.setattr(llm, "get_openai_client", lambda base_url, api_key: client)
+    model_id = f"client-error-{status_code}"
+
+    for _ in range(3):
+        with pytest.raises(llm.LLMError):
+            llm._create_completion("https://llm.example", "key", model_id, lambda r: r, 3, 0)
+    assert client.chat.completions.calls == 3
+    assert get_model_health("https://llm.example", model_id).breaker.state == "closed"
+
+
+def test_server_errors_are_retried(monkeypatch):
+    client = FakeClient(status_error(503))
+    monkeypatch.setattr(llm, "get_openai_client", lambda base_url, api_key: client)
+    monkeypatch.setattr(llm.time, "sleep", lambda seconds: None)
+
+    with pytest.raises(llm.LLMError):
+        llm._create_completion("https://llm.example", "key", "server-error", lambda r: r, 3, 0)
+    assert client.chat.completions.calls == 3
+
+
+def test_malformed_extra_function_call_keeps_raw_arguments():
+    text = '<function=a>{"x": 1}</function><function=b>{"x": </function>'
+    first, second = llm.extract_all_function_calls_to_tool_calls(text)
+    assert (first.function.name, first.function.arguments) == ("a", '{"x": 1}')
+    assert (second.function.name, second.function.arguments) == ("b", '{"x": ')
+
+
+class FakeRequest:
+    def __init__(self, result=None, error: Exception = None, delay: float = 0.01):
+        self.result = result if result is not None else {"content": "", "tool_calls": [{"name": "get_price"}]}
+        self.error = error
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+def inflight_keys(coalescer: llm.RequestCoalescer) -> list:
+    return list(coalescer._inflight.get(asyncio.get_running_loop(), {}))
+
+
+@pytest.mark.asyncio
+async def test_coalesced_callers_share_one_request_and_get_their_own_copy():
+    coalescer, request = llm.RequestCoalescer(), FakeRequest()
+    results = await asyncio.gather(*(coalescer.run("key", request) for _ in range(3)))
+    assert request.calls == 1
+    assert (coalescer.requests, coalescer.coalesced) == (1, 2)
+    assert results[0] == results[1] == results[2] == request.result
+
+    results[0]["tool_calls"].append({"name": "mutated"})
+    assert results[1]["tool_calls"] == [{"name": "get_price"}]
+    assert inflight_keys(coalescer) == []
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_keeps_the_request_for_the_others():
+    coalescer, request = llm.RequestCoalescer(), FakeRequest()
+    first = asyncio.create_task(coalescer.run("key", request))
+    second = asyncio.create_task(coalescer.run("key", request))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert await second == request.result
+    assert first.cancelled()
+    assert (request.calls, request.cancelled) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_request_is_cancelled_once_every_caller_is_gone():
+    coalescer, request = llm.RequestCoalescer(), FakeRequest(delay=1)
+    callers = [asyncio.create_task(coalescer.run("key", request)) for _ in range(2)]
+    await asyncio.sleep(0)
+    for caller in callers:
+        caller.cancel()
+    await asyncio.gather(*callers, return_exceptions=True)
+    await asyncio.sleep(0)
+    assert request.cancelled == 1
+    assert inflight_keys(coalescer) == []
+
+    # A new caller starts a fresh request
+    request.delay = 0
+    assert await coalescer.run("key", request) == request.result
+    assert request.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_request_error_reaches_every_caller_and_is_not_kept():
+    coalescer, request = llm.RequestCoalescer(), FakeRequest(error=llm.LLMError("upstream failed"))
+    results = await asyncio.gather(*(coalescer.run("key", request) for _ in range(3)), return_exceptions=True)
+    assert [str(result) for result in results] == ["upstream failed"] * 3
+    assert request.calls == 1
+    assert inflight_keys(coalescer) == []
+
+    request.error = None
+    assert await coalescer.run("key", request) == request.result
+    assert request.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_coalesced():
+    coalescer, request = llm.RequestCoalescer(), FakeRequest()
+    await asyncio.gather(coalescer.run("a", request), coalescer.run("b", request))
+    assert request.calls == 2
+
+
+def tool_call_response() -> SimpleNamespace:
+    tool_call = SimpleNamespace(
+        id="call_1", type="function", function=SimpleNamespace(name="get_price", arguments="{}")
+    )
+    return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content="", tool_calls=[tool_call]))])
+
+
+@pytest.fixture
+def llm_clients(monkeypatch):
+    """Fake sync and async clients recording the API key of every request, with an empty response cache"""
+    api_keys = []
+
+    def client(base_url, api_key, is_async=False):
+        async def create_async(**kwargs):
+            api_keys.append(api_key)
+            return tool_call_response()
+
+        def create(**kwargs):
+            api_keys.append(api_key)
+            return tool_call_response()
+
+        return SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=create_async if is_async else create))
+        )
+
+    monkeypatch.setattr(llm, "get_openai_client", client)
+    monkeypatch.setattr(llm, "get_async_openai_client", lambda base_url, api_key: client(base_url, api_key, True))
+    monkeypatch.setattr(llm, "_llm_response_cache", None)
+    return api_keys
+
+
+def test_response_cache_is_keyed_by_api_key(llm_clients):
+    for api_key in ["key-a", "key-b", "key-a"]:
+        llm.call_llm("https://llm.example", api_key, "model", "system", "user", temperature=0, cache=True)
+    assert llm_clients == ["key-a", "key-b"]
+
+
+def test_response_cache_is_opt_in(llm_clients, monkeypatch):
+    monkeypatch.delenv("LLM_CACHE_ENABLED", raising=False)
+    for _ in range(2):
+        llm.call_llm("https://llm.example", "key", "model", "system", "user", temperature=0)
+    assert len(llm_clients) == 2
+
+    monkeypatch.setenv("LLM_CACHE_ENABLED", "true")
+    for temperature in [0, 0, 0.7]:
+        llm.call_llm("https://llm.example", "key", "model", "system", "user", temperature=temperature)
+    assert len(llm_clients) == 4
+
+
+def test_cached_responses_are_copies(llm_clients):
+    def call():
+        return llm.call_llm_with_tools("https://llm.example", "key", "model", "system", "user", tools=[], cache=True)
+
+    first = call()
+    first["tool_calls"].function.arguments = '{"mutated": true}'
+    first["all_tool_calls"].clear()
+    second, third = call(), call()
+    assert second["tool_calls"].function.arguments == "{}"
+    assert len(second["all_tool_calls"]) == 1
+    second["all_tool_calls"].clear()
+    assert len(third["all_tool_calls"]) == 1
+    assert len(llm_clients) == 1
+
+
+@pytest.mark.asyncio
+async def test_async_cached_responses_are_copies(llm_clients):
+    def call(api_key="key"):
+        return llm.call_llm_with_tools_async("https://llm.example", api_key, "model", "system", "user", cache=True)
+
+    first = await call()
+    first["all_tool_calls"].clear()
+    second = await call()
+    assert len(second["all_tool_calls"]) == 1
+    await call("other-key")
+    assert llm_clients == ["key", "other-key"]
+
+
+def test_calls_with_sdk_objects_in_messages_are_not_cached(llm_clients):
+    messages = [{"role": "user", "content": "hi"}, tool_call_response().choices[0].message]
+    for _ in range(2):
+        llm.call_llm("https://llm.example", "key", "model", messages=messages, temperature=0, cache=True)
+    assert len(llm_clients) == 2
@@ -0,0 +1,211 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from decorators import with_retry
+from mesh.mesh_agent import MeshAgent
+
+
+class EchoAgent(MeshAgent):
+    async def handle_message(self, params):
+        await asyncio.sleep(0.01)
+        return {"task_id": self.task_id, "api_key": self.heurist_api_key}
+
+
+class ToolAgent(MeshAgent):
+    async def handle_message(self, params):
+        return {}
+
+    async def _handle_tool_logic(self, tool_name, function_args):
+        if tool_name == "fail":
+            raise RuntimeError("tool failed")
+        return {"tool": tool_name, **function_args}
+
+
+def tool_call(name, arguments):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class OuterAgent(MeshAgent):
+    def __init__(self, inner: MeshAgent):
+        super().__init__()
+        self.inner = inner
+
+    async def handle_message(self, params):
+        inner = await self.inner.call_agent({"task_id": "inner"})
+        return {"task_id": self.task_id, "inner": inner, "stream": self.request_context.stream is not None}
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_keep_their_own_state():
+    agent = EchoAgent()
+    agent.heurist_api_key = "default"
+
+    async def call(task_id, api_key):
+        if api_key:
+            agent.set_heurist_api_key(api_key)
+        return await agent.call_agent({"task_id": task_id})
+
+    results = await asyncio.gather(call("a", "key-a"), call("b", None), call("c", "key-c"))
+    assert results == [
+        {"task_id": "a", "api_key": "key-a"},
+        {"task_id": "b", "api_key": "default"},
+        {"task_id": "c", "api_key": "key-c"},
+    ]
+    assert agent.task_id is None
+
+
+@pytest.mark.asyncio
+async def test_nested_agent_does_not_see_caller_state():
+    outer = OuterAgent(EchoAgent())
+    outer.inner.heurist_api_key = "inner-default"
+
+    async def call():
+        outer.set_heurist_api_key("outer-key")
+        events = [event async for event in outer.call_agent_stream({"task_id": "outer"})]
+        return events[-1]["data"]
+
+    result = await asyncio.create_task(call())
+    assert result == {
+        "task_id": "outer",
+        "stream": True,
+        "inner": {"task_id": "inner", "api_key": "inner-default"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_single_tool_call_returns_its_result():
+    response = {"all_tool_calls": [tool_call("price", '{"id": "ada"}')]}
+    assert await ToolAgent()._handle_tool_calls(response, "price", {"id": "ada"}) == {"tool": "price", "id": "ada"}
+
+
+@pytest.mark.asyncio
+async def test_failed_or_malformed_tool_calls_only_fail_themselves():
+    response = {
+        "all_tool_calls": [
+            tool_call("price", '{"id": "ada"}'),
+            tool_call("price", '{"id": '),
+            tool_call("fail", "{}"),
+            tool_call("volume", '{"id": "sol"}'),
+        ]
+    }
+    results = await ToolAgent()._handle_tool_calls(response, "price", {"id": "ada"})
+    assert [result["tool"] for result in results] == ["price", "price", "fail", "volume"]
+    assert results[0]["result"] == {"tool": "price", "id": "ada"}
+    assert results[1]["arguments"] == '{"id": '
+    assert results[1]["result"]["error"].startswith("Invalid tool arguments")
+    assert results[2]["result"] == {"error": "tool failed"}
+    assert results[3]["result"] == {"tool": "volume", "id": "sol"}
+
+
+class FlakyStreamAgent(MeshAgent):
+    def __init__(self, fail_after_data: bool):
+        super().__init__()
+        self.fail_after_data = fail_after_data
+        self.attempts = 0
+
+    @with_retry(max_retries=3, delay=0)
+    async def handle_message(self, params):
+        self.attempts += 1
+        stream = self.request_context.stream
+        if self.attempts == 1 and not self.fail_after_data:
+            raise RuntimeError("upstream failed")
+        if stream is not None:
+            stream.send("data", {"attempt": self.attempts})
+            stream.data_sent = True
+            stream.send("token", "partial")
+        if self.fail_after_data:
+            raise RuntimeError("llm stream failed")
+        return {"response": "done", "data": {"attempt": self.attempts}}
+
+
+async def collect(agent: MeshAgent):
+    events = []
+    with pytest.raises(RuntimeError) as error:
+        async for event in agent.call_agent_stream({"task_id": "t"}):
+            events.append(event)
+    return events, error
+
+
+@pytest.mark.asyncio
+async def test_streamed_call_is_not_retried_after_data_was_sent():
+    agent = FlakyStreamAgent(fail_after_data=True)
+    events, error = await collect(agent)
+    assert agent.attempts == 1
+    assert str(error.value) == "llm stream failed"
+    assert [event["event"] for event in events] == ["data", "token"]
+
+
+@pytest.mark.asyncio
+async def test_streamed_call_is_retried_before_data_was_sent():
+    agent = FlakyStreamAgent(fail_after_data=False)
+    events = [event async for event in agent.call_agent_stream({"task_id": "t"})]
+    assert agent.attempts == 2
+    assert [event["event"] for event in events] == ["data", "token", "result"]
+    assert events[-1]["data"] == {"response": "done"}
+
+
+@pytest.mark.asyncio
+async def test_non_streamed_call_is_retried():
+    agent = FlakyStreamAgent(fail_after_data=True)
+    with pytest.raises(RuntimeError):
+        await agent.call_agent({"task_id": "t"})
+    assert agent.attempts == 3
+
+
+class BlockingStepsAgent(MeshAgent):
+    async def handle_message(self, params):
+        # Like a smolagents step callback, running in a worker thread
+        await asyncio.to_thread(self.push_update, params, "step 1")
+        return {}
+
+
+@pytest.mark.asyncio
+async def test_updates_pushed_from_worker_threads_are_queued_on_the_loop(monkeypatch):
+    agent = BlockingStepsAgent()
+    queued = []
+    monkeypatch.setattr(
+        agent.mesh_client,
+        "enqueue_update",
+        lambda task_id, content: queued.append((task_id, content, threading.get_ident())),
+    )
+    await agent.call_agent({"task_id": "t"})
+    await asyncio.sleep(0)
+    loop_thread = threading.get_ident()
+    assert queued == [("t", f"{agent.agent_name} is thinking...", loop_thread), ("t", "step 1", loop_thread)]
+
+
+class PreroutedAgent(MeshAgent):
+    def __init__(self):
+        super().__init__()
+        self.attempts = 0
+
+    async def handle_message(self, params):
+        raise AssertionError("the pre-router should have handled the query")
+
+    def get_tool_schemas(self):
+        return [{"type": "function", "function": {"name": "get_trending_coins", "description": "Trending coins"}}]
+
+    async def _handle_tool_logic(self, tool_name, function_args):
+        self.attempts += 1
+        if self.attempts == 1:
+            raise RuntimeError("upstream failed")
+        return {"tool": tool_name}
+
+    async def _respond_with_llm(self, query, tool_call_id, data, temperature):
+        return f"explained {tool_call_id}"
+
+
+@pytest.mark.asyncio
+async def test_prerouted_call_is_retried(monkeypatch):
+    async def no_sleep(delay):
+        pass
+
+    monkeypatch.setenv("MESH_PREROUTER_ENABLED", "true")
+    monkeypatch.setattr("decorators.asyncio.sleep", no_sleep)
+    agent = PreroutedAgent()
+    result = await agent.call_agent({"task_id": "t", "query": "trending coins"})
+    assert agent.attempts == 2
+    assert result["response"] == "explained prerouted_get_trending_coins"
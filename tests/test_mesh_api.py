@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import mesh_api
+from mesh.mesh_agent import MeshAgent
+from mesh_manager import AgentPool
+
+
+class SlowTestAgent(MeshAgent):
+    started = 0
+    cancelled = 0
+
+    async def handle_message(self, params):
+        SlowTestAgent.started += 1
+        try:
+            await asyncio.sleep(0.05)
+        except asyncio.CancelledError:
+            SlowTestAgent.cancelled += 1
+            raise
+        return {"response": "done"}
+
+
+class FakeCreditsClient:
+    def __init__(self, validated: bool, recently_validated: bool):
+        self.validated = validated
+        self.recently_validated = recently_validated
+        self.agent_started_before_deduction = None
+
+    def is_recently_validated(self, user_id, api_key):
+        return self.recently_validated
+
+    async def deduct(self, user_id, api_key, model_id):
+        await asyncio.sleep(0.01)
+        self.agent_started_before_deduction = SlowTestAgent.started > 0
+        return self.validated
+
+
+@pytest.fixture
+def credits(monkeypatch):
+    """Enable credit deduction against a FakeCreditsClient, see FakeCreditsClient for its arguments"""
+    SlowTestAgent.started = SlowTestAgent.cancelled = 0
+    agents = {"SlowTestAgent": SlowTestAgent}
+    monkeypatch.setattr(mesh_api, "agents_dict", agents)
+    monkeypatch.setattr(mesh_api, "agent_pool", AgentPool(agents, max_idle=0))
+    monkeypatch.setattr(mesh_api, "credits_api_url", "https://credits.example")
+
+    def configure(validated=True, recently_validated=False, concurrent_validation=False) -> FakeCreditsClient:
+        client = FakeCreditsClient(validated, recently_validated)
+        monkeypatch.setattr(mesh_api, "credits_client", client)
+        monkeypatch.setattr(mesh_api, "credits_concurrent_validation", concurrent_validation)
+        return client
+
+    return configure
+
+
+def mesh_request() -> mesh_api.MeshRequest:
+    return mesh_api.MeshRequest(agent_id="SlowTestAgent", input={"query": "hi"})
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("recently_validated", [False, True])
+async def test_credits_are_deducted_before_the_agent_starts_by_default(credits, recently_validated):
+    client = credits(recently_validated=recently_validated)
+    assert (await mesh_api.process_mesh_request(mesh_request(), "user#key"))["response"] == "done"
+    assert client.agent_started_before_deduction is False
+
+
+@pytest.mark.asyncio
+async def test_rejected_credits_never_start_the_agent(credits):
+    credits(validated=False, recently_validated=True)
+    with pytest.raises(HTTPException) as error:
+        await mesh_api.process_mesh_request(mesh_request(), "user#key")
+    assert error.value.status_code == 403
+    assert SlowTestAgent.started == 0
+
+
+@pytest.mark.asyncio
+async def test_concurrent_validation_overlaps_recently_validated_keys(credits):
+    client = credits(recently_validated=True, concurrent_validation=True)
+    assert (await mesh_api.process_mesh_request(mesh_request(), "user#key"))["response"] == "done"
+    assert client.agent_started_before_deduction is True
+
+    SlowTestAgent.started = 0
+    client = credits(recently_validated=False, concurrent_validation=True)
+    await mesh_api.process_mesh_request(mesh_request(), "user#key")
+    assert client.agent_started_before_deduction is False
+
+
+@pytest.mark.asyncio
+async def test_agent_is_cancelled_when_overlapping_validation_fails(credits):
+    credits(validated=False, recently_validated=True, concurrent_validation=True)
+    with pytest.raises(HTTPException) as error:
+        await mesh_api.process_mesh_request(mesh_request(), "user#key")
+    assert error.value.status_code == 403
+    assert (SlowTestAgent.started, SlowTestAgent.cancelled) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", True),
+        ("GZIP, deflate", True),
+        ("br;q=1.0, gzip;q=0.8", True),
+        ("*", True),
+        ("gzip;q=0", False),
+        ("gzip; q=0.000, *", False),
+        ("*;q=0", False),
+        ("identity", False),
+        ("gzipped", False),
+        ("", False),
+        (None, False),
+    ],
+)
+def test_gzip_follows_accept_encoding_q_values(accept_encoding, expected):
+    assert mesh_api._accepts_gzip(accept_encoding) is expected
+
+
+@pytest.fixture
+def catalog_client(monkeypatch):
+    agents = {"SlowTestAgent": SlowTestAgent}
+    monkeypatch.setattr(mesh_api, "agent_catalog", mesh_api.AgentCatalog(agents))
+    return TestClient(mesh_api.app), agents
+
+
+def test_agents_catalog_is_gzipped_only_when_accepted(catalog_client):
+    client, _ = catalog_client
+    gzipped = client.get("/agents", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert list(gzipped.json()) == ["SlowTestAgent"]
+
+    plain = client.get("/agents", headers={"Accept-Encoding": "gzip;q=0, identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == gzipped.json()
+    assert "Accept-Encoding" in plain.headers["vary"]
+
+
+def test_agents_catalog_is_not_resent_while_its_etag_matches(catalog_client):
+    client, agents = catalog_client
+    etag = client.get("/agents").headers["etag"]
+    for if_none_match in [etag, f"W/{etag}", f'"other", {etag}']:
+        response = client.get("/agents", headers={"If-None-Match": if_none_match})
+        assert (response.status_code, response.content, response.headers["etag"]) == (304, b"", etag)
+    assert client.get("/agents", headers={"If-None-Match": '"other"'}).status_code == 200
+
+    # A new agent changes the catalog and its ETag
+    agents["OtherTestAgent"] = SlowTestAgent
+    response = client.get("/agents", headers={"If-None-Match": etag})
+    assert response.status_code == 200 and response.headers["etag"] != etag
+    assert list(response.json()) == ["SlowTestAgent", "OtherTestAgent"]
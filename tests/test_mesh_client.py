@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from clients.mesh_client import TaskUpdateSender
+
+
+class RecordingClient:
+    def __init__(self, delay: float = 0):
+        self.delay = delay
+        self.sent = []
+
+    async def push_update_async(self, task_id, content):
+        await asyncio.sleep(self.delay)
+        self.sent.append((task_id, content))
+
+
+def test_settings_read_when_sender_is_created(monkeypatch):
+    monkeypatch.setenv("TASK_UPDATE_MAX_PENDING", "3")
+    monkeypatch.setenv("TASK_UPDATE_FLUSH_INTERVAL", "0")
+    sender = TaskUpdateSender(RecordingClient(), max_concurrency=2)
+    assert (sender.max_pending, sender.flush_interval, sender.max_concurrency) == (3, 0.0, 2)
+
+
+@pytest.mark.asyncio
+async def test_updates_are_sent_separately_in_order():
+    client = RecordingClient()
+    sender = TaskUpdateSender(client, flush_interval=0.01)
+    for content in ("a", "b"):
+        sender.submit("t1", content)
+    sender.submit("t2", "c")
+    await asyncio.sleep(0.05)
+    assert [update for update in client.sent if update[0] == "t1"] == [("t1", "a"), ("t1", "b")]
+    assert ("t2", "c") in client.sent
+    await sender.close()
+
+
+@pytest.mark.asyncio
+async def test_flush_task_sends_buffered_and_in_flight_updates():
+    client = RecordingClient(delay=0.02)
+    sender = TaskUpdateSender(client, flush_interval=0)
+    sender.submit("t1", "first")
+    await asyncio.sleep(0.005)  # the worker is now sending "first"
+    sender.submit("t1", "second")
+    sender.submit("t2", "other")
+
+    await sender.flush_task("t1")
+    assert [content for task_id, content in client.sent if task_id == "t1"] == ["first", "second"]
+    await sender.close()
+
+
+@pytest.mark.asyncio
+async def test_close_stops_worker_and_sends_pending_updates():
+    client = RecordingClient()
+    sender = TaskUpdateSender(client, flush_interval=10)
+    sender.submit("t1", "pending")
+    worker = sender._worker
+
+    await sender.close()
+    assert worker.cancelled()
+    assert client.sent == [("t1", "pending")]
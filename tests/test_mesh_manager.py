@@ -0,0 +1,213 @@
+import asyncio
+import itertools
+import sys
+import types
+
+import pytest
+
+from mesh.mesh_agent import MeshAgent
+from mesh_manager import AgentLoader, Config, LazyAgentRegistry, MeshManager
+
+MODULE = "mesh.lazy_test_agent"
+
+
+class LazyTestAgent(MeshAgent):
+    async def handle_message(self, params):
+        return {"response": params["query"]}
+
+
+@pytest.fixture
+def lazy_manager(monkeypatch):
+    monkeypatch.setitem(sys.modules, MODULE, types.SimpleNamespace(LazyTestAgent=LazyTestAgent))
+    registry = LazyAgentRegistry({"agents": {"LazyTestAgent": {"module": "lazy_test_agent", "metadata": {}}}})
+    monkeypatch.setattr(AgentLoader, "load_agents", lambda self: registry)
+    config = Config()
+    config.poll_interval = 0.01
+    return MeshManager(config), registry
+
+
+async def run_briefly(manager: MeshManager, seconds: float = 0.1) -> None:
+    try:
+        await asyncio.wait_for(manager.run_forever(), timeout=seconds)
+    except asyncio.TimeoutError:
+        pass
+
+
+@pytest.mark.asyncio
+async def test_per_agent_polling_does_not_import_agents(lazy_manager, monkeypatch):
+    manager, registry = lazy_manager
+
+    async def no_tasks(agent_id):
+        await asyncio.sleep(1)
+        return {}
+
+    monkeypatch.setattr(manager, "poll_server", no_tasks)
+    await run_briefly(manager)
+    assert "LazyTestAgent" in manager.active_tasks
+    assert registry._classes == {}
+
+
+@pytest.mark.asyncio
+async def test_agent_class_resolved_on_first_task(lazy_manager, monkeypatch):
+    manager, registry = lazy_manager
+    polls, submitted = [], []
+
+    async def one_task(agent_id):
+        polls.append(agent_id)
+        if len(polls) == 1:
+            return {"task_id": "t1", "input": {"query": "hi"}}
+        await asyncio.sleep(1)
+        return {}
+
+    async def submit(agent_id, task_id, result):
+        submitted.append((task_id, result["results"]))
+
+    monkeypatch.setattr(manager, "poll_server", one_task)
+    monkeypatch.setattr(manager, "submit_result", submit)
+    await run_briefly(manager)
+    assert registry._classes == {"LazyTestAgent": LazyTestAgent}
+    assert submitted == [("t1", {"success": "true", "response": "hi"})]
+
+
+def test_startup_sync_does_not_write_manifest(monkeypatch, tmp_path):
+    monkeypatch.setenv("AGENT_MANIFEST_PATH", str(tmp_path / "agents_manifest.json"))
+    loader = AgentLoader(Config())
+    monkeypatch.setattr(loader, "_create_metadata", lambda entries: {})
+    monkeypatch.setattr(loader, "_upload_metadata", lambda metadata: None)
+    monkeypatch.setattr(loader, "_generate_agent_table", lambda metadata: "")
+    monkeypatch.setattr(loader, "_update_readme_with_agents", lambda table: None)
+
+    loader.sync_metadata({"LazyTestAgent": LazyTestAgent})
+    assert not (tmp_path / "agents_manifest.json").exists()
+    loader.sync_metadata({"LazyTestAgent": LazyTestAgent}, write_manifest=True)
+    assert (tmp_path / "agents_manifest.json").exists()
+
+
+class EchoTestAgent(MeshAgent):
+    async def handle_message(self, params):
+        return {"response": params["query"]}
+
+
+def make_manager(monkeypatch, registry, poll_mode="multiplexed") -> MeshManager:
+    monkeypatch.setattr(AgentLoader, "load_agents", lambda self: registry)
+    config = Config()
+    config.poll_interval = 0.01
+    config.poll_mode = poll_mode
+    return MeshManager(config)
+
+
+def serve_once(manager: MeshManager, monkeypatch, task: dict) -> list:
+    """Poll answering task once, then nothing; returns the submitted results"""
+    polls, submitted = [], []
+
+    async def poll(agent_ids):
+        polls.append(agent_ids)
+        if len(polls) == 1:
+            return task
+        await asyncio.sleep(1)
+        return {}
+
+    async def submit(agent_id, task_id, result):
+        submitted.append((agent_id, task_id, result["results"]))
+
+    monkeypatch.setattr(manager, "_poll", poll)
+    monkeypatch.setattr(manager, "submit_result", submit)
+    return submitted
+
+
+def test_poll_response_is_one_task_or_empty():
+    task = {"task_id": "t1", "agent_id": "B", "input": {}}
+    assert MeshManager._extract_tasks(task, ["A", "B"]) == [task]
+    assert MeshManager._extract_tasks({"task_id": "t2", "input": {}}, ["A"])[0]["agent_id"] == "A"
+    assert MeshManager._extract_tasks({}, ["A", "B"]) == []
+    assert MeshManager._extract_tasks(None, ["A"]) == []
+
+
+@pytest.mark.asyncio
+async def test_multiplexed_task_is_dispatched_to_its_agent(monkeypatch):
+    manager = make_manager(monkeypatch, {"LazyTestAgent": LazyTestAgent, "EchoTestAgent": EchoTestAgent})
+    submitted = serve_once(
+        manager, monkeypatch, {"task_id": "t1", "agent_id": "EchoTestAgent", "input": {"query": "hi"}}
+    )
+    await run_briefly(manager)
+    assert submitted == [("EchoTestAgent", "t1", {"success": "true", "response": "hi"})]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("agent_id", [None, "OtherAgent"])
+async def test_task_for_unknown_agent_gets_an_error_result(monkeypatch, agent_id):
+    manager = make_manager(monkeypatch, {"LazyTestAgent": LazyTestAgent, "EchoTestAgent": EchoTestAgent})
+    submitted = serve_once(manager, monkeypatch, {"task_id": "t1", "agent_id": agent_id, "input": {"query": "hi"}})
+    await run_briefly(manager)
+    assert [(task_id, result["success"]) for _, task_id, result in submitted] == [("t1", "false")]
+    assert manager.active_tasks == {"LazyTestAgent": set(), "EchoTestAgent": set()}
+
+
+@pytest.mark.asyncio
+async def test_task_for_agent_that_fails_to_import_gets_an_error_result(monkeypatch):
+    registry = LazyAgentRegistry({"agents": {"MissingAgent": {"module": "missing_test_agent", "metadata": {}}}})
+    manager = make_manager(monkeypatch, registry)
+    submitted = serve_once(manager, monkeypatch, {"task_id": "t1", "agent_id": "MissingAgent", "input": {}})
+    await run_briefly(manager)
+    assert len(submitted) == 1
+    agent_id, task_id, result = submitted[0]
+    assert (agent_id, task_id, result["success"]) == ("MissingAgent", "t1", "false")
+    assert "missing_test_agent" in result["error"]
+
+
+def test_one_task_per_agent_by_default(monkeypatch):
+    monkeypatch.delenv("MAX_CONCURRENT_TASKS_PER_AGENT", raising=False)
+    monkeypatch.delenv("AGENT_MAX_CONCURRENT_TASKS", raising=False)
+    assert Config().get_max_concurrent_tasks("EchoTestAgent") == 1
+
+
+def test_per_agent_limits_override_the_default(monkeypatch):
+    monkeypatch.setenv("MAX_CONCURRENT_TASKS_PER_AGENT", "3")
+    monkeypatch.setenv(
+        "AGENT_MAX_CONCURRENT_TASKS", "DeepResearchAgent=2, EchoTestAgent = 8,BadAgent=x,junk,ZeroAgent=0"
+    )
+    config = Config()
+    assert config.agent_max_concurrent_tasks == {"DeepResearchAgent": 2, "EchoTestAgent": 8, "ZeroAgent": 1}
+    assert config.get_max_concurrent_tasks("EchoTestAgent") == 8
+    assert config.get_max_concurrent_tasks("BadAgent") == 3
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("poll_mode", ["per_agent", "multiplexed"])
+async def test_tasks_wait_for_a_free_slot_of_their_agent(monkeypatch, poll_mode):
+    manager = make_manager(monkeypatch, {"EchoTestAgent": EchoTestAgent}, poll_mode)
+    manager.config.agent_max_concurrent_tasks = {"EchoTestAgent": 2}
+    task_ids, running, peak, finished = itertools.count(), set(), [0], []
+    release = asyncio.Event()
+
+    async def poll(agent_ids):
+        task_id = next(task_ids)
+        if task_id < 5:
+            return {"task_id": f"t{task_id}", "agent_id": "EchoTestAgent", "input": {}}
+        await asyncio.sleep(1)
+        return {}
+
+    async def process(agent_id, agent_cls, task_data):
+        running.add(task_data["task_id"])
+        peak[0] = max(peak[0], len(running))
+        await release.wait()
+        running.discard(task_data["task_id"])
+        return {"results": {}, "inference_latency": 0}
+
+    async def submit(agent_id, task_id, result):
+        finished.append(task_id)
+
+    monkeypatch.setattr(manager, "_poll", poll)
+    monkeypatch.setattr(manager, "process_task", process)
+    monkeypatch.setattr(manager, "submit_result", submit)
+    loop = asyncio.create_task(run_briefly(manager, seconds=0.3))
+
+    # Both slots are taken and nothing else is polled until one frees up
+    await asyncio.sleep(0.1)
+    assert (running, finished) == ({"t0", "t1"}, [])
+    assert manager.active_tasks["EchoTestAgent"] == {"t0", "t1"}
+
+    release.set()
+    await loop
+    assert sorted(finished) == ["t0", "t1", "t2", "t3", "t4"]
+    assert peak[0] == 2
@@ -0,0 +1,57 @@
+import asyncio
+
+from core.openai_clients import OpenAIClientRegistry
+
+
+def test_api_keys_share_connection_pool():
+    registry = OpenAIClientRegistry()
+    first = registry.get_client("https://llm.example/v1", "key-1")
+    second = registry.get_client("https://llm.example/v1", "key-2")
+    other = registry.get_client("https://other.example/v1", "key-1")
+
+    assert first is registry.get_client("https://llm.example/v1", "key-1")
+    assert first.api_key == "key-1" and second.api_key == "key-2"
+    assert first._client is second._client
+    assert other._client is not first._client
+    registry.close()
+
+
+def test_clients_per_key_are_bounded():
+    registry = OpenAIClientRegistry(max_cached_clients=2)
+    for i in range(10):
+        registry.get_client("https://llm.example/v1", f"key-{i}")
+    assert len(registry._clients) == 2
+    assert len(registry._http_clients) == 1
+    registry.close()
+
+
+def test_limits_read_on_first_use(monkeypatch):
+    registry = OpenAIClientRegistry()
+    monkeypatch.setenv("LLM_HTTP_MAX_CONNECTIONS", "7")
+    assert registry.limits.max_connections == 7
+
+
+def test_async_clients_share_pool_per_loop():
+    registry = OpenAIClientRegistry()
+
+    async def clients():
+        first = registry.get_async_client("https://llm.example/v1", "key-1")
+        second = registry.get_async_client("https://llm.example/v1", "key-2")
+        shared = first._client is second._client
+        await registry.aclose()
+        return shared
+
+    assert asyncio.run(clients())
+
+
+def test_async_pools_closed_when_their_loop_shuts_down():
+    registry = OpenAIClientRegistry()
+
+    async def client():
+        registry.get_async_client("https://llm.example/v1", "key-1")
+        return registry.get_async_client("https://llm.example/v1", "key-2")
+
+    first = asyncio.run(client())
+    second = asyncio.run(client())
+    assert first._client.is_closed and second._client.is_closed
+    assert first._client is not second._client
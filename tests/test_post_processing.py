@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+from agents import post_processing
+from agents.post_processing import PostProcessingQueue
+
+
+def test_jobs_run_in_submission_order_with_one_worker():
+    queue, done = PostProcessingQueue(max_concurrency=1), []
+
+    def job(index):
+        async def run():
+            await asyncio.sleep(0.001 * (index % 3))
+            done.append(index)
+
+        return run
+
+    for index in range(20):
+        assert queue.submit(job(index))
+    assert queue.flush(timeout=5)
+    assert done == list(range(20))
+    assert queue.pending == 0
+
+
+def test_jobs_beyond_max_pending_are_dropped():
+    queue = PostProcessingQueue(max_concurrency=1, max_pending=2)
+    release = asyncio.Event()
+
+    async def wait():
+        await release.wait()
+
+    assert queue.submit(wait) and queue.submit(wait)
+    assert not queue.submit(wait)
+    queue._loop.call_soon_threadsafe(release.set)
+    assert queue.flush(timeout=5)
+    assert queue.submit(wait)
+    assert queue.flush(timeout=5)
+
+
+def test_queued_jobs_are_flushed_at_exit(monkeypatch):
+    at_exit = []
+    monkeypatch.setattr(post_processing.atexit, "register", lambda func, *args: at_exit.append((func, args)))
+    queue, done = PostProcessingQueue(max_concurrency=2), []
+
+    async def slow():
+        await asyncio.sleep(0.2)
+        done.append(time.monotonic())
+
+    for _ in range(4):
+        queue.submit(slow)
+    assert not queue.flush(timeout=0.01)
+
+    # What runs when the process exits
+    [(flush, args)] = at_exit
+    assert flush(*args)
+    assert len(done) == 4
+
+
+def test_failed_jobs_do_not_stop_the_queue():
+    queue, done = PostProcessingQueue(max_concurrency=1), []
+
+    async def fail():
+        raise RuntimeError("classification failed")
+
+    async def succeed():
+        done.append(True)
+
+    queue.submit(fail)
+    queue.submit(succeed)
+    assert queue.flush(timeout=5)
+    assert done == [True]
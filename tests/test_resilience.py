@@ -0,0 +1,123 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from core.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyTracker,
+    ModelHealth,
+    call_tracked,
+    call_tracked_async,
+    is_transient_error,
+    run_hedged,
+)
+
+
+def status_error(status_code: int) -> openai.APIStatusError:
+    request = httpx.Request("POST", "https://llm.example/v1/chat/completions")
+    response = httpx.Response(status_code, request=request)
+    return openai.APIStatusError(f"status {status_code}", response=response, body=None)
+
+
+def make_health(failure_threshold: int = 2) -> ModelHealth:
+    return ModelHealth("model", CircuitBreaker(failure_threshold=failure_threshold, reset_timeout=60), LatencyTracker())
+
+
+def fail_with(error: Exception):
+    def call():
+        raise error
+
+    return call
+
+
+@pytest.mark.parametrize("status_code", [429, 500, 503])
+def test_transient_status_errors(status_code):
+    assert is_transient_error(status_error(status_code))
+
+
+@pytest.mark.parametrize("status_code", [400, 401, 404, 413, 422])
+def test_client_status_errors_are_not_transient(status_code):
+    assert not is_transient_error(status_error(status_code))
+
+
+def test_connection_errors_are_transient():
+    request = httpx.Request("POST", "https://llm.example")
+    assert is_transient_error(openai.APIConnectionError(request=request))
+    assert is_transient_error(openai.APITimeoutError(request=request))
+    assert is_transient_error(asyncio.TimeoutError())
+    assert not is_transient_error(ValueError("bad json"))
+
+
+def test_client_errors_do_not_open_breaker():
+    health = make_health()
+    for _ in range(5):
+        with pytest.raises(openai.APIStatusError):
+            call_tracked(health, fail_with(status_error(400)))
+    assert health.breaker.state == "closed"
+    assert health.breaker.failures == 0
+
+
+def test_server_errors_open_breaker():
+    health = make_health()
+    for _ in range(2):
+        with pytest.raises(openai.APIStatusError):
+            call_tracked(health, fail_with(status_error(500)))
+    assert health.breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        call_tracked(health, lambda: "ok")
+
+
+def test_client_error_releases_half_open_trial():
+    health = make_health(failure_threshold=1)
+    health.breaker.reset_timeout = 0
+    with pytest.raises(openai.APIStatusError):
+        call_tracked(health, fail_with(status_error(503)))
+    assert health.breaker.state == "half_open"
+    with pytest.raises(openai.APIStatusError):
+        call_tracked(health, fail_with(status_error(401)))
+    # The trial slot is free again, and the next success closes the breaker
+    assert call_tracked(health, lambda: "ok") == "ok"
+    assert health.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_async_client_errors_do_not_open_breaker():
+    health = make_health()
+
+    async def bad_request():
+        raise status_error(413)
+
+    for _ in range(5):
+        with pytest.raises(openai.APIStatusError):
+            await call_tracked_async(health, bad_request)
+    assert health.breaker.state == "closed"
+
+
+@pytest.mark.asyncio
+async def test_hedge_not_started_for_client_errors():
+    calls = []
+
+    async def bad_request():
+        raise status_error(400)
+
+    async def alternate():
+        calls.append("alternate")
+        return "alternate"
+
+    with pytest.raises(openai.APIStatusError):
+        await run_hedged(bad_request, make_health(), alternate, make_health())
+    assert calls == []
+
+
+@pytest.mark.asyncio
+async def test_hedge_fails_over_on_server_errors():
+    async def unavailable():
+        raise status_error(502)
+
+    async def alternate():
+        return "alternate"
+
+    assert await run_hedged(unavailable, make_health(), alternate, make_health()) == ("alternate", True)
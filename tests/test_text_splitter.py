@@ -0,0 +1,31 @@
+import pytest
+
+try:
+    from core.utils.text_splitter import encoder, trim_prompt, trim_prompts
+except Exception as e:  # tiktoken downloads the encoding on first use
+    pytest.skip(f"cl100k_base encoding unavailable: {e}", allow_module_level=True)
+
+TEXT = "\n\n".join(f"Paragraph {i}. " + "Some words about tokens and prompts. " * 20 for i in range(20))
+
+
+def test_short_prompt_is_unchanged():
+    assert trim_prompt(TEXT, context_size=100_000) == TEXT
+
+
+@pytest.mark.parametrize("context_size", [50, 300, 1000])
+def test_trimmed_prompt_fits_and_ends_on_a_boundary(context_size):
+    trimmed = trim_prompt(TEXT, context_size=context_size)
+    assert 0 < len(encoder.encode_ordinary(trimmed)) <= context_size
+    assert TEXT.startswith(trimmed)
+    assert trimmed.endswith(".")
+
+
+@pytest.mark.parametrize("context_size", [0, -1, -1000])
+def test_non_positive_context_size_trims_everything(context_size):
+    assert trim_prompt(TEXT, context_size=context_size) == ""
+    assert trim_prompts([TEXT, "short"], context_size=context_size) == ["", ""]
+
+
+def test_trim_prompts_matches_trim_prompt():
+    prompts = [TEXT, "", None, "short"]
+    assert trim_prompts(prompts, context_size=300, num_threads=2) == [trim_prompt(p or "", 300) for p in prompts]
@@ -0,0 +1,86 @@
+import pytest
+
+from mesh.tool_router import ToolRouter
+
+
+def tool(name, description, properties=None, required=()):
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": properties or {}, "required": list(required)},
+        },
+    }
+
+
+# Trimmed down CoinGecko and Solana token agent tools
+TOOLS = [
+    tool(
+        "get_trending_coins",
+        "Get the current top trending cryptocurrencies on CoinGecko. This tool retrieves a list of the most popular "
+        "cryptocurrencies based on trading volume and social media mentions.",
+    ),
+    tool(
+        "get_categories_list",
+        "Get a list of all available cryptocurrency categories from CoinGecko.",
+    ),
+    tool(
+        "get_token_info",
+        "Get detailed token information and market data using CoinGecko ID.",
+        {"coingecko_id": {"type": "string", "description": "The CoinGecko ID of the token"}},
+        ["coingecko_id"],
+    ),
+    tool(
+        "query_token_holders",
+        "Get the top holders of a Solana token",
+        {"token_address": {"type": "string", "description": "Solana token mint address"}},
+        ["token_address"],
+    ),
+]
+
+SOLANA_ADDRESS = "So11111111111111111111111111111111111111112"
+
+
+def test_keywords_route_tool_without_arguments():
+    router = ToolRouter(TOOLS)
+    match = router.route("trending coins")
+    assert (match.tool, match.arguments, match.source) == ("get_trending_coins", {}, "keywords")
+    assert router.stats.keyword_hits == 1
+
+
+def test_keywords_fill_address_argument():
+    match = ToolRouter(TOOLS).route(f"solana token holders {SOLANA_ADDRESS}")
+    assert (match.tool, match.arguments) == ("query_token_holders", {"token_address": SOLANA_ADDRESS})
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "coins that are not trending",
+        "coins without trending",
+        "trending coins except memecoins",
+        "which coins aren't trending",
+    ],
+)
+def test_negated_queries_fall_back_to_llm(query):
+    router = ToolRouter(TOOLS)
+    assert router.route(query) is None
+    assert router.stats.fallbacks == 1
+
+
+def test_rules_still_apply_to_negated_queries():
+    router = ToolRouter(TOOLS)
+    router.add_rule(r"not trending", "get_categories_list")
+    match = router.route("coins that are not trending")
+    assert (match.tool, match.source) == ("get_categories_list", "rule")
+
+
+def test_unfillable_required_arguments_fall_back_to_llm():
+    # The CoinGecko ID has to be looked up first, which only the LLM can plan
+    assert ToolRouter(TOOLS).route("token info market data") is None
+
+
+def test_long_queries_fall_back_to_llm():
+    router = ToolRouter(TOOLS, max_query_words=3)
+    assert router.route("please show me the trending coins") is None